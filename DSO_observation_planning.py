@@ -33,41 +33,52 @@ result in a list of matching DSOs from the internal catalogue.
 
 # sudo pip3 install astropy --break-system-packages
 # sudo pip3 install astroquery --break-system-packages
-# sudo pip3 install skyfield --break-system-packages
 # sudo pip3 install pandas --break-system-packages
 # sudo pip3 install suntime --break-system-packages
-# sudo pip3 install pyephem --break-system-packages
 # sudo pip3 install spaceweather --break-system-packages
 # sudo pip3 install matplotlib-label-lines --break-system-packages
 # sudo pip3 install reportlab --break-system-packages
 
-import os, sys, platform
+import os, sys
+import io, contextlib, copy, json, time, weakref
+import concurrent.futures
 import optparse
-import matplotlib.pyplot as plt
 import numpy as np
 import datetime
-from astropy.visualization import astropy_mpl_style, quantity_support
 import astropy.units as u
 from astropy.coordinates import AltAz, EarthLocation, SkyCoord
 from astropy.time import Time
-from astroquery.simbad import Simbad # https://github.com/astropy/astroquery
 import config # own
 import sky_utils # own
+import catalogue_store # own
+import catalogue_resolver # own
+import night_context # own
+import altaz_engine # own
+import year_grid # own
+import ephemeris_cache # own
+import moon_ephemeris # own
+import scoring # own
+import dso_result # own
+import catalogue_file # own
+import prefilter # own
+import metrics # own
+import planner_daemon # own
+import result_cache # own
+import plot_renderer # own
+import atlas # own
+import result_export # own
+import sites # own
+import night_sampling # own
 import pytz
 import send_message
-from time import sleep
-import asyncio
 
-from reportlab.lib import colors
-from reportlab.lib.units import cm
-from reportlab.lib.pagesizes import A4, portrait
-from reportlab.platypus import SimpleDocTemplate, TableStyle, Table
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import Paragraph, Spacer
-from reportlab.lib.enums import TA_JUSTIFY, TA_LEFT, TA_CENTER, TA_RIGHT
+# matplotlib, astroquery and reportlab are imported where they are used, most
+# runs need only some of them and they take most of the start-up time
 
 debug = False #True
 base_dir = "./"
+report_dir = "reports/"  # JSON reports of the precomputed nights, see run_scheduler
+result_tracks = None  # TrackStore keeping the tracks of the tonight results for --export_tracks
 
 parser = optparse.OptionParser()
 parser.add_option('-d', '--dso',
@@ -98,10 +109,19 @@ parser.add_option('-f', '--debug',
 parser.add_option('-n', '--message',
     action="store_true", dest="message",
     help="Send results message", default=False)
+parser.add_option('--message_sink',
+    action="store", dest="message_sink",
+    help="Deliver messages to a local stand-in instead of the own transport: file:PATH, unix:PATH or tcp:HOST:PORT")
+parser.add_option('--message_timeout',
+    action="store", dest="message_timeout", type="float",
+    help="Seconds to wait for the delivery of queued messages at the end of a run", default=60.0)
 
 parser.add_option('-b', '--best',
     action="store_true", dest="best",
     help="Check visibility during the year to find best date and time", default=False)
+parser.add_option('--atlas',
+    action="store_true", dest="atlas",
+    help="Collect the plots of a catalogue-wide --best run and a summary table in one PDF", default=False)
 
 query_opts_tonight = optparse.OptionGroup(
     parser, 'Tonight parameters',
@@ -125,8 +145,75 @@ query_opts_tonight.add_option('-r', '--direction',
 query_opts_tonight.add_option('-c', '--catalogue',
     action="store", dest="catalogue",
     help="Select catalogue (Messier, Caldwell", default="Messier") # Messier/Caldwell
+query_opts_tonight.add_option('--order',
+    action="store", dest="order", type="choice", choices=["time", "score"],
+    help="Order tonight's results by max. altitude time (default) or score", default="time")
+query_opts_tonight.add_option('--min_score',
+    action="store", dest="min_score", type="float",
+    help="Filter tonight's results for a min. score 0..1 (altitude, darkness and moon)", default=0.0)
+query_opts_tonight.add_option('--catalogue_file',
+    action="store", dest="catalogue_file",
+    help="Evaluate the DSOs of a local CSV/Parquet catalogue file (name, ra, dec, ...) instead of --catalogue")
+query_opts_tonight.add_option('--chunk_size',
+    action="store", dest="chunk_size", type="int",
+    help="DSOs per chunk for --catalogue_file", default=catalogue_file.chunk_size)
+query_opts_tonight.add_option('--sites',
+    action="store", dest="sites",
+    help="Compare tonight's DSOs at the observing sites of a CSV file (name, latitude, longitude, elevation) instead of the location")
+query_opts_tonight.add_option('--export',
+    action="store", dest="export",
+    help="Write tonight's results to a JSON Lines (.jsonl), Parquet (.parquet) or Arrow (.arrow) file")
+query_opts_tonight.add_option('--export_tracks',
+    action="store_true", dest="export_tracks",
+    help="Add the alt/az tracks over the night to the --export rows", default=False)
 parser.add_option_group(query_opts_tonight)
 
+parser.add_option('--engine',
+    action="store", dest="engine", type="choice", choices=altaz_engine.engines,
+    help="Alt/az computation: astropy (default) or fast (analytic, planning grade)", default="astropy")
+parser.add_option('--sampling',
+    action="store", dest="sampling", type="choice", choices=night_sampling.samplings,
+    help="Tonight's peaks from night-only samples refined around peaks and threshold crossings (adaptive, default) or from all samples of the 24 h grid (full)", default="adaptive")
+parser.add_option('--precision',
+    action="store", dest="precision", type="float",
+    help="Time resolution of the night's grid in minutes (default 1.44, 1000 samples in 24 h)")
+parser.add_option('--engine_report',
+    action="store_true", dest="engine_report",
+    help="Report the max. alt/az error of the fast engine against astropy for the catalogue and year", default=False)
+
+parser.add_option('--jobs',
+    action="store", dest="jobs", type="int",
+    help="Number of worker processes for catalogue-wide runs", default=1)
+
+parser.add_option('--simbad_tap',
+    action="store", dest="simbad_tap",
+    help="Simbad TAP service URL or recorded VOTable response used to resolve DSOs (default: Simbad)")
+
+parser.add_option('--no_result_cache',
+    action="store_true", dest="no_result_cache",
+    help="Compute tonight's results without reading or writing the result cache", default=False)
+
+query_opts_daemon = optparse.OptionGroup(
+    parser, 'Daemon parameters',
+    'These options define the local query API of the planner daemon.',
+    )
+query_opts_daemon.add_option('--daemon',
+    action="store_true", dest="daemon",
+    help="Keep catalogue, ephemerides and nights in memory and answer tonight/best/object queries as JSON", default=False)
+query_opts_daemon.add_option('--port',
+    action="store", dest="port", type="int",
+    help="Local HTTP port of the daemon", default=planner_daemon.default_port)
+query_opts_daemon.add_option('--socket',
+    action="store", dest="socket",
+    help="Unix socket of the daemon instead of the HTTP port")
+query_opts_daemon.add_option('--schedule',
+    action="store", dest="schedule", type="int",
+    help="Precompute tonight and the following nights (number of nights) into the result cache and JSON reports, runs until interrupted")
+query_opts_daemon.add_option('--schedule_interval',
+    action="store", dest="schedule_interval", type="int",
+    help="Minutes between two checks of the precomputed nights", default=60)
+parser.add_option_group(query_opts_daemon)
+
 options, args = parser.parse_args()
 
 if debug:
@@ -170,10 +257,82 @@ if str(options.catalogue) == "Messier":
   my_DSO_list = messier_obj
 if str(options.catalogue) == "Caldwell":
   my_DSO_list = caldwell_obj_N
+if options.catalogue_file:
+  options.catalogue = os.path.splitext(os.path.basename(options.catalogue_file))[0]
+  my_DSO_list = []  # filled while the file is read
+
+def simbad_lookup(the_object_name):
+  ##############################################################################
+  # `astropy.coordinates.SkyCoord.from_name` uses Simbad to resolve object
+  # names and retrieve coordinates.
+  #
+  # Get the coordinates of the desired DSO:
+  the_object = SkyCoord.from_name(the_object_name)
+  from astroquery.simbad import Simbad # https://github.com/astropy/astroquery
+  entry = dict(main_id=None, ra=the_object.ra.deg, dec=the_object.dec.deg, otype=None, b_mag=None, v_mag=None, major_axis=None, minor_axis=None, resolved=1)
+
+  # http://vizier.u-strasbg.fr/cgi-bin/OType?$1
+  # SELECT a.main_id, a.otype, b.B, b.V FROM basic AS a JOIN allfluxes AS b ON oidref = oid WHERE a.main_id='m13';
+  query = "SELECT a.main_id, a.otype, b.B, b.V, galdim_minaxis, galdim_majaxis FROM basic AS a JOIN allfluxes AS b ON b.oidref = oid JOIN ident AS c ON c.oidref = oid WHERE a.main_id='" + str(the_object_name) + "';"
+  try:
+    result_table = Simbad.query_tap(query)
+  except Exception as e:
+    print("Simbad lookup error for " + str(the_object_name) + ": " + str(e))
+    result_table = Simbad.query_tap(query)
+  if debug:
+    print(result_table)
+  '''
+  main_id otype         B                 V         galdim_minaxis galdim_majaxis
+                                                      arcmin         arcmin
+  ------- ----- ----------------- ----------------- -------------- --------------
+  M  31   AGN 4.360000133514404 3.440000057220459          70.79         199.53
+  '''
+  if len(result_table) == 0:
+    if debug:
+      print("DSO " + str(the_object_name) + " not found.")
+    entry["otype"] = "NONE"
+    return entry
+
+  row = result_table[0]
+  entry["main_id"] = str(row["main_id"]).strip()
+  for key, column in [("otype", "otype"), ("b_mag", "B"), ("v_mag", "V"), ("major_axis", "galdim_majaxis"), ("minor_axis", "galdim_minaxis")]:
+    if not np.ma.is_masked(row[column]):
+      entry[key] = str(row[column]).strip() if key == "otype" else float(row[column])
+  return entry
+
+# Simbad object types
+object_type_strings = {"AGN": "Active galaxy nucleus",
+                       "SNR": "SuperNova remnant",
+                       "SFR": "Star forming region",
+                       "GNe": "Nebula",
+                       "RNe": "Reflection nebula",
+                       "GDNe": "Dark cloud (nebula)",
+                       "MoC": "Molecular cloud",
+                       "IG": "Interacting galaxies",
+                       "PaG": "Pair of galaxies",
+                       "GiP": "Galaxy in pair of galaxies",
+                       "CGG": "Compact group of galaxies",
+                       "CIG": "Cluster of galaxies",
+                       "BH": "Black hole",
+                       "LSB": "Low surface brightness galaxy",
+                       "SBG": "Starburst galaxy",
+                       "H2G": "HII galaxy",
+                       "GGG": "Galaxy",
+                       "Cl": "Cluster of stars",
+                       "GlC": "Globular cluster",
+                       "OpC": "Open cluster",
+                       "Cl*": "Open cluster",
+                       "LIN": "LINER-type active galaxy nucleus",
+                       "SyG": "Seyfert galaxy",
+                       "Sy1": "Seyfert 1 galaxy",
+                       "Sy2": "Seyfert 2 galaxy",
+                       "GiG": "Galaxy towards a group of galaxies",
+                       "As*": "Association of stars",
+                       "PN": "Planetary nebula"}
 
 class DSO:
 
-  def __init__(self, dso_name, today, tomorrow):
+  def __init__(self, dso_name, today, tomorrow, entry=None, night=None):
     self.the_object_name = str(dso_name).upper()
     self.theDate = today.strftime("%d.%m.%Y")
     self.theDate_american = today.strftime("%Y-%m-%d")
@@ -185,7 +344,9 @@ class DSO:
       print("Today: " + str(self.today))
       print("Tomorrow: " + str(self.tomorrow))
 
-    self.civil_night_start, self.civil_night_end, self.nautical_night_start, self.nautical_night_end, self.astronomical_night_start, self.astronomical_night_end = sky_utils.astro_night_times(self.theDate, options.latitude, options.longitude, debug)
+    if night is None:
+      night = night_context.get(today, the_location, utcoffset)
+    self.use_night(night)
 
     if debug:
       print("Latitude: " + str(options.latitude))
@@ -196,172 +357,43 @@ class DSO:
       print("Nautical night end: " + str(self.nautical_night_end))
       print("Astronomical night start: " + str(self.astronomical_night_start))
       print("Astronomical night end: " + str(self.astronomical_night_end))
-    if self.astronomical_night_start == None and self.astronomical_night_end == None:
-      self.astronomical_night_start = self.nautical_night_start
-      self.astronomical_night_end = self.nautical_night_end
-      if debug:
-        print("Astronomical night start: " + str(self.astronomical_night_start))
-        print("Astronomical night end: " + str(self.astronomical_night_end))
 
     ##############################################################################
-    # `astropy.coordinates.SkyCoord.from_name` uses Simbad to resolve object
-    # names and retrieve coordinates.
-    #
-    # Get the coordinates of the desired DSO:
-    self.the_object = SkyCoord.from_name(self.the_object_name)
+    # Coordinates and metadata of the desired DSO, the local catalogue store is
+    # consulted first, Simbad only on a miss. Bulk resolved entries are handed
+    # in directly.
+    if entry is None:
+      entry = catalogue.get(self.the_object_name)
+    if entry is None:
+      entry = catalogue_resolver.lookup(self.the_object_name, catalogue, simbad_lookup)
+    if not entry["resolved"]:
+      raise ValueError("DSO " + str(self.the_object_name) + " could not be resolved")
+    self.the_object = SkyCoord(ra=entry["ra"] * u.deg, dec=entry["dec"] * u.deg)
     if debug:
       print("SkyCoord: " + str(self.the_object))
+      print("Catalogue entry: " + str(entry))
 
-    # http://vizier.u-strasbg.fr/cgi-bin/OType?$1
-    result_table = ""
-    try:
-      # SELECT a.main_id, a.otype, b.B, b.V FROM basic AS a JOIN allfluxes AS b ON oidref = oid WHERE a.main_id='m13';
-      #query = "SELECT main_id, otype FROM basic WHERE main_id IN ('" + str(self.the_object_name) + "')")
-      query = "SELECT a.main_id, a.otype, b.B, b.V FROM basic AS a JOIN allfluxes AS b ON oidref = oid WHERE a.main_id='" + str(self.the_object_name) + "';"
-      query = "SELECT a.main_id, a.otype, b.B, b.V, galdim_minaxis, galdim_majaxis FROM basic AS a JOIN allfluxes AS b ON b.oidref = oid JOIN ident AS c ON c.oidref = oid WHERE a.main_id='" + str(self.the_object_name) + "';"
-      result_table = Simbad.query_tap(query)
-    except Exception as e:
-      print("Simbad lookup error for " + str(self.the_object_name) + ": " + str(e))
-      #result_table = Simbad.query_tap("SELECT main_id, otype FROM basic WHERE main_id IN ('" + str(self.the_object_name) + "')")
-      query = "SELECT a.main_id, a.otype, b.B, b.V FROM basic AS a JOIN allfluxes AS b ON oidref = oid WHERE a.main_id='" + str(self.the_object_name) + "';"
-      query = "SELECT a.main_id, a.otype, b.B, b.V, galdim_minaxis, galdim_majaxis FROM basic AS a JOIN allfluxes AS b ON b.oidref = oid JOIN ident AS c ON c.oidref = oid WHERE a.main_id='" + str(self.the_object_name) + "';"
-      result_table = Simbad.query_tap(query)
-    if debug:
-      print(result_table)
-      print("Main id: " + str(result_table["main_id"]) + "; " + str(len(result_table["main_id"].pformat())))
-    if len(result_table["main_id"].pformat()) == 2:
-      if debug:
-        print("DSO " + str(self.the_object_name) + " not found.")
-      #sys.exit(0)
-      self.object_type = "NONE"
-    else:
+    self.object_type = entry["otype"] if entry["otype"] is not None else ""
+    self.magnitude = entry["v_mag"] if entry["v_mag"] is not None else -1.0
+    self.major_axis = entry["major_axis"] if entry["major_axis"] is not None else -1.0  # arcmin
+    self.minor_axis = entry["minor_axis"] if entry["minor_axis"] is not None else -1.0  # arcmin
 
-      if debug:
-        print("Query result lentgh: " + str(len(result_table["main_id"].pformat())))
-        print(str(result_table["main_id"].pformat()))
-        print(str(result_table["V"].pformat()))
-        print(str(result_table["galdim_majaxis"].pformat()))
-
-      if len(result_table["main_id"].pformat()) > 0:
-        otype = result_table["otype"].pformat()[2].strip()
-        if otype != "--":
-          self.object_type = otype
-        if debug:
-          print("Main ID: " + str(result_table["main_id"].pformat()[0].strip())) #Main ID: main_id
-          print("Main ID: " + str(result_table["main_id"].pformat()[1].strip())) #Main ID: -------
-          print("Main ID: " + str(result_table["main_id"].pformat()[2].strip())) #Main ID: M   1
-          '''
-          main_id otype         B                 V         galdim_minaxis galdim_majaxis
-                                                              arcmin         arcmin
-          ------- ----- ----------------- ----------------- -------------- --------------
-          M  31   AGN 4.360000133514404 3.440000057220459          70.79         199.53
-          '''
-          print("Brightness B: " + str(result_table["B"].pformat()[2].strip()) + " V: " + str(result_table["V"].pformat()[2].strip()))
-          print("Size: " + str(result_table["galdim_majaxis"].pformat()[2].strip()) + " x " + str(result_table["galdim_minaxis"].pformat()[2].strip()))
-          print("Object type: " + str(self.object_type))
-
-        mag = result_table["V"].pformat()[2].strip()
-        if mag != "--":
-          self.magnitude = float(mag)
-        else:
-          self.magnitude = -1.0
-        majax = result_table["galdim_majaxis"].pformat()[2].strip()  # arcmin
-        if majax != "--":
-          self.major_axis = float(majax)
-        else:
-          self.major_axis = -1.0
-        minax = result_table["galdim_minaxis"].pformat()[2].strip()  # arcmin
-        if minax != "--":
-          self.minor_axis = float(minax)
-        else:
-          self.minor_axis = -1.0
-      else:
-        self.object_type = ""
-        self.magnitude = -1.0
-        self.major_axis = -1.0
-        self.minor_axis = -1.0
-        self.visible = False
-        self.object_type_string = ""
-
-    if self.object_type == "AGN":
-      self.object_type_string = "Active galaxy nucleus"
-    elif self.object_type == "SNR":
-      self.object_type_string = "SuperNova remnant"
-    elif self.object_type == "SFR":
-      self.object_type_string = "Star forming region"
-    elif self.object_type == "SFR":
-      self.object_type_string = "Star forming region"
-    elif self.object_type == "GNe":
-      self.object_type_string = "Nebula"
-    elif self.object_type == "RNe":
-      self.object_type_string = "Reflection nebula"
-    elif self.object_type == "GDNe":
-      self.object_type_string = "Dark cloud (nebula)"
-    elif self.object_type == "MoC":
-      self.object_type_string = "Molecular cloud"
-    elif self.object_type == "IG":
-      self.object_type_string = "Interacting galaxies"
-    elif self.object_type == "PaG":
-      self.object_type_string = "Pair of galaxies"
-    elif self.object_type == "GiP":
-      self.object_type_string = "Galaxy in pair of galaxies"
-    elif self.object_type == "CGG":
-      self.object_type_string = "Compact group of galaxies"
-    elif self.object_type == "CIG":
-      self.object_type_string = "Cluster of galaxies"
-    elif self.object_type == "BH":
-      self.object_type_string = "Black hole"
-    elif self.object_type == "LSB":
-      self.object_type_string = "Low surface brightness galaxy"
-    elif self.object_type == "SBG":
-      self.object_type_string = "Starburst galaxy"
-    elif self.object_type == "H2G":
-      self.object_type_string = "HII galaxy"
-    elif self.object_type == "GGG":
-      self.object_type_string = "Galaxy"
-    elif self.object_type == "Cl":
-      self.object_type_string = "Cluster of stars"
-    elif self.object_type == "GlC":
-      self.object_type_string = "Globular cluster"
-    elif self.object_type == "OpC":
-      self.object_type_string = "Open cluster"
-    elif self.object_type == "Cl*":
-      self.object_type_string = "Open cluster"
-    elif self.object_type == "LIN":
-      self.object_type_string = "LINER-type active galaxy nucleus"
-    elif self.object_type == "SyG":
-      self.object_type_string = "Seyfert galaxy"
-    elif self.object_type == "Sy1":
-      self.object_type_string = "Seyfert 1 galaxy"
-    elif self.object_type == "Sy2":
-      self.object_type_string = "Seyfert 2 galaxy"
-    elif self.object_type == "GiG":
-      self.object_type_string = "Galaxy towards a group of galaxies"
-    elif self.object_type == "As*":
-      self.object_type_string = "Association of stars"
-    elif self.object_type == "PN":
-      self.object_type_string = "Planetary nebula"
-    else:
-      self.object_type_string = ""
+    self.object_type_string = object_type_strings.get(self.object_type, "")
 
-    time = Time(str(self.theDate_american) + " 23:59:00") - utcoffset
     if debug:
+      time = Time(str(self.theDate_american) + " 23:59:00") - utcoffset
       print("Observation time: " + str(time))
 
-    ##############################################################################
-    # `astropy.coordinates.EarthLocation.get_site_names` and
-    # `~astropy.coordinates.EarthLocation.get_site_names` can be used to get
-    # locations of major observatories.
-    #
-    # Use `astropy.coordinates` to find the Alt, Az coordinates of the DSO at as
-    # observed from the current location today
-    self.the_object_altaz = self.the_object.transform_to(AltAz(obstime=time, location=the_location))
-    to_alt = self.the_object_altaz.alt
-    to_az = self.the_object_altaz.az
-    if debug:
+      ##############################################################################
+      # `astropy.coordinates.EarthLocation.get_site_names` and
+      # `~astropy.coordinates.EarthLocation.get_site_names` can be used to get
+      # locations of major observatories.
+      #
+      # Use `astropy.coordinates` to find the Alt, Az coordinates of the DSO at as
+      # observed from the current location today
+      to_alt, to_az = altaz_engine.altaz(self.the_object, AltAz(obstime=time, location=the_location))
       print(str(self.the_object_name) + "'s altitude = " + str(to_alt) + ", azimut = " + str(to_az))
-    direction = sky_utils.compass_direction(to_az.value)
-    if debug:
+      direction = sky_utils.compass_direction(to_az)
       print("Dir@: " + str(time) + ": " + str(direction))
 
     ##############################################################################
@@ -371,12 +403,6 @@ class DSO:
     #
     # Find the alt,az coordinates of the object at 100 times evenly spaced between 10pm
     # and 7am EDT:
-    # +1: otherwise the dso graph does not match the x-axis ticks
-    self.midnight = Time(str(self.tomorrow_american) + " 00:00:00") - utcoffset
-    #self.delta_midnight = np.linspace(-2, 10, 100) * u.hour
-    self.delta_midnight = np.linspace(-12, 12, 1000) * u.hour
-    self.frame_night = AltAz(obstime=self.midnight + self.delta_midnight, location=the_location)
-    self.the_objectaltazs_night = self.the_object.transform_to(self.frame_night)
 
     ##############################################################################
     # convert alt, az to airmass with `~astropy.coordinates.AltAz.secz` attribute:
@@ -392,159 +418,168 @@ class DSO:
       plt.show()
     '''
 
-    ##############################################################################
-    # Use  `~astropy.coordinates.get_sun` to find the location of the Sun at 1000
-    # evenly spaced times between noon on July 12 and noon on July 13:
-    from astropy.coordinates import get_sun
-    self.delta_midnight = np.linspace(-12, 12, 1000) * u.hour
-    self.times_overnight = self.midnight + self.delta_midnight
-    self.frame_over_night = AltAz(obstime=self.times_overnight, location=the_location)
-    self.sunaltazs_over_night = get_sun(self.times_overnight).transform_to(self.frame_over_night)
-
-
-    ##############################################################################
-    # Do the same with `~astropy.coordinates.get_body` to find when the moon is
-    # up. Be aware that this will need to download a 10MB file from the internet
-    # to get a precise location of the moon.
-    from astropy.coordinates import get_body
-    self.moon_over_night = get_body("moon", self.times_overnight)
-    self.moonaltazs_over_night = self.moon_over_night.transform_to(self.frame_over_night)
-
-    self.the_objectaltazs_over_night = self.the_object.transform_to(self.frame_over_night)
+    # row of the night's alt/az matrix if the DSO is part of it, own transform otherwise
+    if night.altaz is not None and self.the_object_name in night.altaz:
+      alt, az = night.altaz.row(self.the_object_name)
+    else:
+      alt, az = altaz_engine.altaz(self.the_object, self.frame_over_night)
+    self.the_objectaltazs_over_night = SkyCoord(alt=alt * u.deg, az=az * u.deg, frame=self.frame_over_night)
+    self.the_objectaltazs_night = self.the_objectaltazs_over_night
     self.visible = False
-    self.max_alt, self.max_alt_direction, self.max_alt_az, self.max_alt_time, self.max_alt_during_night, self.max_alt_during_night_direction, self.max_alt_during_night_obstime, self.visible = self.max_altitudes(self.frame_over_night, self.the_objectaltazs_over_night)
+    self.max_alt, self.max_alt_direction, self.max_alt_az, self.max_alt_time, self.max_alt_during_night, self.max_alt_during_night_direction, self.max_alt_during_night_obstime, self.visible = self.max_altitudes(self.the_objectaltazs_over_night.alt.value, self.the_objectaltazs_over_night.az.value)
 
     # moon data once it is available
     self.score_at_max_alt, self.top_score_at_max_alt, self.sub_text_moon_at_max_alt, self.moon_dir_at_max_alt, self.moon_alt_at_max_alt, self.moon_phase_percent_at_max_alt = self.moon_check_at_max_alt()
 
-  def max_altitudes(self, frame_over_night, the_objectaltazs_over_night):
+  def use_night(self, night):
+    # twilight, time grid, frame and sun/moon tracks are shared by all DSOs of the night
+    self.night = night
+    self.civil_night_start, self.civil_night_end = night.civil_night_start, night.civil_night_end
+    self.nautical_night_start, self.nautical_night_end = night.nautical_night_start, night.nautical_night_end
+    self.astronomical_night_start, self.astronomical_night_end = night.astronomical_night_start, night.astronomical_night_end
+    self.midnight = night.midnight
+    self.delta_midnight = night.delta_midnight
+    self.frame_night = night.frame_over_night
+    self.times_overnight = night.times_overnight
+    self.frame_over_night = night.frame_over_night
+    self.sunaltazs_over_night = night.sunaltazs_over_night
+    self.moonaltazs_over_night = night.moonaltazs_over_night
+
+  def track(self):
+    # alt, az in deg over the night
+    return self.the_objectaltazs_over_night.alt.value, self.the_objectaltazs_over_night.az.value
+
+  def max_altitudes(self, alt, az):
     try:
       if debug:
         print("Check object alt az during night time")
-      dso_in_the_dark_ot = []
-      dso_in_the_dark_alt = []
-      dso_in_the_dark_az = []
-
-      if debug:
         print("Astro night: " + str(self.astronomical_night_start) + "  " + str(self.astronomical_night_end))
-        print("Nautical night: " + str(self.nautical_night_start) + "  " + str(self.nautical_night_start))
-      for o in the_objectaltazs_over_night:
-        dt = o.obstime.tt.datetime
-        #if astronomical_night_start < dt < astronomical_night_end:
-          #print(dt)
-        if self.nautical_night_start < dt < self.nautical_night_end:
-          #if debug:
-          #  print("  " + str(o.obstime) + ": " + str(o.alt) + ", " + str(o.az))
-          dso_in_the_dark_alt.append(o.alt.value)
-          dso_in_the_dark_az.append(o.az.value)
-          dso_in_the_dark_ot.append(o.obstime.tt.datetime)
+        print("Nautical night: " + str(self.nautical_night_start) + "  " + str(self.nautical_night_end))
 
+      # samples during the nautical night, precomputed once per night
+      in_the_dark = self.night.nautical_mask
       if debug:
-        print(len(the_objectaltazs_over_night))
-        print(len(dso_in_the_dark_alt))
-
-      if len(dso_in_the_dark_alt)>0:
-        dso_in_the_dark_alt_max = max(dso_in_the_dark_alt)
-        index_alt_max = dso_in_the_dark_alt.index(dso_in_the_dark_alt_max) #np.argmax(dso_in_the_dark_alt)
+        print(len(alt))
+        print(np.count_nonzero(in_the_dark))
+
+      if in_the_dark.any():
+        index_alt_max, alt_max, alt_max_az, samples_visible, index_alt_max_total = altaz_engine.night_peaks(alt, az, in_the_dark)
+        index_alt_max = index_alt_max[0]
+        self.max_alt_index = index_alt_max
+        dso_in_the_dark_alt_max = float(alt_max[0])
+        dso_in_the_dark_alt_max_az = float(alt_max_az[0])
+        dso_in_the_dark_alt_max_ot = self.night.obstime_datetimes[index_alt_max]
         if debug:
-          print("max: " + str(dso_in_the_dark_alt_max) + " at " + str(dso_in_the_dark_ot[index_alt_max]))
+          print("max: " + str(dso_in_the_dark_alt_max) + " at " + str(dso_in_the_dark_alt_max_ot))
 
         # check whether object is visible during the night
-        visible = False
-        if len(dso_in_the_dark_alt)>0:
-          v = []
-          for a in dso_in_the_dark_alt:
-            if a > 5:
-              v.append(1)
-          if debug:
-            print(len(dso_in_the_dark_alt))
-            print(len(v))
-          if len(v) > 30:
-            visible = True # DSO is visible for at least 30 minutes during the night time
-          else:
-            visible = False
-
+        self.minutes_visible = samples_visible[0] * self.night.sample_minutes
         if debug:
-          print("DSO night max alt: " + str(dso_in_the_dark_alt_max) + " at " + str(dso_in_the_dark_ot[index_alt_max]))
-        dso_in_the_dark_alt_max_az = dso_in_the_dark_az[index_alt_max]
+          print(str(samples_visible[0]) + " samples (" + str(round(self.minutes_visible, 0)) + " min) above 5 deg")
+        if self.minutes_visible > scoring.min_visible_minutes:
+          visible = True # DSO is visible for at least 44 minutes during the night time, whatever the --precision
+        else:
+          visible = False
+
         direction_max_alt = sky_utils.compass_direction(dso_in_the_dark_alt_max_az)
         if debug:
           print("DSO night max alt direction: " + str(direction_max_alt))
 
         # Direction of total max. altitude
-        alt_max_total = max(the_objectaltazs_over_night.alt.value)
-        index_alt_max_total = np.argmax(the_objectaltazs_over_night.alt)
-        direction_max_alt_total = sky_utils.compass_direction(the_objectaltazs_over_night.az[index_alt_max_total].value)
+        index_alt_max_total = index_alt_max_total[0]
+        alt_max_total = float(alt[index_alt_max_total])
+        direction_max_alt_total = sky_utils.compass_direction(az[index_alt_max_total])
+        self.max_alt_during_night_az = float(az[index_alt_max_total])
 
-        alt_max_total_obstime = dso_in_the_dark_ot[index_alt_max] #frame_over_night.obstime[index_alt_max_total]
+        alt_max_total_obstime = dso_in_the_dark_alt_max_ot #frame_over_night.obstime[index_alt_max_total]
         max_alt_txt = "Max. Alt. " + str(round(alt_max_total,2)) + "deg at: " + str(alt_max_total_obstime) + " in " + str(direction_max_alt_total)
         if debug:
           print(max_alt_txt)
       else:
-        return -1, -1, -1, -1, -1, -1, False
-      return dso_in_the_dark_alt_max, direction_max_alt, dso_in_the_dark_alt_max_az, dso_in_the_dark_ot[index_alt_max], alt_max_total, direction_max_alt_total, alt_max_total_obstime, visible
+        self.minutes_visible = 0
+        self.max_alt_index = None
+        self.max_alt_during_night_az = -1
+        return -1, -1, -1, -1, -1, -1, -1, False
+      return dso_in_the_dark_alt_max, direction_max_alt, dso_in_the_dark_alt_max_az, dso_in_the_dark_alt_max_ot, alt_max_total, direction_max_alt_total, alt_max_total_obstime, visible
     except Exception as e:
       print(str(e))
 
-
   def moon_check_at_max_alt(self):
-    score = False
-    top_score = False
-    sub_text = "    "
-
     try:
-      moon_rise, moon_set, full_moon, moon_phase, moon_phase_percent, moon_alt, moon_az, moon_dist = sky_utils.moon_data(self.theDate, self.max_alt_time.strftime("%H:%M"))
+      # moon of the night at the time of the max. altitude, interpolated
+      moon = self.night.moon
+      moon_alt, moon_az, moon_phase_percent, moon_phase = moon.at(self.night.jd[self.max_alt_index])
+      moon_alt, moon_az, moon_phase_percent, moon_phase = round(float(moon_alt),0), round(float(moon_az),0), round(float(moon_phase_percent),2), round(float(moon_phase),0)
       moon_dir = sky_utils.compass_direction(moon_az)
       if debug:
-        print("  Moon rise: " + str(moon_rise) + " set: " + str(moon_set) + " next full moon: " + str(full_moon) + " phase: " + str(moon_phase) + " (" + str(moon_phase_percent) + " %)")
+        print("  Moon rise: " + str(moon.rise) + " set: " + str(moon.set) + " next full moon: " + str(moon.full_moon) + " phase: " + str(moon_phase) + " (" + str(moon_phase_percent) + " %)")
         print("  Moon alt " + str(moon_alt) + " az " + str(moon_az) + " dir " + str(moon_dir))
 
-      if float(moon_alt) < 0:
-        msg = "TOP: Moon < the horizon at " + str(self.max_alt_time.strftime("%d.%m. %H:%M"))
-        if debug:
-          print(msg)
-        score = True
-        top_score = True
-        sub_text += "\n    " + msg
-      if moon_dir != self.max_alt_direction:
-        msg = "OK: Dir moon: " + str(moon_dir) + " (" + str(round(moon_az,0)) + ", alt " + " (" + str(round(moon_alt,0)) + ") " + ", DSO: " + str(self.max_alt_direction) + " (" + str(round(self.max_alt_az,0)) + ")"
-        if debug:
-          print(msg)
-        score = True
-        sub_text += "\n    " + msg
-      if moon_phase_percent < 50:
-        msg = "Nice: Moon illumination < 50 %: " + str(moon_phase_percent) + " %"
-        if debug:
-          print(msg)
-        score = True
-        sub_text += "\n    " + msg
+      # numeric features and score, see scoring
+      features = scoring.night_features(self.night, [self.max_alt_index], [self.max_alt], [self.max_alt_az], prefilter.darkness([self.the_object.ra.deg], [self.the_object.dec.deg], self.night))
+      self.features = dict((key, value[0].item()) for key, value in features.items())
+      if debug:
+        print("  Features: " + str(self.features))
+
+      score, top_score, sub_text = moon_check(self.max_alt_time, self.max_alt_direction, self.max_alt_az, moon_dir, moon_alt, moon_az, moon_phase_percent, self.features)
       return score, top_score, sub_text, moon_dir, moon_alt, moon_phase_percent
     except Exception as e:
       print("Moon check error: " + str(e))
 
+def moon_check(max_alt_time, max_alt_direction, max_alt_az, moon_dir, moon_alt, moon_az, moon_phase_percent, features):
+  # remarks on the moon at the max. altitude of a DSO, see scoring for the features
+  score = False
+  top_score = False
+  sub_text = "    "
+  if features["moon_top"]:
+    msg = "TOP: Moon < the horizon at " + str(max_alt_time.strftime("%d.%m. %H:%M"))
+    if debug:
+      print(msg)
+    score = True
+    top_score = True
+    sub_text += "\n    " + msg
+  if features["moon_separation"] >= scoring.min_moon_separation:
+    msg = "OK: Dir moon: " + str(moon_dir) + " (" + str(round(moon_az,0)) + ", alt " + " (" + str(round(moon_alt,0)) + ") " + ", DSO: " + str(max_alt_direction) + " (" + str(round(max_alt_az,0)) + "), distance " + str(round(features["moon_separation"],0)) + " deg"
+    if debug:
+      print(msg)
+    score = True
+    sub_text += "\n    " + msg
+  if moon_phase_percent < 50:
+    msg = "Nice: Moon illumination < 50 %: " + str(moon_phase_percent) + " %"
+    if debug:
+      print(msg)
+    score = True
+    sub_text += "\n    " + msg
+  return score, top_score, sub_text
+
+# https://htmlcolorcodes.com/color-names/
+# month -> pastel color for inappropriate times, solid color for good times
+month_colors = {"01": ("#C0C0C0", "#708090"), # silver, SlateGray
+                "02": ("#F0F8FF", "#00BFFF"), # aliceblue, DeepSkyBlue
+                "03": ("#FAEBD7", "#D2691E"), # linen, Chocolate
+                "04": ("#FFEBCD", "#A0522D"), # blanchedalmond, Sienna
+                "05": ("#87CEFA", "#4169E1"), # lightskyblue, RoyalBlue
+                "06": ("#AFEEEE", "#00CED1"), # PaleTurquoise, DarkTurquoise
+                "07": ("#98FB98", "#3CB371"), # PaleGreen, MediumSeaGreen
+                "08": ("#FFA07A", "#FFA500"), # LightSalmon, orange
+                "09": ("#CD5C5C", "#DC143C"), # indianred, crimson
+                "10": ("#D8BFD8", "#9932CC"), # Thistle, darkorchid
+                "11": ("#7B68EE", "#191970"), # mediumslateblue, MidnightBlue
+                "12": ("#E6E6FA", "#4B0082")} # Lavender, indigo
+
 def plot(dsolist):
+  # renders the plot of the DSO's months (DSOs or DSOResults with a kept
+  # track), returns its file name (None on errors)
   try:
-    plt.clf()
-    plt.cla()
-    plt.close()
-
-    plt.figure(facecolor='lightgrey')
-    plt.style.use(astropy_mpl_style)
-
-    quantity_support()
-
     sub_text = ""
+    tracks = []
 
     for dso in dsolist:
-      #direction_20, direction_22, direction_0, direction_2, direction_4, direction_6 = dso.observation_night_directions()
-
-      score = False
-      top_score = False
-
-      dso_max_alt = round(max(dso.the_objectaltazs_over_night.alt.value),0)
-      index_alt_max_total = np.argmax(dso.the_objectaltazs_over_night.alt)
-      az = dso.the_objectaltazs_over_night.az[index_alt_max_total].value
-      direction_max_alt_total = sky_utils.compass_direction(az)
+      # overall max. altitude and its direction, see month_results
+      alt, dso_az = dso.track()
+      dso_max_alt = round(dso.max_alt_during_night,0)
+      az = dso.max_alt_during_night_az
+      direction_max_alt_total = dso.max_alt_during_night_direction
       if debug:
         print("  max alt: " + str(dso_max_alt) + " at " + str(dso.max_alt_time.strftime("%H:%M")) + " in " + str(direction_max_alt_total) + " (" + str(round(az,0)) + ")")
 
@@ -555,73 +590,14 @@ def plot(dsolist):
           print("DSO " + str(dso.the_object_name) + " appears during the astronomical night. Max. alt " + str(dso_max_alt) + " is reached at " + str(dso.max_alt_time.strftime("%H:%M")))
           print("Astronomical night: " + str(dso.astronomical_night_start.strftime("%H:%M")) + " - " + str(dso.astronomical_night_end.strftime("%H:%M")))
         sub_text += "\n\n" + str(dso.the_object_name) + " max. altitude " + str(dso_max_alt) + " is reached at " + str(dso.max_alt_time.strftime("%d.%m.%Y %H:%M")) + " in " + str(direction_max_alt_total) + " (" + str(round(az,0)) + ")"
-
-        # consider moon phase/illumination/position
-        #score, top_score, sub_text_moon = moon_check(dso, direction_max_alt_total)
       sub_text += dso.sub_text_moon_at_max_alt
 
-      ##############################################################################
-      # Make a beautiful figure illustrating nighttime and the altitudes of the DSO and
-      # the Sun over that time:
       if debug:
         print("Plot " + str(dso.theDate))
 
       # use solid colours for good times, pastel colors for inappropriate times
-
-      #https://htmlcolorcodes.com/color-names/
-      # https://matplotlib.org/stable/api/_as_gen/matplotlib.pyplot.scatter.html
-      if ".01." in dso.theDate:
-        color_code = "#C0C0C0" # silver
-        if dso.score_at_max_alt:
-          color_code = "#708090" # SlateGray
-      elif ".02." in dso.theDate:
-        color_code = "#F0F8FF" # aliceblue
-        if dso.score_at_max_alt:
-          color_code = "#00BFFF" # DeepSkyBlue
-      elif ".03." in dso.theDate:
-        color_code = "#FAEBD7" # linen
-        if dso.score_at_max_alt:
-          color_code = "#D2691E" # Chocolate
-      elif ".04." in dso.theDate:
-        color_code = "#FFEBCD" # blanchedalmond
-        if dso.score_at_max_alt:
-          color_code = "#A0522D" # Sienna
-      elif ".05." in dso.theDate:
-        color_code = "#87CEFA" # lightskyblue
-        if dso.score_at_max_alt:
-          color_code = "#4169E1" # RoyalBlue
-      elif ".06." in dso.theDate:
-        color_code = "#AFEEEE" # PaleTurquoise
-        if dso.score_at_max_alt:
-          color_code = "#00CED1" # DarkTurquoise
-      elif ".07." in dso.theDate:
-        color_code = "#98FB98" # PaleGreen
-        if dso.score_at_max_alt:
-          color_code = "#3CB371" # MediumSeaGreen
-      elif ".08." in dso.theDate:
-        color_code = "#FFA07A" # LightSalmon
-        if dso.score_at_max_alt:
-          color_code = "#FFA500" # orange
-      elif ".09." in dso.theDate:
-        color_code = "#CD5C5C" # indianred
-        if dso.score_at_max_alt:
-          color_code = "#DC143C" # crimson
-      elif ".10." in dso.theDate:
-        color_code = "#D8BFD8" # Thistle
-        if dso.score_at_max_alt:
-          color_code = "#9932CC" # darkorchid
-      elif ".11." in dso.theDate:
-        color_code = "#7B68EE" # mediumslateblue
-        if dso.score_at_max_alt:
-          color_code = "#191970" # MidnightBlue
-      elif ".12." in dso.theDate:
-        color_code = "#E6E6FA" # Lavender
-        if dso.score_at_max_alt:
-          color_code = "#4B0082" # indigo
-      else:
-        color_code = "#FFFACD" # LemonChiffon
-        if dso.score_at_max_alt:
-          color_code = "#9ACD32" # yellowgreen
+      colors = month_colors.get(dso.theDate[3:5], ("#FFFACD", "#9ACD32")) # LemonChiffon, yellowgreen
+      color_code = colors[1] if dso.score_at_max_alt else colors[0]
 
       label_text = str(dso.max_alt_time.strftime("%d.%m"))
       if dso.top_score_at_max_alt:
@@ -629,171 +605,554 @@ def plot(dsolist):
       alpha_value = 1
       if not dso.top_score_at_max_alt:
         alpha_value = 0.3
-      plt.scatter(
-          dso.delta_midnight,
-          dso.the_objectaltazs_over_night.alt,
-          #c=dso.the_objectaltazs_over_night.az.value,
-          c=color_code,
-          label=label_text,
-          linewidths=0,
-          s=8,
-          alpha=alpha_value)
-      #if len(sub_text)>0:
-      #  plt.figtext(0.1,-0.5, sub_text, ha="center", va="baseline", fontsize=10, bbox={"facecolor":"lightyellow", "alpha":0.5, "pad":5})
-      #  #plt.text(0.5,0.5, sub_text, fontsize=10)
+      tracks.append((alt, color_code, alpha_value, label_text))
     print(sub_text)
 
-    '''
-    plt.fill_between(
-        dso.delta_midnight,
-        0 * u.deg,
-        90 * u.deg,
-        dso.sunaltazs_over_night.alt < 7 * u.deg,
-        color="0.55",
-        zorder=0,)  # twilight time
-    plt.fill_between(
-        dso.delta_midnight,
-        0 * u.deg,
-        90 * u.deg,
-        dso.sunaltazs_over_night.alt < -13 * u.deg,
-        color="0.35",
-        zorder=0,)  # night time
-    plt.fill_between(
-        dso.delta_midnight,
-        0 * u.deg,
-        90 * u.deg,
-        dso.sunaltazs_over_night.alt < -19 * u.deg,
-        color="k",
-        zorder=0,)
-    '''
-
     the_year_format = dso.today.strftime("%Y")
-    plt.title(str(dso.the_object_name) + " " + str(the_year_format)) # + ": " + str(direction_20) + "-" + str(direction_22) + "-" + str(direction_0) + "-" + str(direction_2) + "-" + str(direction_4) + "-" + str(direction_6))
-    plt.colorbar().set_label("Azimuth [deg]")
-    plt.legend(loc="upper center", fontsize="small", ncol=3)
-    # x-axis labels
-    xt = (np.arange(13) * 2 - 12)
-    plt.xlim(-12 * u.hour, 12 * u.hour)
-    plt.xticks(xt * u.hour)
-    for i in range(len(xt)):
-      if xt[i]+24 < 24:
-        xt[i] = xt[i]+24
-      else:
-        xt[i] = xt[i]
-    labels = [item.get_text() for item in plt.gca().get_xticklabels()]
-    for i in range(len(labels)):
-      labels[i] = xt[i]
-    # replace x-axis labels by actual hours
-    plt.gca().set_xticklabels(labels)
-
-    plt.ylim(0 * u.deg, 90 * u.deg)
-    plt.xlabel("Hours from Midnight") # EDT: Eastern Daylight Time
-    plt.ylabel("Altitude [deg]")
-
     plot_name = base_dir + "DSO_" + str(dso.the_object_name) + "_" + str(the_year_format) + ".png"
-    if platform.system() == "Linux":
-      if os.path.isdir(base_dir):
-        plot_name = base_dir + "DSO_" + str(dso.the_object_name) + "_" + str(the_year_format) + ".png"
-    if plot_name != "":
-      plt.savefig(plot_name)
-      if debug:
-        print("Saved: " + str(plot_name))
-    else:
-      print("Plot name missing on " + str(platform.system()) + " . Nothing saved.")
-    #plt.show()
+    plot_renderer.render(plot_name, str(dso.the_object_name) + " " + str(the_year_format), tracks)
+    return plot_name
   except Exception as e:
     print("DSO observation night plotting error " + str(dso.the_object_name) + ": " + str(e))
+    return None
+
+def best_night_text(dso_name, best, year):
+  if best["quality"] <= 0:
+    return str(dso_name) + " is not visible during the night in " + str(year)
+  text = str(dso_name) + " best night: " + str(best["time"].strftime("%d.%m.%Y %H:%M")) + ", " + str(round(best["alt"], 0)) + " in " + str(best["direction"]) + " (" + str(round(best["az"], 0)) + ")"
+  if best["moon_alt"] < 0:
+    text += ", moon below the horizon"
+  else:
+    text += ", moon " + str(round(best["moon_illumination"], 0)) + " % at " + str(round(best["moon_separation"], 0)) + " deg distance"
+  text += ", " + str(round(best["dark_minutes"], 0)) + " min above " + str(scoring.min_altitude) + " deg in the dark that night"
+  return text
+
+def init_worker(state):
+  # process pool worker: same settings as the main process, own database connection
+  global catalogue, result_store
+  globals().update(state)
+  for module in [catalogue_store, catalogue_resolver, night_context, altaz_engine, year_grid, ephemeris_cache, moon_ephemeris, scoring, dso_result, catalogue_file, prefilter, metrics, result_cache, plot_renderer, atlas, result_export, sites, night_sampling]:
+    module.debug = state["debug"]
+  ephemeris_cache.cache_dir = base_dir + ephemeris_cache.default_dir
+  altaz_engine.engine = options.engine
+  night_sampling.sampling = options.sampling
+  if options.precision:
+    night_context.samples = int(round(24 * 60 / options.precision)) + 1
+  catalogue = catalogue_store.CatalogueStore(base_dir + catalogue_store.default_path)
+  result_store = None
+  if not options.no_result_cache:
+    result_store = result_cache.ResultCache(base_dir + result_cache.default_path)
+  if "best_months" in state:
+    attach_tracks(best_months, state["best_tracks"])
+
+def month_results(names):
+  # name -> DSOResults of the first night of every month with the alt/az
+  # track and the overall max. altitude for the plots: peak search and
+  # scoring of all names at once on the month's alt/az matrix instead of 12
+  # DSO objects per name. Months without a nautical night have no result
+  results = dict((name, []) for name in names)
+  for the_month in range(1, 13):
+    the_day = today.replace(day=1, month=the_month, year=int(theYear))
+    night = night_context.get(the_day, the_location, utcoffset)
+    if not night.nautical_mask.any():
+      continue
+    matrix = night.objects_altaz(names, entries)
+    month_names = [n for n in names if n in matrix]
+    rows = [matrix.index[catalogue_store.normalize_name(n)] for n in month_names]
+    alt, az = matrix.alt[rows], matrix.az[rows]
+    with metrics.stage("peaks"):
+      peaks = altaz_engine.night_peaks(alt, az, night.nautical_mask)
+    evaluated = peak_results(night, month_names, entries, peaks[:4])
+    index_total = peaks[4]
+    tracks = dso_result.TrackStore(len(night.jd), len(month_names))
+    for k, name in enumerate(month_names):
+      evaluated[name].max_alt_during_night = float(alt[k, index_total[k]])
+      evaluated[name].max_alt_during_night_az = float(az[k, index_total[k]])
+      evaluated[name].max_alt_during_night_direction = sky_utils.compass_direction(evaluated[name].max_alt_during_night_az)
+      evaluated[name].tracks = tracks
+      evaluated[name].track_index = tracks.add(alt[k], az[k])
+      results[name].append(evaluated[name])
+  return results
+
+def attach_tracks(months, month_tracks):
+  # month_results pickled for a spawned worker lost their tracks (see
+  # DSOResult), month_tracks: name -> (alt, az) per result
+  tracks = None
+  for name, results in months.items():
+    for result, (alt, az) in zip(results, month_tracks[name]):
+      if result.tracks is None:
+        if tracks is None:
+          tracks = dso_result.TrackStore(len(alt), sum(len(r) for r in months.values()))
+        result.tracks = tracks
+        result.track_index = tracks.add(alt, az)
+
+best_months = {}  # name -> month_results of the catalogue-wide --best run
+
+def best_worker(dso_name):
+  # per DSO work of a catalogue-wide --best run: plot of the monthly results and best night
+  output = io.StringIO()
+  try:
+    with contextlib.redirect_stdout(output):
+      if dso_name not in entries or not entries[dso_name]["resolved"]:
+        raise ValueError("DSO " + str(dso_name) + " could not be resolved")
+      if dso_name not in best_months:
+        best_months.update(month_results(resolved_DSO_list))
+      months = best_months[dso_name]
+      if len(months) == 0:
+        raise ValueError("No nautical night in " + str(theYear))
+      plot_name = plot(months)
+
+      grid = year_grid.get(theYear, the_location, utcoffset)
+      result = months[0]
+      best = grid.best_night(result.ra, result.dec)
+      text = best_night_text(result.the_object_name, best, theYear)
+      print(text)
+    # summary for the atlas
+    summary = dict(name=result.the_object_name, type=result.object_type_string, magnitude=result.magnitude, major_axis=result.major_axis, minor_axis=result.minor_axis, best=best, plot=plot_name, text=text)
+    return dso_name, summary, output.getvalue(), None
+  except Exception as e:
+    return dso_name, None, output.getvalue(), str(e)
+
+def tonight_worker(dso_name):
+  # per DSO work of a --tonight run, only the compact result is kept. Returns
+  # it with its result cache item (None without cache), the run puts them at once
+  output = io.StringIO()
+  try:
+    with contextlib.redirect_stdout(output):
+      print("Check DSO: " + str(dso_name))
+      night = night_context.get(today, the_location, utcoffset)
+      night.objects_altaz(resolved_DSO_list, entries)
+      dso = DSO(dso_name, today, tomorrow, entries.get(dso_name), night)
+      result = dso_result.DSOResult.from_dso(dso, result_tracks)
+      cache_item = None
+      if result_store is not None and dso_name in entries and entries[dso_name]["resolved"]:
+        alt, az = dso.track()
+        cache_item = (result_key(entries[dso_name], night), result, np.asarray(alt, dtype=np.float32), np.asarray(az, dtype=np.float32))
+    return dso_name, (result, cache_item), output.getvalue(), None
+  except Exception as e:
+    return dso_name, None, output.getvalue(), str(e)
+
+def prefilter_entries(night, entry_list, names=None):
+  # catalogue entries worth an alt/az evaluation and invisible results with
+  # the reason for the others, see prefilter. names: the run's spelling of
+  # the entries' DSOs (the store normalizes them), default the entry names
+  if len(entry_list) == 0:
+    return [], []
+  if names is None:
+    names = [e["name"] for e in entry_list]
+  keep, max_alt, reasons = prefilter.check([e["ra"] for e in entry_list], [e["dec"] for e in entry_list], night)
+  kept = [e for k, e in enumerate(entry_list) if keep[k]]
+  invisible = [dso_result.DSOResult.from_entry(e, night, object_type_strings.get(e["otype"], ""), the_object_name=names[k], max_alt=float(max_alt[k]), visible=False, reason=reasons[k])
+               for k, e in enumerate(entry_list) if not keep[k]]
+  return kept, invisible
+
+def peak_results(night, names, name_entries, peaks):
+  # name -> DSOResult from the peaks of names in the nautical night (index,
+  # altitude, azimuth, samples above 5 deg, see altaz_engine.night_peaks):
+  # scoring and moon remarks
+  index, alt_max, az_max, above = peaks
+  with metrics.stage("scoring"):
+    dark = prefilter.darkness([name_entries[n]["ra"] for n in names], [name_entries[n]["dec"] for n in names], night)
+    features = scoring.night_features(night, index, alt_max, az_max, dark)
+    moon_alt, moon_az, moon_phase_percent, moon_phase = night.moon.at(night.jd[index])
+  evaluated = {}
+  for k, name in enumerate(names):
+    entry = name_entries[name]
+    dso_features = dict((key, value[k].item()) for key, value in features.items())
+    max_alt_time = night.obstime_datetimes[index[k]]
+    max_alt_direction = sky_utils.compass_direction(az_max[k])
+    moon_dir = sky_utils.compass_direction(round(float(moon_az[k]),0))
+    score, top_score, sub_text = moon_check(max_alt_time, max_alt_direction, float(az_max[k]), moon_dir, round(float(moon_alt[k]),0), round(float(moon_az[k]),0), round(float(moon_phase_percent[k]),2), dso_features)
+    evaluated[name] = dso_result.DSOResult.from_entry(entry, night, object_type_strings.get(entry["otype"], ""), the_object_name=name,
+                      max_alt=float(alt_max[k]), max_alt_direction=max_alt_direction, max_alt_az=float(az_max[k]), max_alt_time=max_alt_time, max_alt_index=int(index[k]),
+                      minutes_visible=above[k] * night.sample_minutes, visible=bool(above[k] * night.sample_minutes > scoring.min_visible_minutes),
+                      score_at_max_alt=score, top_score_at_max_alt=top_score, sub_text_moon_at_max_alt=sub_text,
+                      moon_dir_at_max_alt=moon_dir, moon_alt_at_max_alt=round(float(moon_alt[k]),0), moon_phase_percent_at_max_alt=round(float(moon_phase_percent[k]),2),
+                      features=dso_features)
+  return evaluated
+
+def evaluate_chunk(night, chunk):
+  # tonight evaluation of catalogue file entries without DSO objects: pre-filter,
+  # one alt/az matrix, peak search and scoring for the whole chunk, a compact
+  # result per DSO
+  if not night.nautical_mask.any():
+    print("No nautical night at " + str(night.theDate))
+    return []
+  # results of earlier runs with the same inputs first, pre-filtered ones
+  # included, see result_cache
+  chunk_entries = dict((e["name"], e) for e in chunk)
+  evaluated = cached_results(night, [e["name"] for e in chunk], chunk_entries)
+  with metrics.stage("prefilter"):
+    kept, invisible = prefilter_entries(night, [e for e in chunk if e["name"] not in evaluated])
+  evaluated.update(prefiltered_results(night, invisible, chunk_entries))
+  if len(kept) > 0:
+    names = [e["name"] for e in kept if e["resolved"]]
+    evaluated.update(sampled_results(night, names, chunk_entries))
+  # pre-filtered DSOs first, then the evaluated ones
+  results = [evaluated[e["name"]] for e in chunk if e["name"] in evaluated and evaluated[e["name"]].reason]
+  results += [evaluated[e["name"]] for e in chunk if e["name"] in evaluated and not evaluated[e["name"]].reason]
+  return results
+
+def prefiltered_results(night, results, name_entries):
+  # name -> DSOResult of pre-filtered results (see prefilter_entries), put
+  # into the result cache like the evaluated ones
+  if result_store is not None and len(results) > 0:
+    with metrics.stage("result_cache"):
+      result_store.put_many([(result_key(name_entries[result.the_object_name], night), result, None, None) for result in results])
+  return dict((result.the_object_name, result) for result in results)
+
+def sampled_results(night, names, name_entries):
+  # name -> DSOResult of resolved names with the --sampling mode, put into the
+  # result cache. With result_tracks (--export_tracks) the results keep their
+  # tracks in it
+  if night_sampling.sampling == "adaptive":
+    # night-only samples, the tracks are computed where they are needed
+    peaks = night_sampling.peaks([name_entries[n]["ra"] for n in names], [name_entries[n]["dec"] for n in names], night)
+    tracks = [(None, None)] * len(names)
+    if result_tracks is not None and len(names) > 0:
+      with metrics.stage("altaz"):
+        matrix = altaz_engine.from_entries(names, name_entries, night.frame_over_night)
+      tracks = list(zip(matrix.alt, matrix.az))
+  else:
+    with metrics.stage("altaz"):
+      matrix = altaz_engine.from_entries(names, name_entries, night.frame_over_night)
+    with metrics.stage("peaks"):
+      peaks = altaz_engine.night_peaks(matrix.alt, matrix.az, night.nautical_mask)[:4]
+    tracks = list(zip(matrix.alt, matrix.az))
+  evaluated = peak_results(night, names, name_entries, peaks)
+  if result_tracks is not None:
+    for k, name in enumerate(names):
+      evaluated[name].tracks = result_tracks
+      evaluated[name].track_index = result_tracks.add(tracks[k][0], tracks[k][1])
+  if result_store is not None:
+    cache_items = [(result_key(name_entries[name], night), evaluated[name], tracks[k][0], tracks[k][1]) for k, name in enumerate(names)]
+    with metrics.stage("result_cache"):
+      result_store.put_many(cache_items)
+  return evaluated
+
+def result_key(entry, night):
+  return result_cache.key(entry, night, options.catalogue, options.engine)
+
+def cached_results(night, names, name_entries=None):
+  # name -> DSOResult of earlier runs for this night with the same inputs,
+  # name_entries: catalogue entries of names, default the resolved entries
+  if result_store is None:
+    return {}
+  if name_entries is None:
+    name_entries = entries
+  keys = dict((result_key(name_entries[n], night), n) for n in names if n in name_entries and name_entries[n]["resolved"])
+  with metrics.stage("result_cache"):
+    found = result_store.get_many(keys, result_tracks, keys)
+  return dict((keys[k], result) for k, result in found.items())
+
+def run_jobs(worker, names):
+  # runs worker for every DSO, in a process pool with --jobs > 1. Results and
+  # output come back in the order of names, a failing DSO does not stop the others.
+  if options.jobs > 1 and len(names) > 1:
+    with concurrent.futures.ProcessPoolExecutor(max_workers=options.jobs, initializer=init_worker, initargs=(worker_state,)) as executor:
+      for dso_name, result, output, error in executor.map(worker, names):
+        sys.stdout.write(output)
+        if error is not None:
+          print("DSO observation planning error " + str(dso_name) + ": " + str(error))
+        elif result is not None:
+          yield result
+  else:
+    for dso_name in names:
+      dso_name, result, output, error = worker(dso_name)
+      sys.stdout.write(output)
+      if error is not None:
+        print("DSO observation planning error " + str(dso_name) + ": " + str(error))
+      elif result is not None:
+        yield result
 
 def is_summertime(dt, timeZone):
    aware_dt = timeZone.localize(dt)
    return aware_dt.dst() != datetime.timedelta(0,0)
 
-def sort_DSOs(dso_list):
+def current_utcoffset():
+  # MEZ assumed (UTC+1/2)
+  timeZone = pytz.timezone(config.coordinates["timezone"])
+  if is_summertime(datetime.datetime.now(), timeZone):
+    return +2 * u.hour  # +2 summertime, +1 wintertime
+  return +1 * u.hour
+
+def compare_sites(site_list, names, site_results, settings=None):
+  # text: the DSOs grouped by the site where they score best, with their
+  # scores at the other sites; site_results: name -> DSOResult per site
+  if settings is None:
+    settings = options
+  best = [[] for site in site_list]
+  invisible = []
+  for name in names:
+    candidates = []
+    for s, results in enumerate(site_results):
+      result = results.get(name)
+      if result is None or not result.visible or result.features["score"] < settings.min_score:
+        continue
+      if settings.moon and not result.features["moon_top" if settings.justthetopones else "moon_ok"]:
+        continue
+      if settings.direction != None and str(settings.direction) not in str(result.max_alt_direction):
+        continue
+      candidates.append((result.features["score"], result.max_alt, s))
+    if len(candidates) == 0:
+      invisible.append(name)
+    else:
+      best[max(candidates)[2]].append((max(candidates), name, candidates))
+  text = ""
+  for s, site in enumerate(site_list):
+    visible = sum(1 for result in site_results[s].values() if result.visible)
+    text += "\n\n" + site["name"] + ": best site for " + str(len(best[s])) + " DSOs (" + str(visible) + " visible)"
+    for (score, max_alt, k), name, candidates in sorted(best[s], key=lambda x: -x[0][0]):
+      result = site_results[s][name]
+      text += "\n  " + str(name) + ": " + str(round(result.max_alt,0)) + " in " + str(result.max_alt_direction) + " at " + str(result.max_alt_time.strftime("%H:%M")) + ", score " + str(round(score,2))
+      others = [site_list[k]["name"] + " " + str(round(other,2)) for other, other_alt, k in sorted(candidates, reverse=True) if k != s]
+      if len(others) > 0:
+        text += " (" + ", ".join(others) + ")"
+  text += "\n\nNot visible at any site:"
+  text += "\n  " + ", ".join(str(name) for name in invisible) if len(invisible) > 0 else " none"
+  return text
+
+def sort_DSOs(dso_list, settings=None):
+  # settings: tonight options (moon, justthetopones, direction, min_score,
+  # order), default the command line options
+  if settings is None:
+    settings = options
+  # pre-filtered DSOs are invisible without a max. altitude time
+  prefiltered_dsos = [dso for dso in dso_list if getattr(dso, "reason", None)]
   # sort by max. altitude time
-  dsol = sorted(dso_list, key=lambda x: x.max_alt_time)
+  dsol = sorted([dso for dso in dso_list if not getattr(dso, "reason", None)], key=lambda x: x.max_alt_time)
   if debug:
     print("\n\n\n")
     print("Sorted by max. altitude time:")
 
+  # filters on the numeric features of all DSOs at once, see scoring
+  selected = np.array([dso.features["score"] for dso in dsol], dtype=float) >= settings.min_score
+  if settings.moon:
+    if settings.justthetopones:
+      selected &= np.array([dso.features["moon_top"] for dso in dsol], dtype=bool)
+    else:
+      selected &= np.array([dso.features["moon_ok"] for dso in dsol], dtype=bool)
+  if settings.direction != None:
+    selected &= np.array([str(settings.direction) in str(dso.max_alt_direction) for dso in dsol], dtype=bool)
+
   astronomical_night_start, astronomical_night_end = "",""
   nautical_night_start, nautical_night_end = "", ""
   astronomical_night_dsos = []
   nautical_night_dsos = []
   invisible_dsos = []
-  for dso in dsol:
+  for dso, dso_selected in zip(dsol, selected):
     dt = dso.max_alt_time
     astronomical_night_start = dso.astronomical_night_start
     astronomical_night_end = dso.astronomical_night_end
     nautical_night_start = dso.nautical_night_start
     nautical_night_end = dso.nautical_night_end
 
-    if options.moon:
+    if settings.moon:
       if debug:
-        print("###" + str(dso.score_at_max_alt) + ", " + str(dso.top_score_at_max_alt) + ", " + str(dso.sub_text_moon_at_max_alt))
+        print("###" + str(dso.score_at_max_alt) + ", " + str(dso.top_score_at_max_alt) + ", " + str(dso.features))
 
     if dso.max_alt > 0:
       if dso.astronomical_night_start < dt < dso.astronomical_night_end:
-        #dso_max_alt = round(max(dso.the_objectaltazs_over_night.alt.value),0)
-        #index_alt_max_total = np.argmax(dso.the_objectaltazs_over_night.alt)
-        #az = dso.the_objectaltazs_over_night.az[index_alt_max_total].value
-        #direction_max_alt_total = sky_utils.compass_direction(az)
         if debug:
           print(dso.the_object_name + ": " + str(dso.max_alt) + " in " + str(dso.max_alt_direction) + " at " + str(dso.max_alt_time) + " (astronomical night)")
-        if options.moon:
-          if options.justthetopones:
-            if "TOP" in dso.sub_text_moon_at_max_alt:
-              if options.direction != None:
-                if str(options.direction) in str(dso.max_alt_direction):
-                  astronomical_night_dsos.append(dso)
-              else:
-                astronomical_night_dsos.append(dso)
-          else:
-            if "TOP" in dso.sub_text_moon_at_max_alt or "OK" in dso.sub_text_moon_at_max_alt:
-              if options.direction != None:
-                if str(options.direction) in str(dso.max_alt_direction):
-                  astronomical_night_dsos.append(dso)
-              else:
-                astronomical_night_dsos.append(dso)
-        else:
-          if options.direction != None:
-            if str(options.direction) in str(dso.max_alt_direction):
-              astronomical_night_dsos.append(dso)
-          else:
-            astronomical_night_dsos.append(dso)
+        if dso_selected:
+          astronomical_night_dsos.append(dso)
       elif dso.nautical_night_start < dt < dso.nautical_night_end:
         if debug:
           print(dso.the_object_name + ": " + str(dso.max_alt) + " in " + str(dso.max_alt_direction) + " at " + str(dso.max_alt_time) + " (nautical night)")
-        if options.moon:
-          if options.justthetopones:
-            if "TOP" in dso.sub_text_moon_at_max_alt:
-              if options.direction != None :
-                if str(options.direction) in str(dso.max_alt_direction):
-                  nautical_night_dsos.append(dso)
-              else:
-                nautical_night_dsos.append(dso)
-          else:
-            if "TOP" in dso.sub_text_moon_at_max_alt or "OK" in dso.sub_text_moon_at_max_alt:
-              if options.direction != None:
-                if str(options.direction) in str(dso.max_alt_direction):
-                  nautical_night_dsos.append(dso)
-              else:
-                nautical_night_dsos.append(dso)
-        else:
-          if options.direction != None:
-            if str(options.direction) in str(dso.max_alt_direction):
-              nautical_night_dsos.append(dso)
-          else:
-            nautical_night_dsos.append(dso)
+        if dso_selected:
+          nautical_night_dsos.append(dso)
     else:
       if debug:
         print("Invisible DSO: " + str(dso.the_object_name))
       invisible_dsos.append(dso)
 
+  invisible_dsos += prefiltered_dsos
+
+  if settings.order == "score":
+    astronomical_night_dsos.sort(key=lambda x: -x.features["score"])
+    nautical_night_dsos.sort(key=lambda x: -x.features["score"])
+
   if debug:
     print("Astronomical night: " + str(astronomical_night_start) + " - " + str(astronomical_night_end))
     print("Nautical night: " + str(nautical_night_start) + " - " + str(nautical_night_end))
   return astronomical_night_start, astronomical_night_end, astronomical_night_dsos, nautical_night_start, nautical_night_end, nautical_night_dsos, invisible_dsos
 
+def iso(value):
+  return value.isoformat() if value else None
+
+def query_flag(params, name, default):
+  if name not in params:
+    return default
+  return str(params[name]).lower() in ["1", "true", "yes", "on"]
+
+def query_date(params):
+  # night of a daemon query, date=dd.mm.yyyy, default today
+  if "date" not in params:
+    return datetime.date.today()
+  try:
+    return datetime.datetime.strptime(params["date"], "%d.%m.%Y").date()
+  except ValueError:
+    raise ValueError("Invalid date " + str(params["date"]) + ", expected dd.mm.yyyy")
+
+def query_settings(params):
+  # tonight options of a daemon query, defaults from the command line
+  settings = copy.copy(options)
+  settings.moon = query_flag(params, "moon", options.moon)
+  settings.justthetopones = query_flag(params, "top", options.justthetopones)
+  settings.direction = params.get("direction", options.direction)
+  settings.order = params.get("order", options.order)
+  if settings.order not in ["time", "score"]:
+    raise ValueError("Invalid order " + str(settings.order) + ", expected time or score")
+  try:
+    settings.min_score = float(params.get("min_score", options.min_score))
+  except ValueError:
+    raise ValueError("Invalid min_score " + str(params["min_score"]))
+  return settings
+
+def query_entry(params):
+  # catalogue entry of dso=<name>, resolved via the catalogue store
+  if "dso" not in params:
+    raise ValueError("Missing parameter dso")
+  name = str(params["dso"]).upper()
+  if name not in entries:
+    failed = []
+    with metrics.stage("resolve"):
+      entries.update(catalogue_resolver.resolve([name], catalogue, query_tap, failed))
+      if len(failed) > 0:
+        entries[name] = catalogue_resolver.lookup(name, catalogue, simbad_lookup)
+  if name not in entries or not entries[name]["resolved"]:
+    raise ValueError("Unknown DSO " + str(name))
+  return entries[name]
+
+def best_dict(name, best):
+  values = dict(best)
+  values["name"] = name
+  values["night"] = iso(best["night"])
+  values["time"] = iso(best["time"])
+  values["direction"] = str(best["direction"])
+  return values
+
+def daemon_tonight(params):
+  # /tonight?date=&moon=&top=&direction=&min_score=&order=
+  settings = query_settings(params)
+  night = night_context.get(query_date(params), the_location, current_utcoffset())
+  # the results do not depend on the query settings, only the selection does
+  metrics.hit("tonight_results", night in daemon_results)
+  if night not in daemon_results:
+    daemon_results[night] = evaluate_chunk(night, daemon_entries)
+    if result_store is not None:
+      result_store.evict()
+  return tonight_report(night, daemon_results[night], settings)
+
+def tonight_report(night, dso_list, settings=None):
+  # JSON serializable nautical, astronomical and invisible DSOs of a night
+  with metrics.stage("sort"):
+    astronomical_night_start, astronomical_night_end, astronomical_night_dsos, nautical_night_start, nautical_night_end, nautical_night_dsos, invisible_dsos = sort_DSOs(dso_list, settings)
+  return dict(date=night.theDate, location=str(options.location), latitude=the_location.lat.deg, longitude=the_location.lon.deg, elevation=the_location.height.to_value(u.m),
+              catalogue=str(options.catalogue),
+              nautical_night=dict(start=iso(night.nautical_night_start), end=iso(night.nautical_night_end)),
+              astronomical_night=dict(start=iso(night.astronomical_night_start), end=iso(night.astronomical_night_end)),
+              nautical=[dso.to_dict() for dso in nautical_night_dsos],
+              astronomical=[dso.to_dict() for dso in astronomical_night_dsos],
+              invisible=[dso.to_dict() for dso in invisible_dsos])
+
+def daemon_best(params):
+  # /best?dso=&year=, the best night of one DSO or of all catalogue DSOs
+  year = int(params.get("year", query_date(params).year))
+  grid = year_grid.get(year, the_location, current_utcoffset())
+  selected = [query_entry(params)] if "dso" in params else daemon_entries
+  with metrics.stage("best_night"):
+    best = [best_dict(e["name"], grid.best_night(e["ra"], e["dec"])) for e in selected]
+  return dict(year=year, location=str(options.location), catalogue=str(options.catalogue), best=best)
+
+def daemon_object(params):
+  # /object?dso=&date=, tonight's result and the best night of the year of one DSO
+  entry = query_entry(params)
+  the_day = query_date(params)
+  night = night_context.get(the_day, the_location, current_utcoffset())
+  results = evaluate_chunk(night, [entry])
+  grid = year_grid.get(the_day.year, the_location, current_utcoffset())
+  with metrics.stage("best_night"):
+    best = best_dict(entry["name"], grid.best_night(entry["ra"], entry["dec"]))
+  return dict(date=night.theDate, location=str(options.location), tonight=results[0].to_dict() if len(results) > 0 else None, best=best)
+
+# the daemon runs for months and the clients choose the dates: it keeps the
+# least recently used nights and year grids only, the results of a night go
+# with its NightContext
+daemon_nights = 16
+daemon_years = 3
+daemon_results = weakref.WeakKeyDictionary()  # NightContext -> results of the daemon catalogue
+
+def catalogue_entries():
+  # all catalogue entries of the run, a catalogue file is read completely.
+  # Named DSOs keep the run's spelling (the store normalizes the names)
+  if options.catalogue_file:
+    file_entries = []
+    for chunk in catalogue_file.read_chunks(options.catalogue_file, options.chunk_size):
+      file_entries.extend(chunk)
+    return file_entries
+  return [dict(entries[n], name=n) for n in resolved_DSO_list if n in entries]
+
+def serve_daemon():
+  # the catalogue stays in memory, nights and year grids are cached by their modules
+  global daemon_entries
+  daemon_entries = catalogue_entries()
+  night_context.max_contexts = daemon_nights
+  year_grid.max_grids = daemon_years
+  # warm up tonight's night context and this year's grid
+  night_context.get(datetime.date.today(), the_location, current_utcoffset())
+  year_grid.get(datetime.date.today().year, the_location, current_utcoffset())
+  print(str(len(daemon_entries)) + " " + str(options.catalogue) + " DSOs at " + str(options.location))
+  planner_daemon.serve({"/tonight": daemon_tonight, "/best": daemon_best, "/object": daemon_object}, port=options.port, socket_path=options.socket)
+
+def report_path(night):
+  return base_dir + report_dir + str(options.catalogue) + "_" + str(options.location) + "_" + night.today.strftime("%Y-%m-%d") + ".json"
+
+def write_report(night, dso_list):
+  # the night's JSON report, written completely before it replaces an older one
+  path = report_path(night)
+  if not os.path.isdir(os.path.dirname(path)):
+    os.makedirs(os.path.dirname(path))
+  report = tonight_report(night, dso_list)
+  with open(path + ".tmp", "w") as f:
+    json.dump(report, f, indent=1)
+  os.replace(path + ".tmp", path)
+  return report, path
+
+def run_scheduler(nights):
+  # precomputes tonight and the following nights into the result cache and
+  # the JSON reports. The window rolls with the date, nights computed before
+  # (in this process or by an earlier one, see result_cache) are only read,
+  # so a new day only computes its last night.
+  scheduled_entries = catalogue_entries()
+  print("Precompute " + str(nights) + " nights of " + str(len(scheduled_entries)) + " " + str(options.catalogue) + " DSOs at " + str(options.location) + " every " + str(options.schedule_interval) + " min")
+  scheduled = set()
+  while True:
+    first = datetime.date.today()
+    utcoffset = current_utcoffset()
+    for k in range(nights):
+      night = night_context.get(first + datetime.timedelta(days=k), the_location, utcoffset)
+      if night in scheduled and os.path.isfile(report_path(night)):
+        continue
+      with metrics.stage("precompute"):
+        dso_list = evaluate_chunk(night, scheduled_entries)
+        report, path = write_report(night, dso_list)
+      scheduled.add(night)
+      print("Precomputed " + str(night.theDate) + ": " + str(len(report["nautical"])) + " nautical, " + str(len(report["astronomical"])) + " astronomical, " + str(len(report["invisible"])) + " invisible DSOs -> " + str(path))
+    if result_store is not None:
+      result_store.evict()
+
+    # past nights are not needed any more, the process runs for months
+    for key, night in list(night_context.contexts.items()):
+      if night.today < first:
+        del night_context.contexts[key]
+        scheduled.discard(night)
+        result_cache.nights.pop(night, None)
+    if debug:
+      print(json.dumps(metrics.report()))
+    time.sleep(options.schedule_interval * 60)
+
 if __name__ == '__main__':
 
   try:
@@ -801,21 +1160,70 @@ if __name__ == '__main__':
     # Use `astropy.coordinates.EarthLocation` to provide the location of the desired time
     the_location = EarthLocation(lat=options.latitude, lon=options.longitude, height=options.elevation)
 
+    # resolved DSO coordinates and metadata, filled from Simbad on a miss
+    catalogue_store.debug = debug
+    catalogue = catalogue_store.CatalogueStore(base_dir + catalogue_store.default_path)
+    catalogue_resolver.debug = debug
+    night_context.debug = debug
+    altaz_engine.debug = debug
+    altaz_engine.engine = options.engine
+    night_sampling.debug = debug
+    night_sampling.sampling = options.sampling
+    if options.precision:
+      night_context.samples = int(round(24 * 60 / options.precision)) + 1
+    year_grid.debug = debug
+    ephemeris_cache.debug = debug
+    moon_ephemeris.debug = debug
+    scoring.debug = debug
+    dso_result.debug = debug
+    catalogue_file.debug = debug
+    prefilter.debug = debug
+    plot_renderer.debug = debug
+    atlas.debug = debug
+    send_message.debug = debug
+    if options.message_sink:
+      send_message.transport = send_message.sink(options.message_sink)
+    result_export.debug = debug
+    sites.debug = debug
+    metrics.debug = debug
+    planner_daemon.debug = debug
+    result_cache.debug = debug
+    ephemeris_cache.cache_dir = base_dir + ephemeris_cache.default_dir
+    result_store = None
+    if not options.no_result_cache:
+      result_store = result_cache.ResultCache(base_dir + result_cache.default_path)
+    query_tap = None
+    if options.simbad_tap:
+      if os.path.isfile(options.simbad_tap):
+        query_tap = catalogue_resolver.recorded_tap(options.simbad_tap)
+      else:
+        query_tap = catalogue_resolver.tap_service(options.simbad_tap)
+
+    # resolve all DSOs of this run with a few bulk queries, unknown ones are
+    # skipped, the names of failed queries are looked up one by one
+    failed = []
+    if options.best and options.dso:
+      entries = catalogue_resolver.resolve([dso_name], catalogue, query_tap, failed)
+    else:
+      entries = catalogue_resolver.resolve(my_DSO_list, catalogue, query_tap, failed)
+    for name in failed:
+      try:
+        entries[name] = catalogue_resolver.lookup(name, catalogue, simbad_lookup)
+      except Exception as e:
+        print("Simbad lookup error for " + str(name) + ": " + str(e))
+    resolved_DSO_list = [n for n in my_DSO_list if n not in entries or entries[n]["resolved"]]
+
     now = datetime.datetime.now()
     theDate = today.strftime("%d.%m.%Y")
     theYear = now.strftime("%Y")
     if options.thenights_date:
       theYear = theDate[2]
 
-    timeZone = pytz.timezone(config.coordinates["timezone"])
-    # MEZ assumed (UTC+1/2)
-    if is_summertime(now, timeZone):
-      utcoffset = +2 * u.hour  # +2 summertime, +1 wintertime
-      if debug:
+    utcoffset = current_utcoffset()
+    if debug:
+      if utcoffset == 2 * u.hour:
         print("Summertime: UTC+2")
-    else:
-      utcoffset = +1 * u.hour
-      if debug:
+      else:
         print("Wintertime: UTC+1")
 
     tomorrow = today + datetime.timedelta(days=1)
@@ -824,39 +1232,102 @@ if __name__ == '__main__':
       print("The day: " + str(today))
       print("The day after: " + str(tomorrow))
 
-    if options.best:
+    # everything the --jobs workers need from the main process
+    worker_state = dict(debug=debug, the_location=the_location, utcoffset=utcoffset, today=today, tomorrow=tomorrow, theYear=theYear, entries=entries, resolved_DSO_list=resolved_DSO_list)
+
+    if options.daemon:
+      serve_daemon()
+
+    elif options.schedule:
+      try:
+        run_scheduler(options.schedule)
+      except KeyboardInterrupt:
+        pass
+
+    elif options.engine_report:
+      names = [n for n in resolved_DSO_list if n in entries]
+      coords = SkyCoord(ra=np.array([entries[n]["ra"] for n in names]) * u.deg, dec=np.array([entries[n]["dec"] for n in names]) * u.deg)
+      print("Fast engine vs. astropy for " + str(len(names)) + " " + str(options.catalogue) + " DSOs in " + str(theYear) + " at " + str(options.location) + "...")
+      report = altaz_engine.compare(coords, the_location, theYear)
+      print("  Samples: " + str(report["samples"]))
+      print("  Max. altitude error: " + str(round(report["max_alt_error"], 2)) + " arcmin (" + str(names[report["worst_object"]]) + ")")
+      print("  Max. altitude error above the horizon: " + str(round(report["max_alt_error_above_horizon"], 2)) + " arcmin")
+      print("  Max. azimuth error on the sky: " + str(round(report["max_az_error_on_sky"], 2)) + " arcmin")
+      print("  Max. azimuth error below 80 deg altitude: " + str(round(report["max_az_error_below_80"], 2)) + " arcmin")
+
+    elif options.best:
       if options.dso:
-        # single DSO
-        dso_list = []
-        # loop over 12 dates/year
-        for the_month in ["01", "02", "03", "04", "05", "06", "07", "08", "09", "10", "11", "12"]:
-          the_date = "01." + str(the_month) + "." + str(theYear)
-          if debug:
-            print("Calculate visibility of " + str(dso_name) + " at " + str(the_date))
-          the_day = today.replace(day=int(1), month=int(the_month), year=int(theYear))
-          the_tomorrow = the_day + datetime.timedelta(days=1)
-          dso = DSO(dso_name, the_day, the_tomorrow)
-          dso_list.append(dso)
-        plot(dso_list)
-
-        if options.message:
-          plot_name = base_dir + "DSO_" + str(dso.the_object_name) + "_" + str(dso.today.strftime("%Y")) + ".png"
-          send_message.image(plot_name)
+        # single DSO: plot of the monthly results and best night of the whole
+        # year from the nights x samples grid
+        best_months.update(month_results([dso_name]))
+        dso_name, summary, output, error = best_worker(dso_name)
+        sys.stdout.write(output)
+        if error is not None:
+          print("DSO observation planning error " + str(dso_name) + ": " + str(error))
+        elif options.message and summary["plot"] is not None:
+          send_message.image(summary["plot"])
       else:
+        # one alt/az matrix, peak search and scoring with all DSOs per first of
+        # the month. Forked workers inherit the results, the spawn and
+        # forkserver start methods (the default on Linux from Python 3.14)
+        # get them with their tracks in the worker state
+        best_months.update(month_results(resolved_DSO_list))
+        worker_state["best_months"] = best_months
+        worker_state["best_tracks"] = dict((name, [result.track() for result in results]) for name, results in best_months.items())
+        year_grid.get(theYear, the_location, utcoffset)
+
+        # all plots in one PDF instead of a PNG per DSO
+        atlas_pdf = None
+        if options.atlas:
+          atlas_name = base_dir + str(options.catalogue) + "_Catalogue_Atlas_" + str(options.location) + "_" + str(theYear) + ".pdf"
+          atlas_pdf = atlas.Atlas(atlas_name, str(options.catalogue) + " Catalogue DSO Atlas " + str(theYear), str(options.location) + " (" + str(options.latitude) + ", " + str(options.longitude) + ")")
+
         # loop over all DSOs
-        for dso_name in my_DSO_list:
-          dso_list = []
-          # loop over 12 dates/year
-          for the_month in ["01", "02", "03", "04", "05", "06", "07", "08", "09", "10", "11", "12"]:
-            the_date = "01." + str(the_month) + "." + str(theYear)
-            if debug:
-              print("Calculate visibility of " + str(dso_name) + " at " + str(the_date))
-            the_day = today.replace(day=int(1), month=int(the_month), year=int(theYear))
-            the_tomorrow = the_day + datetime.timedelta(days=1)
-            dso = DSO(dso_name, the_day, the_tomorrow)
-            dso_list.append(dso)
-          #print(dso_list)
-          plot(dso_list)
+        for summary in run_jobs(best_worker, resolved_DSO_list):
+          if atlas_pdf is not None:
+            atlas_pdf.add(summary, summary["plot"], [summary["text"]])
+          elif options.message and summary["plot"] is not None:
+            # queued, sent in batches while the next DSOs are computed
+            send_message.image(summary["plot"])
+
+        if atlas_pdf is not None:
+          atlas_pdf.close()
+          print("Atlas: " + str(atlas_name))
+          if options.message:
+            send_message.file(atlas_name)
+
+    elif options.tonight and options.sites:
+      # all sites of the file in one run: one alt/az array over sites, DSOs and
+      # times per chunk, peaks and scoring with the night of each site
+      site_list = sites.read(options.sites)
+      site_nights = sites.nights(site_list, today, utcoffset)
+      result_msg = "Best sites for " + str(today.strftime("%d.%m.%Y")) + " - " + str(tomorrow.strftime("%d.%m.%Y"))
+      for site, night in zip(site_list, site_nights):
+        result_msg += "\n  " + site["name"] + " (" + str(site["latitude"]) + ", " + str(site["longitude"]) + " [" + str(site["elevation"]) + " m]): "
+        if night.nautical_mask.any():
+          result_msg += "nautical night " + str(night.nautical_night_start.strftime("%d.%m.%y %H:%M")) + " - " + str(night.nautical_night_end.strftime("%d.%m.%y %H:%M"))
+        else:
+          result_msg += "no nautical night"
+      print(result_msg)
+
+      if options.catalogue_file:
+        chunks = (([e["name"] for e in chunk], dict((e["name"], e) for e in chunk)) for chunk in catalogue_file.read_chunks(options.catalogue_file, options.chunk_size))
+      else:
+        chunks = [(resolved_DSO_list, entries)]
+      names = []
+      site_results = [{} for site in site_list]
+      for chunk_names, chunk_entries in chunks:
+        alt, az, chunk_names = sites.altaz(chunk_names, chunk_entries, site_nights)
+        names.extend(chunk_names)
+        for s, night in enumerate(site_nights):
+          if night.nautical_mask.any():
+            site_results[s].update(peak_results(night, chunk_names, chunk_entries, altaz_engine.night_peaks(alt[s], az[s], night.nautical_mask)[:4]))
+
+      msg = compare_sites(site_list, names, site_results)
+      print(msg)
+      result_msg += msg
+      if options.message:
+        send_message.text(result_msg)
 
     elif options.tonight:
 
@@ -865,11 +1336,65 @@ if __name__ == '__main__':
       pdfdata_nn, pdfdata_an, pdfdata_in = [], [], []
 
       print("Find best DSOs for " + str(today.strftime("%d.%m.%Y")) + " - " + str(tomorrow.strftime("%d.%m.%Y")) + ", ordered by their max. altitude...")
-      dso_list = []
-      for dso_name in my_DSO_list:
-        print("Check DSO: " + str(dso_name))
-        dso = DSO(dso_name, today, tomorrow)
-        dso_list.append(dso)
+      night = night_context.get(today, the_location, utcoffset)
+      # machine-readable rows of the results, written while they come in
+      export = None
+      if options.export:
+        export = result_export.ResultExport(options.export, night, dict(location=str(options.location), latitude=the_location.lat.deg, longitude=the_location.lon.deg,
+                                            elevation=the_location.height.to_value(u.m), catalogue=str(options.catalogue_file or options.catalogue)), options.export_tracks)
+      if options.catalogue_file:
+        # large catalogues in chunks, only the compact results are kept
+        dso_list = []
+        for chunk in catalogue_file.read_chunks(options.catalogue_file, options.chunk_size):
+          print("Check DSOs " + str(len(my_DSO_list) + 1) + " - " + str(len(my_DSO_list) + len(chunk)) + " of " + str(options.catalogue_file))
+          my_DSO_list.extend(e["name"] for e in chunk)
+          chunk_results = evaluate_chunk(night, chunk)
+          if export is not None:
+            export.write(chunk_results)
+          dso_list.extend(chunk_results)
+      else:
+        # the tracks of computed and cached results go to the export as they
+        # are instead of being computed again
+        if export is not None and options.export_tracks:
+          result_tracks = dso_result.TrackStore(len(night.jd), len(resolved_DSO_list))
+        # results of earlier runs for this night, pre-filtered ones included,
+        # only the others are computed
+        evaluated = cached_results(night, resolved_DSO_list)
+        if len(evaluated) > 0:
+          print(str(len(evaluated)) + " DSOs from the result cache")
+        # hopeless DSOs are reported invisible without alt/az work
+        prefilter_names = [n for n in resolved_DSO_list if n in entries and n not in evaluated]
+        kept, invisible = prefilter_entries(night, [entries[n] for n in prefilter_names], prefilter_names)
+        evaluated.update(prefiltered_results(night, invisible, entries))
+        prefiltered = set(n for n, result in evaluated.items() if result.reason)
+        dso_list = [evaluated[n] for n in resolved_DSO_list if n in prefiltered]
+        tonight_DSO_list = [n for n in resolved_DSO_list if n not in prefiltered]
+        todo_DSO_list = [n for n in tonight_DSO_list if n not in evaluated]
+        if night_sampling.sampling == "adaptive" and night.nautical_mask.any():
+          # night-only samples of the resolved DSOs like a catalogue file, the
+          # DSOs left (without a catalogue entry) are looked up one by one
+          sampled = [n for n in todo_DSO_list if n in entries and entries[n]["resolved"]]
+          evaluated.update(sampled_results(night, sampled, entries))
+          todo_DSO_list = [n for n in todo_DSO_list if n not in evaluated]
+        worker_state["resolved_DSO_list"] = todo_DSO_list
+        if len(todo_DSO_list) > 0:
+          night.objects_altaz(todo_DSO_list, entries)
+        cache_items = []
+        for result, cache_item in run_jobs(tonight_worker, todo_DSO_list):
+          evaluated[result.the_object_name] = result
+          if cache_item is not None:
+            cache_items.append(cache_item)
+        if result_store is not None and len(cache_items) > 0:
+          with metrics.stage("result_cache"):
+            result_store.put_many(cache_items)
+        dso_list += [evaluated[n] for n in tonight_DSO_list if n in evaluated]
+        if export is not None:
+          export.write(dso_list)
+      if export is not None:
+        print("Export: " + str(export.close()) + " DSOs written to " + str(options.export))
+      if result_store is not None:
+        with metrics.stage("result_cache"):
+          result_store.evict()
 
       result_msg = "Best DSOs for " + str(today.strftime("%d.%m.Y")) + " - " + str(tomorrow.strftime("%d.%m.%Y")) + " at " + str(options.location) + " (" + str(options.latitude) + ", " + str(options.longitude) + " [" + str(options.elevation) + " m])"
 
@@ -908,8 +1433,13 @@ if __name__ == '__main__':
       result_msg += msg
       if len(invisible_dsos)>0:
         print(msg)
+        catalogue_rows = dict((catalogue_store.normalize_name(n), i) for i, n in reversed(list(enumerate(my_DSO_list))))
         for idso in invisible_dsos:
-          msg = "\n  " + idso.the_object_name + ": " + str(round(idso.max_alt,0)) + " in " + str(idso.max_alt_direction) + " at " + str(idso.max_alt_time.strftime("%H:%M")) + " [" + str(my_DSO_list.index(idso.the_object_name)+2) + "]"
+          row = str(catalogue_rows[catalogue_store.normalize_name(idso.the_object_name)]+2)
+          if getattr(idso, "reason", None):
+            msg = "\n  " + idso.the_object_name + ": " + str(idso.reason) + " [" + row + "]"
+          else:
+            msg = "\n  " + idso.the_object_name + ": " + str(round(idso.max_alt,0)) + " in " + str(idso.max_alt_direction) + " at " + str(idso.max_alt_time.strftime("%H:%M")) + " [" + row + "]"
           print(msg)
           pdfdata_in.append([idso.the_object_name, msg.lstrip("\n\r")])
           result_msg += msg
@@ -917,6 +1447,13 @@ if __name__ == '__main__':
         print("No invisible DSOs in the list.")
 
       ## create PDF document
+      from reportlab.lib import colors
+      from reportlab.lib.units import cm
+      from reportlab.lib.pagesizes import A4, portrait
+      from reportlab.platypus import SimpleDocTemplate, TableStyle, Table
+      from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+      from reportlab.platypus import Paragraph, Spacer
+      from reportlab.lib.enums import TA_JUSTIFY, TA_LEFT, TA_CENTER, TA_RIGHT
       fileName = str(options.catalogue) + "_Catalogue DSOs_in_" + str(options.location) + "_" + str(theDate) + ".pdf"
       if debug:
         print("Create PDF " + str(fileName) + "...")
@@ -1047,4 +1584,6 @@ if __name__ == '__main__':
 
   except Exception as e:
     print("DSO observation planning error " + str(dso_name) + ": " + str(e))
+  # queued messages, a slow transport delays the end of the run by message_timeout at most
+  send_message.close(options.message_timeout)
   sys.exit(0)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs multi-object alt/az engine
+#
+# Stacks the coordinates of all DSOs of a run into one SkyCoord array and
+# transforms it against the time grid of a night in a single broadcast
+# transformation. The result is a dense (objects x times) altitude/azimuth
+# matrix, the DSOs just pick their row.
+#
+
+import numpy as np
+import astropy.units as u
+from astropy.coordinates import AltAz, SkyCoord
+from astropy.time import Time
+import catalogue_store # own
+
+debug = False
+
+# "astropy": full ICRS -> AltAz transformation
+# "fast": planning grade analytic alt/az (precession, sidereal time, hour angle),
+#         about an arc minute off, see compare()
+engines = ["astropy", "fast"]
+engine = "astropy"
+
+def local_sidereal_time(jd, longitude):
+  # local mean sidereal time (IAU 1982) in deg, jd: UTC julian dates
+  d = np.asarray(jd, dtype=float) - 2451545.0
+  t = d / 36525.0
+  gmst = 280.46061837 + 360.98564736629 * d + 0.000387933 * t**2 - t**3 / 38710000.0
+  return np.mod(gmst + longitude, 360.0)
+
+def fast_altaz(ra, dec, jd, latitude, longitude, epoch=None):
+  # ra, dec: ICRS/J2000 in deg, jd: UTC julian dates, latitude, longitude in deg
+  # ra/dec and jd are broadcast against each other, e.g. (N, 1) and (T,) -> (N, T)
+  # epoch: julian date of the precession, default the mean of jd
+  ra = np.radians(np.asarray(ra, dtype=float))
+  dec = np.radians(np.asarray(dec, dtype=float))
+  jd = np.asarray(jd, dtype=float)
+
+  # precession J2000 -> mean equinox of date (IAU 1976), one epoch per call
+  # is good enough since the angles change by less than 1" per week
+  t = ((np.mean(jd) if epoch is None else epoch) - 2451545.0) / 36525.0
+  zeta = np.radians((2306.2181 * t + 0.30188 * t**2 + 0.017998 * t**3) / 3600.0)
+  z = np.radians((2306.2181 * t + 1.09468 * t**2 + 0.018203 * t**3) / 3600.0)
+  theta = np.radians((2004.3109 * t - 0.42665 * t**2 - 0.041833 * t**3) / 3600.0)
+  a = np.cos(dec) * np.sin(ra + zeta)
+  b = np.cos(theta) * np.cos(dec) * np.cos(ra + zeta) - np.sin(theta) * np.sin(dec)
+  c = np.sin(theta) * np.cos(dec) * np.cos(ra + zeta) + np.cos(theta) * np.sin(dec)
+  ra_date = np.arctan2(a, b) + z
+  dec_date = np.arcsin(np.clip(c, -1.0, 1.0))
+
+  # hour angle
+  ha = np.radians(local_sidereal_time(jd, longitude)) - ra_date
+
+  lat = np.radians(latitude)
+  sin_alt = np.sin(dec_date) * np.sin(lat) + np.cos(dec_date) * np.cos(lat) * np.cos(ha)
+  alt = np.degrees(np.arcsin(np.clip(sin_alt, -1.0, 1.0)))
+  az = np.degrees(np.arctan2(-np.cos(dec_date) * np.sin(ha), np.sin(dec_date) * np.cos(lat) - np.cos(dec_date) * np.sin(lat) * np.cos(ha)))
+  return alt, np.mod(az, 360.0)
+
+def altaz(coords, frame, use_engine=None, epoch=None):
+  # alt/az in deg of coords in an AltAz frame with the selected engine, the
+  # shapes of coords and frame obstime are broadcast like transform_to does,
+  # epoch: see fast_altaz
+  if use_engine is None:
+    use_engine = engine
+  if use_engine == "fast":
+    icrs = coords.icrs
+    return fast_altaz(icrs.ra.deg, icrs.dec.deg, frame.obstime.utc.jd, frame.location.lat.deg, frame.location.lon.deg, epoch)
+  altazs = coords.transform_to(frame)
+  return altazs.alt.deg, altazs.az.deg
+
+class AltAzMatrix:
+
+  def __init__(self, names, coords, frame):
+    self.names = list(names)
+    self.index = dict((catalogue_store.normalize_name(n), i) for i, n in enumerate(self.names))
+    self.frame = frame
+    if len(self.names) > 0:
+      # (N, 1) coordinates against (T,) obstimes broadcast to (N, T)
+      self.alt, self.az = altaz(coords.reshape((len(self.names), 1)), frame)
+    else:
+      self.alt = np.zeros((0, len(frame.obstime)))
+      self.az = np.zeros((0, len(frame.obstime)))
+    if debug:
+      print("Alt/az matrix: " + str(self.alt.shape))
+
+  def __contains__(self, name):
+    return catalogue_store.normalize_name(name) in self.index
+
+  def row(self, name):
+    i = self.index[catalogue_store.normalize_name(name)]
+    return self.alt[i], self.az[i]
+
+  def extend(self, other):
+    # rows of another matrix of the same frame appended
+    for i, n in enumerate(other.names):
+      self.index[catalogue_store.normalize_name(n)] = len(self.names) + i
+    self.names += other.names
+    self.alt = np.concatenate([self.alt, other.alt])
+    self.az = np.concatenate([self.az, other.az])
+
+def night_peaks(alt, az, mask, threshold=5):
+  # alt, az: (N, T) or (T,) in deg, mask: (T,) samples to consider
+  # returns per object: index of the max. altitude inside the mask, that
+  # altitude and its azimuth, number of masked samples above threshold and the
+  # index of the overall max. altitude
+  alt = np.atleast_2d(alt)
+  az = np.atleast_2d(az)
+  rows = np.arange(alt.shape[0])
+  index = np.argmax(np.where(mask, alt, -np.inf), axis=1)
+  above = np.count_nonzero((alt > threshold) & mask, axis=1)
+  index_total = np.argmax(alt, axis=1)
+  return index, alt[rows, index], az[rows, index], above, index_total
+
+def from_entries(names, entries, frame):
+  # only names with resolved catalogue entries get a row
+  names = [n for n in names if n in entries and entries[n]["resolved"]]
+  coords = SkyCoord(ra=np.array([entries[n]["ra"] for n in names]) * u.deg, dec=np.array([entries[n]["dec"] for n in names]) * u.deg)
+  return AltAzMatrix(names, coords, frame)
+
+def compare(coords, the_location, year):
+  # max. error of the fast engine against astropy for all coords, every 4 hours of the year
+  start = Time(str(year) + "-01-01 00:00:00")
+  times = start + np.arange(0, 366 * 24, 4) * u.hour
+  times = times[times.datetime64 < np.datetime64(str(int(year) + 1) + "-01-01")]
+  frame = AltAz(obstime=times, location=the_location)
+  coords = coords.reshape((len(coords), 1))
+  alt, az = altaz(coords, frame, "astropy")
+  fast_alt, fast_az = altaz(coords, frame, "fast")
+  d_alt = np.abs(fast_alt - alt)
+  d_az = np.abs(np.mod(fast_az - az + 180.0, 360.0) - 180.0)
+  # azimuth differences near the zenith are meaningless, compare on the sky instead
+  d_az_sky = d_az * np.cos(np.radians(alt))
+  above = alt > 0
+  return dict(samples=int(alt.size),
+              max_alt_error=float(d_alt.max()) * 60.0,  # arcmin
+              max_alt_error_above_horizon=float(d_alt[above].max()) * 60.0 if above.any() else 0.0,
+              max_az_error_on_sky=float(d_az_sky.max()) * 60.0,
+              max_az_error_below_80=float(d_az[alt < 80].max()) * 60.0 if (alt < 80).any() else 0.0,
+              worst_object=int(np.unravel_index(np.argmax(d_alt), d_alt.shape)[0]))
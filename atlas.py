@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs PDF atlas
+#
+# Collects the yearly plots of a catalogue-wide --best run in one multi-page
+# PDF instead of a PNG per DSO: a page per DSO (plot, best night and data) is
+# drawn as soon as its plot is rendered, a summary table of all DSOs follows
+# on the last pages. The pages are written one after the other with the
+# reportlab canvas, only the summary rows are kept.
+#
+
+debug = False
+
+columns = ["DSO", "Type", "Mag.", "Size [']", "Best night", "Alt.", "Dir.", "Moon"]
+
+def _number(value, digits=1):
+  # -1: unknown
+  if value is None or value < 0:
+    return ""
+  return str(round(value, digits))
+
+def summary_row(summary):
+  # summary: name, type, magnitude, major_axis, minor_axis and best (see
+  # year_grid.best_night)
+  best = summary["best"]
+  size = ""
+  if summary["major_axis"] is not None and summary["major_axis"] > 0:
+    size = _number(summary["major_axis"])
+    if summary["minor_axis"] is not None and summary["minor_axis"] > 0:
+      size += " x " + _number(summary["minor_axis"])
+  if best is None or best["quality"] <= 0:
+    return [summary["name"], summary["type"], _number(summary["magnitude"]), size, "not visible", "", "", ""]
+  moon = "below horizon" if best["moon_alt"] < 0 else str(round(best["moon_illumination"])) + " %, " + str(round(best["moon_separation"])) + " deg"
+  return [summary["name"], summary["type"], _number(summary["magnitude"]), size,
+          best["time"].strftime("%d.%m.%Y %H:%M"), str(round(best["alt"])), str(best["direction"]), moon]
+
+class Atlas:
+
+  def __init__(self, path, title, subtitle):
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4, portrait
+    self.path = path
+    self.title = title
+    self.subtitle = subtitle
+    self.pagesize = portrait(A4)
+    self.canvas = canvas.Canvas(path, pagesize=self.pagesize)
+    self.canvas.setTitle(title)
+    self.rows = []
+
+  def _header(self, text):
+    from reportlab.lib.units import cm
+    width, height = self.pagesize
+    self.canvas.setFont("Helvetica-Bold", 16)
+    self.canvas.drawString(2 * cm, height - 2 * cm, text)
+    self.canvas.setFont("Helvetica", 9)
+    self.canvas.drawString(2 * cm, height - 2.6 * cm, self.subtitle)
+    self.canvas.drawRightString(width - 2 * cm, 1.2 * cm, str(self.canvas.getPageNumber()))
+
+  def add(self, summary, plot_path, lines):
+    # a page per DSO, lines: text below the plot
+    from reportlab.lib.units import cm
+    from reportlab.lib.utils import simpleSplit
+    width, height = self.pagesize
+    self._header(str(summary["name"]) + " " + str(summary["type"]))
+    top = height - 3.2 * cm
+    if plot_path is not None:
+      image_width = width - 4 * cm
+      image_height = image_width * 3 / 4
+      self.canvas.drawImage(plot_path, 2 * cm, top - image_height, image_width, image_height, preserveAspectRatio=True)
+      top -= image_height + 0.8 * cm
+    self.canvas.setFont("Helvetica", 10)
+    row = summary_row(summary)
+    for label, value in zip(columns[1:], row[1:]):
+      if value != "":
+        lines = lines + [label + ": " + value]
+    for line in lines:
+      # long lines are wrapped to the page width
+      for part in simpleSplit(line, "Helvetica", 10, width - 4 * cm):
+        self.canvas.drawString(2 * cm, top, part)
+        top -= 0.5 * cm
+    self.canvas.showPage()
+    self.rows.append(row)
+    if debug:
+      print("Atlas page " + str(summary["name"]))
+
+  def close(self):
+    # summary table of all DSOs, split over as many pages as needed
+    from reportlab.lib import colors
+    from reportlab.lib.units import cm
+    from reportlab.platypus import Frame, Table, TableStyle
+    width, height = self.pagesize
+    table = Table([columns] + self.rows, repeatRows=1, hAlign='LEFT')
+    table.setStyle(TableStyle([
+        ('FONT', (0,0), (-1,-1), 'Helvetica', 8),
+        ('FONT', (0,0), (-1,0), 'Helvetica-Bold', 8),
+        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+        ('INNERGRID', (0,0), (-1,-1), 0.25, colors.black),
+        ('BOX', (0,0), (-1,-1), 0.25, colors.black),
+        ]))
+    rest = table
+    while rest is not None:
+      self._header(self.title + ": summary")
+      frame = Frame(2 * cm, 2 * cm, width - 4 * cm, height - 5 * cm, leftPadding=0, rightPadding=0, showBoundary=0)
+      if frame.add(rest, self.canvas):
+        rest = None
+      else:
+        # the rows fitting on this page, the others (with the header row) on the next
+        parts = frame.split(rest, self.canvas)
+        if len(parts) < 2:
+          raise ValueError("Atlas summary table does not fit on a page")
+        frame.add(parts[0], self.canvas)
+        rest = parts[1]
+      self.canvas.showPage()
+    self.canvas.save()
+    if debug:
+      print("Atlas " + str(self.path) + ": " + str(len(self.rows)) + " DSOs")
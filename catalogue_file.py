@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs local catalogue files
+#
+# Reads large catalogues (e.g. the ~13k NGC/IC objects of OpenNGC) from local
+# CSV or Parquet files in chunks of catalogue entries, so they can be evaluated
+# without Simbad and without holding the whole catalogue in memory.
+#
+# Columns (case insensitive): name, ra, dec and optionally type/otype,
+# v_mag/v-mag/mag, b_mag/b-mag, major_axis/majax, minor_axis/minax. RA/Dec in
+# deg or sexagesimal (RA hh:mm:ss, Dec dd:mm:ss), axes in arcmin.
+#
+
+import csv
+import time
+import catalogue_store # own
+
+debug = False
+
+chunk_size = 2000
+
+columns = {"name": ["name", "main_id", "id"],
+           "ra": ["ra", "ra_deg", "raj2000"],
+           "dec": ["dec", "dec_deg", "dej2000", "decj2000"],
+           "otype": ["otype", "type"],
+           "v_mag": ["v_mag", "v-mag", "vmag", "mag"],
+           "b_mag": ["b_mag", "b-mag", "bmag"],
+           "major_axis": ["major_axis", "majax"],
+           "minor_axis": ["minor_axis", "minax"]}
+
+def mapping(header):
+  # field -> column name of the file
+  lower = [str(h).strip().lower() for h in header]
+  result = {}
+  for field, names in columns.items():
+    for name in names:
+      if name in lower:
+        result[field] = header[lower.index(name)]
+        break
+  return result
+
+def _number(value):
+  if value is None:
+    return None
+  value = str(value).strip()
+  if value == "":
+    return None
+  try:
+    return float(value)
+  except ValueError:
+    return None
+
+def _angle(value, hours):
+  # deg, or sexagesimal with ':' or ' ' separators (RA in hours)
+  if value is None:
+    return None
+  text = str(value).strip()
+  if text == "":
+    return None
+  parts = text.replace(":", " ").split()
+  if len(parts) == 1:
+    return _number(text)
+  sign = -1.0 if text.startswith("-") else 1.0
+  angle = 0.0
+  for k, part in enumerate(parts):
+    angle += abs(float(part)) / 60.0**k
+  angle *= sign
+  return angle * 15.0 if hours else angle
+
+def entry(row, fields):
+  # catalogue store entry of a file row, None without name or coordinates,
+  # fields: see mapping
+  values = dict((field, row.get(column)) for field, column in fields.items())
+  name = values.get("name")
+  ra = _angle(values.get("ra"), True)
+  dec = _angle(values.get("dec"), False)
+  if name is None or str(name).strip() == "" or ra is None or dec is None:
+    return None
+  otype = values.get("otype")
+  return dict(name=catalogue_store.normalize_name(name),
+              main_id=str(name).strip(),
+              ra=ra,
+              dec=dec,
+              otype=str(otype).strip() if otype is not None else None,
+              b_mag=_number(values.get("b_mag")),
+              v_mag=_number(values.get("v_mag")),
+              major_axis=_number(values.get("major_axis")),
+              minor_axis=_number(values.get("minor_axis")),
+              resolved=1,
+              updated=time.time())
+
+def _csv_rows(path):
+  with open(path, newline="", encoding="utf-8") as f:
+    sample = f.read(4096)
+    f.seek(0)
+    dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    reader = csv.DictReader(f, dialect=dialect)
+    fields = mapping(reader.fieldnames)
+    for row in reader:
+      yield row, fields
+
+def _parquet_rows(path):
+  try:
+    import pyarrow.parquet
+  except ImportError:
+    raise ImportError("Reading Parquet catalogues needs pyarrow: sudo pip3 install pyarrow --break-system-packages")
+  parquet_file = pyarrow.parquet.ParquetFile(path)
+  fields = mapping(parquet_file.schema_arrow.names)
+  for batch in parquet_file.iter_batches(batch_size=chunk_size):
+    for row in batch.to_pylist():
+      yield row, fields
+
+def read_chunks(path, size=None):
+  # lists of up to size catalogue entries (dicts like catalogue_store), rows
+  # without a name or coordinates are skipped
+  if size is None:
+    size = chunk_size
+  rows = _parquet_rows(path) if str(path).lower().endswith((".parquet", ".pq")) else _csv_rows(path)
+  chunk = []
+  skipped = 0
+  for row, fields in rows:
+    e = entry(row, fields)
+    if e is None:
+      skipped += 1
+      continue
+    chunk.append(e)
+    if len(chunk) >= size:
+      yield chunk
+      chunk = []
+  if len(chunk) > 0:
+    yield chunk
+  if debug:
+    print("Catalogue file " + str(path) + ": " + str(skipped) + " rows without name or coordinates skipped")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs bulk DSO catalogue resolver
+#
+# Resolves a whole list of DSO names (e.g. the Messier or Caldwell list) with a
+# few chunked ADQL queries against the Simbad TAP service instead of one query
+# per object. Results go to the local catalogue store, names Simbad does not
+# know are stored as negative entries and are not retried before
+# negative_ttl has passed.
+#
+
+import time
+import numpy as np
+import catalogue_store
+import metrics # own
+
+debug = False
+
+chunk_size = 100  # names per ADQL query
+negative_ttl = 30 * 24 * 3600  # seconds before an unknown name is asked again
+
+def build_query(names):
+  ids = ", ".join(["'" + str(n).replace("'", "''") + "'" for n in names])
+  return ("SELECT c.id, a.main_id, a.ra, a.dec, a.otype, b.B, b.V, a.galdim_majaxis, a.galdim_minaxis "
+          "FROM ident AS c JOIN basic AS a ON c.oidref = a.oid LEFT JOIN allfluxes AS b ON b.oidref = a.oid "
+          "WHERE c.id IN (" + ids + ");")
+
+def simbad_tap(query):
+  from astroquery.simbad import Simbad # https://github.com/astropy/astroquery
+  return Simbad.query_tap(query)
+
+def tap_service(url):
+  # stand-in TAP endpoint, e.g. a local test server
+  import pyvo
+  service = pyvo.dal.TAPService(url)
+  def query_tap(query):
+    return service.search(query).to_table()
+  return query_tap
+
+def recorded_tap(path):
+  # recorded response (VOTable written by record_tap), no network at all
+  from astropy.table import Table
+  table = Table.read(path, format="votable")
+  def query_tap(query):
+    return table
+  return query_tap
+
+def record_tap(query_tap, path):
+  def recording_query_tap(query):
+    table = query_tap(query)
+    table.write(path, format="votable", overwrite=True)
+    return table
+  return recording_query_tap
+
+def _value(row, column):
+  if np.ma.is_masked(row[column]):
+    return None
+  return row[column]
+
+def _entry(row):
+  otype = _value(row, "otype")
+  entry = dict(main_id=str(row["main_id"]).strip(),
+               ra=float(row["ra"]),
+               dec=float(row["dec"]),
+               otype=str(otype).strip() if otype is not None else None,
+               resolved=1)
+  for key, column in [("b_mag", "B"), ("v_mag", "V"), ("major_axis", "galdim_majaxis"), ("minor_axis", "galdim_minaxis")]:
+    value = _value(row, column)
+    entry[key] = float(value) if value is not None else None
+  return entry
+
+def _match(identifier, wanted):
+  # Simbad answers with its own spelling of the identifier ("M  31", "NAME Hyades")
+  key = catalogue_store.normalize_name(identifier)
+  if key in wanted:
+    return wanted[key]
+  if key.startswith("NAME") and key[4:] in wanted:
+    return wanted[key[4:]]
+  return None
+
+def resolve(names, store, query_tap=None, failed=None):
+  # catalogue entries of names, the names of failed chunks are left out and
+  # added to failed, look them up with lookup()
+  if query_tap is None:
+    query_tap = simbad_tap
+  now = time.time()
+
+  entries = {}
+  wanted = {}
+  for name in names:
+    entry = store.get(name)
+    if entry is not None and (entry["resolved"] or now - entry["updated"] < negative_ttl):
+      entries[name] = entry
+    else:
+      wanted[catalogue_store.normalize_name(name)] = name
+  metrics.count("catalogue", len(entries), len(wanted))
+  if debug:
+    print("Catalogue resolver: " + str(len(entries)) + " cached, " + str(len(wanted)) + " to resolve")
+
+  pending = list(wanted.values())
+  for i in range(0, len(pending), chunk_size):
+    chunk = pending[i:i + chunk_size]
+    try:
+      result_table = query_tap(build_query(chunk))
+    except Exception as e:
+      # try again with the next run, nothing is cached
+      print("Simbad bulk lookup error for " + str(len(chunk)) + " DSOs: " + str(e))
+      if debug:
+        print("Not resolved in bulk: " + ", ".join(chunk))
+      if failed is not None:
+        failed.extend(chunk)
+      continue
+    if debug:
+      print(result_table)
+    chunk_keys = dict((catalogue_store.normalize_name(n), n) for n in chunk)
+    for row in result_table:
+      name = _match(row["id"], chunk_keys)
+      if name is None or name in entries:
+        continue
+      entry = _entry(row)
+      store.put(name, entry)
+      entries[name] = store.get(name)
+
+    unresolved = [n for n in chunk if n not in entries]
+    for name in unresolved:
+      store.put(name, dict(resolved=0))
+      entries[name] = store.get(name)
+
+  unresolved = [n for n in names if n in entries and not entries[n]["resolved"]]
+  if len(unresolved) > 0:
+    print("Unresolved DSOs (not retried before " + str(round(negative_ttl / 86400)) + " days): " + ", ".join(unresolved))
+  return entries
+
+def lookup(name, store, simbad_lookup):
+  # one DSO with the per-object lookup (name -> entry), e.g. a name of a failed
+  # chunk, stored and read back like the bulk resolved ones
+  entry = dict(simbad_lookup(name))
+  entry.setdefault("resolved", 1)
+  store.put(name, entry)
+  return store.get(name)
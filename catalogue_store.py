@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs local DSO catalogue store
+#
+# Keeps the resolved coordinates and the Simbad metadata (otype, B/V magnitude,
+# galdim axes) of every DSO in a small SQLite file next to the script. It is
+# consulted before any network lookup and filled on a miss, so a warmed store
+# allows complete offline runs.
+#
+
+import os
+import sqlite3
+import time
+
+debug = False
+
+default_path = "dso_catalogue.sqlite"
+
+# column order of the objects table
+fields = ["name", "main_id", "ra", "dec", "otype", "b_mag", "v_mag", "major_axis", "minor_axis", "resolved", "updated"]
+
+def normalize_name(name):
+  # "M 31", "m31" and "M31" are the same object, "NGC  188" and "NGC 188" too
+  return "".join(str(name).upper().split())
+
+class CatalogueStore:
+
+  def __init__(self, path=default_path):
+    self.path = path
+    self.hits = 0
+    self.misses = 0
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+      os.makedirs(directory)
+    # several cron jobs may use the same file, wait for locks instead of failing
+    self.connection = sqlite3.connect(path, timeout=30)
+    self.connection.row_factory = sqlite3.Row
+    with self.connection:
+      self.connection.execute("CREATE TABLE IF NOT EXISTS objects ("
+                              "name TEXT PRIMARY KEY, "
+                              "main_id TEXT, "
+                              "ra REAL, "
+                              "dec REAL, "
+                              "otype TEXT, "
+                              "b_mag REAL, "
+                              "v_mag REAL, "
+                              "major_axis REAL, "
+                              "minor_axis REAL, "
+                              "resolved INTEGER NOT NULL DEFAULT 1, "
+                              "updated REAL NOT NULL)")
+
+  def get(self, name):
+    row = self.connection.execute("SELECT * FROM objects WHERE name = ?", (normalize_name(name),)).fetchone()
+    if row is None:
+      self.misses += 1
+      if debug:
+        print("Catalogue store miss: " + str(name))
+      return None
+    self.hits += 1
+    if debug:
+      print("Catalogue store hit: " + str(name))
+    return dict(row)
+
+  def put(self, name, entry):
+    values = dict(entry)
+    values["name"] = normalize_name(name)
+    values.setdefault("resolved", 1)
+    values["updated"] = time.time()
+    row = [values.get(f) for f in fields]
+    with self.connection:
+      self.connection.execute("INSERT OR REPLACE INTO objects (" + ", ".join(fields) + ") VALUES (" + ", ".join(["?"] * len(fields)) + ")", row)
+    if debug:
+      print("Catalogue store update: " + str(values))
+
+  def names(self):
+    return [row["name"] for row in self.connection.execute("SELECT name FROM objects ORDER BY name")]
+
+  def close(self):
+    self.connection.close()
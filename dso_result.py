@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs compact DSO results
+#
+# A DSO keeps its alt/az SkyCoords, frames and the shared night tracks alive.
+# The report only needs a handful of fields, so runs keep a DSOResult per DSO
+# (__slots__, no per-object arrays) and, if wanted, the dense alt/az tracks as
+# float32 rows of one shared TrackStore (the monthly --best plots, the tonight
+# results and cached tracks of --export_tracks).
+#
+
+import datetime
+import numpy as np
+
+debug = False
+
+def _json(value):
+  if isinstance(value, (datetime.datetime, datetime.date)):
+    return value.isoformat()
+  if isinstance(value, (np.ndarray, np.generic)):
+    value = value.item()
+  if isinstance(value, float) and value != value:
+    return None  # NaN
+  return value
+
+class TrackStore:
+  # alt/az tracks of many DSOs in two growing (objects x samples) float32 arrays
+
+  def __init__(self, samples, capacity=256):
+    self.alt = np.zeros((capacity, samples), dtype=np.float32)
+    self.az = np.zeros((capacity, samples), dtype=np.float32)
+    self.count = 0
+
+  def add(self, alt, az):
+    if self.count == len(self.alt):
+      grow = np.zeros((max(len(self.alt), 16), self.alt.shape[1]), dtype=np.float32)
+      self.alt = np.concatenate([self.alt, grow])
+      self.az = np.concatenate([self.az, grow])
+    self.alt[self.count] = alt
+    self.az[self.count] = az
+    self.count += 1
+    return self.count - 1
+
+  def track(self, index):
+    return self.alt[index], self.az[index]
+
+  def nbytes(self):
+    return self.alt[:self.count].nbytes + self.az[:self.count].nbytes
+
+# overall max. altitude of the night (not only the dark part), its direction
+# and azimuth, see month_results
+plot_fields = ["max_alt_during_night", "max_alt_during_night_direction", "max_alt_during_night_az"]
+
+class DSOResult:
+
+  __slots__ = ["the_object_name", "theDate", "today", "ra", "dec",
+               "object_type", "object_type_string", "magnitude", "major_axis", "minor_axis",
+               "nautical_night_start", "nautical_night_end", "astronomical_night_start", "astronomical_night_end",
+               "max_alt", "max_alt_direction", "max_alt_az", "max_alt_time", "max_alt_index", "minutes_visible", "visible",
+               "max_alt_during_night", "max_alt_during_night_direction", "max_alt_during_night_az",
+               "score_at_max_alt", "top_score_at_max_alt", "sub_text_moon_at_max_alt", "moon_dir_at_max_alt", "moon_alt_at_max_alt", "moon_phase_percent_at_max_alt",
+               "features", "reason", "tracks", "track_index"]
+
+  def __init__(self, **values):
+    for name in self.__slots__:
+      setattr(self, name, values.get(name))
+    if self.features is None:
+      self.features = {}
+
+  @classmethod
+  def from_entry(cls, entry, night, object_type_string="", **values):
+    # result of a catalogue entry in a NightContext, further fields as values,
+    # the_object_name defaults to the store's normalized name of the entry
+    fields = dict(the_object_name=entry["name"], theDate=night.theDate, today=night.today, ra=entry["ra"], dec=entry["dec"],
+                  object_type=entry["otype"] or "", object_type_string=object_type_string,
+                  magnitude=entry["v_mag"] if entry["v_mag"] is not None else -1.0,
+                  major_axis=entry["major_axis"] if entry["major_axis"] is not None else -1.0,
+                  minor_axis=entry["minor_axis"] if entry["minor_axis"] is not None else -1.0,
+                  nautical_night_start=night.nautical_night_start, nautical_night_end=night.nautical_night_end,
+                  astronomical_night_start=night.astronomical_night_start, astronomical_night_end=night.astronomical_night_end)
+    fields.update(values)
+    return cls(**fields)
+
+  @classmethod
+  def from_dso(cls, dso, tracks=None):
+    # dso: DSO, tracks: TrackStore to keep the alt/az track in
+    result = cls(**dict((name, getattr(dso, name, None)) for name in cls.__slots__ if name not in ["ra", "dec", "features", "tracks", "track_index"]))
+    result.ra = float(dso.the_object.ra.deg)
+    result.dec = float(dso.the_object.dec.deg)
+    result.features = dict(getattr(dso, "features", {}))
+    if tracks is not None:
+      alt, az = dso.track()
+      result.tracks = tracks
+      result.track_index = tracks.add(alt, az)
+    return result
+
+  def __getstate__(self):
+    # tracks stay in the process of their store
+    state = dict((name, getattr(self, name)) for name in self.__slots__)
+    state["tracks"] = None
+    state["track_index"] = None
+    return state
+
+  def __setstate__(self, state):
+    # results cached before a field was added get None
+    for name in self.__slots__:
+      setattr(self, name, state.get(name))
+    if self.features is None:
+      self.features = {}
+
+  def to_dict(self):
+    # JSON serializable fields, times as ISO strings, without the track and
+    # the overall max. altitude of the plots
+    values = dict((name, _json(getattr(self, name))) for name in self.__slots__ if name not in ["tracks", "track_index", "today", "features"] + plot_fields)
+    values["features"] = dict((key, _json(value)) for key, value in self.features.items())
+    return values
+
+  def track(self):
+    # alt, az in deg, None without a kept track
+    if self.tracks is None or self.track_index is None:
+      return None, None
+    return self.tracks.track(self.track_index)
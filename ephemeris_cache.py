@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs sun and moon ephemeris cache
+#
+# Sun and moon alt/az, the moon's illuminated fraction, phase and distance are
+# stored for a whole year and location at a fixed cadence in a memory-mapped
+# NumPy file. It is generated once (astropy positions every 2 hours,
+# interpolated, alt/az from altaz_engine.fast_altaz) and afterwards all modes
+# just slice and interpolate it, no ephemeris is evaluated any more.
+#
+
+import os
+import datetime
+import numpy as np
+import astropy.units as u
+from astropy.coordinates import get_body, get_sun
+from astropy.time import Time
+import altaz_engine # own
+import metrics # own
+
+debug = False
+
+default_dir = "ephemeris_cache"
+cache_dir = default_dir
+cadence = 5  # minutes between two samples
+padding = 2  # days before and after the year, nights reach into the neighbouring years
+body_step = 2  # hours between two astropy sun/moon evaluations during generation
+
+fields = ["sun_alt", "sun_az", "moon_alt", "moon_az", "moon_illumination", "moon_phase", "moon_distance"]
+angles = ["sun_az", "moon_az", "moon_phase"]  # interpolated modulo 360
+
+caches = {}  # (latitude, longitude, year) -> EphemerisCache
+
+def year_of(jd):
+  return (datetime.datetime(2000, 1, 1, 12) + datetime.timedelta(days=float(jd) - 2451545.0)).year
+
+def start_jd(year):
+  return Time(str(year) + "-01-01 00:00:00", scale="utc").jd - padding
+
+def get(latitude, longitude, year):
+  key = (round(float(latitude), 4), round(float(longitude), 4), int(year))
+  metrics.hit("ephemeris", key in caches)
+  if key not in caches:
+    path = os.path.join(cache_dir, "ephemeris_%+.4f_%+.4f_%d.npy" % key)
+    if not os.path.isfile(path):
+      with metrics.stage("ephemeris_generation"):
+        generate(path, key[0], key[1], key[2])
+    caches[key] = EphemerisCache(path, key[2])
+  return caches[key]
+
+def sample(latitude, longitude, jd):
+  # all fields at the julian dates jd (UTC), a night is taken from the cache of
+  # its middle, longer ranges are split at the turn of the year
+  jd = np.asarray(jd, dtype=float)
+  first, last = year_of(np.min(jd)), year_of(np.max(jd))
+  if first == last or np.max(jd) - np.min(jd) < padding:
+    return get(latitude, longitude, year_of(np.mean(jd))).sample(jd)
+  values = dict((field, np.zeros(jd.shape)) for field in fields)
+  for year in range(first, last + 1):
+    selected = (jd >= start_jd(year) + padding) & (jd < start_jd(year + 1) + padding)
+    if np.any(selected):
+      for field, v in get(latitude, longitude, year).sample(jd[selected]).items():
+        values[field][selected] = v
+  return values
+
+def next_crossing(latitude, longitude, field, jd, level, rising):
+  # next time (UTC datetime) the field crosses level after jd, continued in the
+  # cache of the next year beyond the end of the year
+  year = year_of(jd)
+  moment = get(latitude, longitude, year).next_crossing(field, jd, level, rising)
+  if moment is None:
+    following = get(latitude, longitude, year + 1)
+    moment = following.next_crossing(field, max(jd, following.jd0), level, rising)
+  return moment
+
+def _interpolate(jd, coarse_jd, values, angle=False):
+  if angle:
+    values = np.degrees(np.unwrap(np.radians(values)))
+    return np.mod(np.interp(jd, coarse_jd, values), 360.0)
+  return np.interp(jd, coarse_jd, values)
+
+def _ecliptic_longitude(ra, dec):
+  eps = np.radians(23.4393)  # obliquity, J2000
+  ra, dec = np.radians(ra), np.radians(dec)
+  return np.degrees(np.arctan2(np.sin(ra) * np.cos(eps) + np.tan(dec) * np.sin(eps), np.cos(ra)))
+
+def generate(path, latitude, longitude, year):
+  if debug:
+    print("Generate ephemeris cache " + str(path))
+  first = start_jd(year)
+  days = (datetime.date(year + 1, 1, 1) - datetime.date(year, 1, 1)).days + 2 * padding
+  jd = first + np.arange(days * 24 * 60 // cadence) * cadence / (24.0 * 60.0)
+
+  coarse_jd = np.arange(jd[0] - body_step / 24.0, jd[-1] + 2 * body_step / 24.0, body_step / 24.0)
+  coarse = Time(coarse_jd, format="jd", scale="utc")
+  sun = get_sun(coarse)
+  moon = get_body("moon", coarse)
+  sun_ra = _interpolate(jd, coarse_jd, sun.ra.deg, True)
+  sun_dec = _interpolate(jd, coarse_jd, sun.dec.deg)
+  moon_ra = _interpolate(jd, coarse_jd, moon.ra.deg, True)
+  moon_dec = _interpolate(jd, coarse_jd, moon.dec.deg)
+  moon_distance = _interpolate(jd, coarse_jd, moon.distance.to_value(u.km))
+
+  data = np.zeros((len(fields), len(jd)), dtype=np.float32)
+  data[0], data[1] = altaz_engine.fast_altaz(sun_ra, sun_dec, jd, latitude, longitude)
+  moon_alt, data[3] = altaz_engine.fast_altaz(moon_ra, moon_dec, jd, latitude, longitude)
+  # topocentric correction, the moon's parallax is up to ~1 deg
+  parallax = np.degrees(np.arcsin(6378.137 / moon_distance))
+  data[2] = moon_alt - parallax * np.cos(np.radians(moon_alt))
+  # illuminated fraction from the sun-moon elongation
+  cos_elongation = np.sin(np.radians(sun_dec)) * np.sin(np.radians(moon_dec)) + np.cos(np.radians(sun_dec)) * np.cos(np.radians(moon_dec)) * np.cos(np.radians(sun_ra - moon_ra))
+  data[4] = (1 - cos_elongation) / 2
+  # phase 0..360 deg: difference of the ecliptic longitudes, 180 is full moon
+  data[5] = np.mod(_ecliptic_longitude(moon_ra, moon_dec) - _ecliptic_longitude(sun_ra, sun_dec), 360.0)
+  data[6] = moon_distance
+
+  # write to a temporary file first, parallel runs never see a half written cache
+  directory = os.path.dirname(os.path.abspath(path))
+  if not os.path.isdir(directory):
+    os.makedirs(directory)
+  temp_path = path + "." + str(os.getpid()) + ".tmp"
+  with open(temp_path, "wb") as f:
+    np.save(f, data)
+  os.replace(temp_path, path)
+
+class EphemerisCache:
+
+  def __init__(self, path, year):
+    self.path = path
+    self.year = year
+    self.data = np.load(path, mmap_mode="r")
+    self.jd0 = start_jd(year)
+    self.step = cadence / (24.0 * 60.0)
+    self.jd_end = self.jd0 + (self.data.shape[1] - 1) * self.step
+
+  def index(self, jd):
+    position = (np.asarray(jd, dtype=float) - self.jd0) / self.step
+    if np.min(position) < 0 or np.max(position) > self.data.shape[1] - 1:
+      raise ValueError("Time outside of the ephemeris cache " + str(self.path))
+    i = np.minimum(np.floor(position).astype(int), self.data.shape[1] - 2)
+    return i, position - i
+
+  def sample(self, jd):
+    i, fraction = self.index(jd)
+    values = {}
+    for k, field in enumerate(fields):
+      v0 = self.data[k][i].astype(float)
+      v1 = self.data[k][i + 1].astype(float)
+      if field in angles:
+        values[field] = np.mod(v0 + (np.mod(v1 - v0 + 180.0, 360.0) - 180.0) * fraction, 360.0)
+      else:
+        values[field] = v0 + (v1 - v0) * fraction
+    return values
+
+  def time_of(self, position):
+    return datetime.datetime(2000, 1, 1, 12, tzinfo=datetime.timezone.utc) + datetime.timedelta(days=self.jd0 + position * self.step - 2451545.0)
+
+  def next_crossing(self, field, jd, level, rising):
+    # next time the field crosses level after jd (UTC datetime), None beyond the cache
+    i, fraction = self.index(jd)
+    values = self.data[fields.index(field)][int(i):]
+    if rising:
+      k = np.nonzero((values[:-1] < level) & (values[1:] >= level))[0]
+    else:
+      k = np.nonzero((values[:-1] >= level) & (values[1:] < level))[0]
+    if field in angles:
+      # no wrap around 360 -> 0
+      k = k[np.abs(values[k + 1] - values[k]) < 180]
+    if len(k) == 0:
+      return None
+    k = k[0]
+    v0, v1 = float(values[k]), float(values[k + 1])
+    return self.time_of(int(i) + k + (level - v0) / (v1 - v0))
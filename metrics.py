@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs planner metrics
+#
+# Request latencies, cache hit rates and compute time per stage, collected in
+# memory by the planner modules and reported as JSON by the /metrics endpoint
+# of the planner daemon (see planner_daemon).
+#
+
+import time
+import contextlib
+
+debug = False
+
+started = time.time()
+requests = {}  # endpoint -> count, errors, total/max/last latency in s
+stages = {}  # stage -> count, total/max compute time in s
+caches = {}  # cache -> hits, misses
+
+def _add(table, name, seconds):
+  values = table.setdefault(name, dict(count=0, total=0.0, max=0.0))
+  values["count"] += 1
+  values["total"] += seconds
+  values["max"] = max(values["max"], seconds)
+  return values
+
+@contextlib.contextmanager
+def stage(name):
+  # with metrics.stage("altaz"): ...
+  start = time.perf_counter()
+  try:
+    yield
+  finally:
+    seconds = time.perf_counter() - start
+    _add(stages, name, seconds)
+    if debug:
+      print("Stage " + str(name) + ": " + str(round(seconds * 1000.0, 1)) + " ms")
+
+def request(endpoint, seconds, error=False):
+  values = _add(requests, endpoint, seconds)
+  values["last"] = seconds
+  values["errors"] = values.get("errors", 0) + (1 if error else 0)
+
+def count(cache, hits=0, misses=0):
+  values = caches.setdefault(cache, dict(hits=0, misses=0))
+  values["hits"] += hits
+  values["misses"] += misses
+
+def hit(cache, is_hit):
+  count(cache, 1 if is_hit else 0, 0 if is_hit else 1)
+
+def report():
+  # JSON serializable snapshot, times in ms
+  def times(values):
+    result = dict((key, value) for key, value in values.items() if key not in ["total", "max", "last"])
+    result["mean_ms"] = round(values["total"] / values["count"] * 1000.0, 3) if values["count"] else 0.0
+    result["max_ms"] = round(values["max"] * 1000.0, 3)
+    result["total_ms"] = round(values["total"] * 1000.0, 3)
+    if "last" in values:
+      result["last_ms"] = round(values["last"] * 1000.0, 3)
+    return result
+  cache_rates = {}
+  for cache, values in caches.items():
+    total = values["hits"] + values["misses"]
+    cache_rates[cache] = dict(hits=values["hits"], misses=values["misses"], hit_rate=round(values["hits"] / total, 4) if total else None)
+  return dict(uptime_s=round(time.time() - started, 1),
+              requests=dict((name, times(values)) for name, values in requests.items()),
+              stages=dict((name, times(values)) for name, values in stages.items()),
+              caches=cache_rates)
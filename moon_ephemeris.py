@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs nightly moon ephemeris
+#
+# The moon's track of a night (alt/az, illumination, phase) and its next rise,
+# set and full moon are taken from the ephemeris cache once per night. The moon
+# state at the time of any number of DSOs is then just an array interpolation.
+#
+
+import numpy as np
+import ephemeris_cache # own
+
+debug = False
+
+class MoonEphemeris:
+
+  def __init__(self, latitude, longitude, jd, ephemeris=None):
+    # jd: time grid of the night (UTC), ephemeris: ephemeris_cache.sample of
+    # that grid if the caller already has it
+    self.latitude = latitude
+    self.longitude = longitude
+    self.jd = np.asarray(jd, dtype=float)
+    if ephemeris is None:
+      ephemeris = ephemeris_cache.sample(latitude, longitude, self.jd)
+    self.alt = ephemeris["moon_alt"]
+    self.az = ephemeris["moon_az"]
+    self.illumination = ephemeris["moon_illumination"] * 100.0  # %
+    self.phase = ephemeris["moon_phase"]  # 0..360 deg, 180: full moon
+    self.distance = ephemeris["moon_distance"]  # km
+
+    # next events after the start of the night's time grid (UTC datetimes)
+    self.rise = ephemeris_cache.next_crossing(latitude, longitude, "moon_alt", self.jd[0], 0.0, True)
+    self.set = ephemeris_cache.next_crossing(latitude, longitude, "moon_alt", self.jd[0], 0.0, False)
+    self.full_moon = ephemeris_cache.next_crossing(latitude, longitude, "moon_phase", self.jd[0], 180.0, True)
+    if debug:
+      print("Moon rise: " + str(self.rise) + " set: " + str(self.set) + " next full moon: " + str(self.full_moon))
+
+  def at(self, jd):
+    # moon alt, az (deg), illumination (%) and phase (deg) at the julian dates
+    # jd (UTC) inside the night, scalar or array
+    jd = np.asarray(jd, dtype=float)
+    alt = np.interp(jd, self.jd, self.alt)
+    illumination = np.interp(jd, self.jd, self.illumination)
+    # angles via their unit vectors, no jumps at 360 -> 0
+    az = np.mod(np.degrees(np.arctan2(np.interp(jd, self.jd, np.sin(np.radians(self.az))), np.interp(jd, self.jd, np.cos(np.radians(self.az))))), 360.0)
+    phase = np.mod(np.degrees(np.arctan2(np.interp(jd, self.jd, np.sin(np.radians(self.phase))), np.interp(jd, self.jd, np.cos(np.radians(self.phase))))), 360.0)
+    return alt, az, illumination, phase
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs per-night observation context
+#
+# Everything that only depends on the date and the observers location (twilight
+# times, the time grid around midnight, the AltAz frame and the sun and moon
+# tracks from ephemeris_cache) is computed once per night and shared by all DSOs
+# of that night.
+#
+
+import datetime
+import collections
+import numpy as np
+import astropy.units as u
+from astropy.coordinates import AltAz, SkyCoord
+from astropy.time import Time
+import sky_utils # own
+import altaz_engine # own
+import ephemeris_cache # own
+import moon_ephemeris # own
+import metrics # own
+
+debug = False
+
+samples = 1000  # time grid resolution, 24 h around midnight
+
+max_contexts = None  # kept contexts, least recently used evicted beyond, None: all
+
+contexts = collections.OrderedDict()  # (date, latitude, longitude, elevation, utcoffset) -> NightContext
+
+def get(today, the_location, utcoffset):
+  key = (today.strftime("%d.%m.%Y"), round(the_location.lat.deg, 6), round(the_location.lon.deg, 6), round(the_location.height.to_value(u.m), 1), utcoffset.to_value(u.hour))
+  metrics.hit("night_context", key in contexts)
+  if key not in contexts:
+    with metrics.stage("night_context"):
+      contexts[key] = NightContext(today, the_location, utcoffset)
+    while max_contexts is not None and len(contexts) > max_contexts:
+      evicted, night = contexts.popitem(last=False)
+      if debug:
+        print("Night context evicted: " + str(evicted))
+  else:
+    contexts.move_to_end(key)
+    if debug:
+      print("Night context reused: " + str(key))
+  return contexts[key]
+
+def night_mask(obstimes, start, end):
+  if start is None or end is None:
+    return np.zeros(len(obstimes), dtype=bool)
+  return (obstimes > np.datetime64(start)) & (obstimes < np.datetime64(end))
+
+class NightContext:
+
+  def __init__(self, today, the_location, utcoffset):
+    self.today = today
+    self.tomorrow = today + datetime.timedelta(days=1)
+    self.theDate = today.strftime("%d.%m.%Y")
+    self.the_location = the_location
+    self.utcoffset = utcoffset
+
+    if debug:
+      print("Night context for " + str(self.theDate) + " at " + str(the_location.lat.deg) + ", " + str(the_location.lon.deg))
+
+    self.civil_night_start, self.civil_night_end, self.nautical_night_start, self.nautical_night_end, self.astronomical_night_start, self.astronomical_night_end = sky_utils.astro_night_times(self.theDate, the_location.lat.deg, the_location.lon.deg, debug)
+    if self.astronomical_night_start == None and self.astronomical_night_end == None:
+      self.astronomical_night_start = self.nautical_night_start
+      self.astronomical_night_end = self.nautical_night_end
+      if debug:
+        print("Astronomical night start: " + str(self.astronomical_night_start))
+        print("Astronomical night end: " + str(self.astronomical_night_end))
+
+    # +1: otherwise the dso graph does not match the x-axis ticks
+    self.midnight = Time(self.tomorrow.strftime("%Y-%m-%d") + " 00:00:00") - utcoffset
+    self.delta_midnight = np.linspace(-12, 12, samples) * u.hour
+    self.times_overnight = self.midnight + self.delta_midnight
+    self.frame_over_night = AltAz(obstime=self.times_overnight, location=the_location)
+    self.sample_minutes = 24 * 60 / (samples - 1)
+
+    # time axis and night masks for the vectorized peak search, obstimes are
+    # compared as UTC datetimes like the twilight times (TT is ~69 s ahead,
+    # the first sample of a mask would still be in the twilight)
+    self.jd = self.times_overnight.jd
+    self.obstime_datetimes = self.times_overnight.utc.datetime
+    obstimes = self.obstime_datetimes.astype("datetime64[us]")
+    self.nautical_mask = night_mask(obstimes, self.nautical_night_start, self.nautical_night_end)
+    self.astronomical_mask = night_mask(obstimes, self.astronomical_night_start, self.astronomical_night_end)
+
+    # sun and moon between noon and noon of the next day, sliced from the
+    # ephemeris cache of the year instead of get_sun/get_body transformations
+    ephemeris = ephemeris_cache.sample(the_location.lat.deg, the_location.lon.deg, self.jd)
+    self.sun_alt = ephemeris["sun_alt"]
+    self.sunaltazs_over_night = SkyCoord(alt=self.sun_alt * u.deg, az=ephemeris["sun_az"] * u.deg, frame=self.frame_over_night)
+    self.moon = moon_ephemeris.MoonEphemeris(the_location.lat.deg, the_location.lon.deg, self.jd, ephemeris)
+    self.moonaltazs_over_night = SkyCoord(alt=self.moon.alt * u.deg, az=self.moon.az * u.deg, frame=self.frame_over_night)
+
+    # alt/az matrix of all DSOs of the run, see objects_altaz
+    self.altaz = None
+
+  def objects_altaz(self, names, entries):
+    # one broadcast transform for all DSOs instead of one per DSO, names of
+    # later calls missing in the matrix are transformed and added to it
+    if self.altaz is None:
+      self.altaz = altaz_engine.from_entries(names, entries, self.frame_over_night)
+    else:
+      missing = [n for n in names if n in entries and entries[n]["resolved"] and n not in self.altaz]
+      if len(missing) > 0:
+        self.altaz.extend(altaz_engine.from_entries(missing, entries, self.frame_over_night))
+    return self.altaz
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs night-only sampling
+#
+# The tonight evaluation only needs the max. altitude of a DSO inside the
+# nautical night and the number of samples above 5 deg in it, but the time grid
+# of a NightContext covers 24 h, half of it daylight. The adaptive sampling
+# computes alt/az on a coarse grid of the dark samples only (every
+# coarse_minutes), then on the grid samples around the coarse max. and min.
+# altitude and between coarse samples on both sides of the threshold. The
+# altitude of a DSO has one max. and one min. per day, so peak and count are
+# those of the full grid with a fraction of the transformations. Each
+# transformation has a fixed cost, so fewer than min_objects DSOs take one
+# transformation of the full grid instead. The full 24 h track is computed
+# where it is needed (plots, --export_tracks).
+#
+
+import numpy as np
+import astropy.units as u
+from astropy.coordinates import AltAz, SkyCoord
+import altaz_engine # own
+import metrics # own
+
+debug = False
+
+samplings = ["adaptive", "full"]
+sampling = "adaptive"
+coarse_minutes = 15.0  # coarse grid inside the nautical night
+min_objects = 1000  # fewer DSOs are cheaper on the full grid (either engine)
+
+def altaz_at(ra, dec, night, index):
+  # alt, az in deg of ra/dec (deg) at the samples index of the night's time
+  # grid, ra/dec and index broadcast against each other. The fast engine
+  # precesses to the epoch of the whole grid, so any samples give the values
+  # of the full grid
+  coords = SkyCoord(ra=np.asarray(ra, dtype=float) * u.deg, dec=np.asarray(dec, dtype=float) * u.deg)
+  return altaz_engine.altaz(coords, AltAz(obstime=night.times_overnight[index], location=night.the_location), epoch=np.mean(night.times_overnight.utc.jd))
+
+def peaks(ra, dec, night, threshold=5):
+  # like altaz_engine.night_peaks with the nautical mask on the full grid: per
+  # DSO the index, altitude and azimuth of the max. altitude in the nautical
+  # night and the number of samples above threshold in it
+  with metrics.stage("night_sampling"):
+    return _peaks(np.asarray(ra, dtype=float), np.asarray(dec, dtype=float), night, threshold)
+
+def _peaks(ra, dec, night, threshold):
+  dark = np.nonzero(night.nautical_mask)[0]
+  if len(ra) < min_objects or len(dark) < 3:
+    alt, az = altaz_at(ra.reshape((len(ra), 1)), dec.reshape((len(dec), 1)), night, np.arange(len(night.jd)))
+    return altaz_engine.night_peaks(alt, az, night.nautical_mask, threshold)[:4]
+
+  # coarse samples: positions in dark, the first and the last included
+  step = max(1, int(round(coarse_minutes / night.sample_minutes)))
+  coarse = np.unique(np.append(np.arange(0, len(dark), step), len(dark) - 1))
+  coarse_alt, coarse_az = altaz_at(ra.reshape((len(ra), 1)), dec.reshape((len(dec), 1)), night, dark[coarse])
+  above = coarse_alt > threshold
+
+  # segments between neighbouring coarse samples to refine: around the coarse
+  # max. and min. and where the threshold is crossed
+  rows = np.arange(len(ra))
+  segments = len(coarse) - 1
+  refine = np.zeros((len(ra), segments), dtype=bool)
+  for k in [np.argmax(coarse_alt, axis=1), np.argmin(coarse_alt, axis=1)]:
+    refine[rows, np.clip(k - 1, 0, segments - 1)] = True
+    refine[rows, np.clip(k, 0, segments - 1)] = True
+  refine |= above[:, :-1] != above[:, 1:]
+
+  # samples inside the refined segments, one transformation per segment: the
+  # DSOs of a segment share its obstimes (astropy's cost is per obstime)
+  inner = coarse[1:] - coarse[:-1] - 1
+  refine &= inner > 0
+  obj, pos, fine_alt, fine_az = [np.zeros(0, dtype=int)], [np.zeros(0, dtype=int)], [np.zeros(0)], [np.zeros(0)]
+  for m in np.nonzero(refine.any(axis=0))[0]:
+    objects = np.nonzero(refine[:, m])[0]
+    positions = np.arange(coarse[m] + 1, coarse[m + 1])
+    alt, az = altaz_at(ra[objects].reshape((len(objects), 1)), dec[objects].reshape((len(objects), 1)), night, dark[positions])
+    obj.append(np.repeat(objects, len(positions)))
+    pos.append(np.tile(positions, len(objects)))
+    fine_alt.append(np.ravel(alt))
+    fine_az.append(np.ravel(az))
+  obj, pos, fine_alt, fine_az = np.concatenate(obj), np.concatenate(pos), np.concatenate(fine_alt), np.concatenate(fine_az)
+
+  # max. altitude of all evaluated samples, the earliest one like argmax
+  all_obj = np.concatenate([np.repeat(rows, len(coarse)), obj])
+  all_pos = np.concatenate([np.tile(coarse, len(ra)), pos])
+  all_alt = np.concatenate([coarse_alt.ravel(), fine_alt])
+  all_az = np.concatenate([coarse_az.ravel(), fine_az])
+  order = np.lexsort((all_pos, -all_alt, all_obj))
+  first = order[np.searchsorted(all_obj[order], rows)]
+
+  # samples above threshold: coarse samples, refined samples and the inner
+  # samples of the other segments, which are on the side of their ends
+  count = np.count_nonzero(above, axis=1)
+  count += np.bincount(obj[fine_alt > threshold], minlength=len(ra))
+  count += np.sum(np.where(above[:, :-1] & ~refine, inner, 0), axis=1)
+
+  if debug:
+    print("Night sampling: " + str(all_alt.size) + " alt/az samples instead of " + str(len(ra) * len(night.jd)))
+  return dark[all_pos[first]], all_alt[first], all_az[first], count
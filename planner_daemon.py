@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs planner daemon
+#
+# Answers planner queries with JSON over a local HTTP port or a Unix socket.
+# The process keeps the catalogue, the ephemeris caches, night contexts and
+# year grids in memory, so a poll only costs the query itself. Routes map a
+# path to a function of the query parameters returning a JSON serializable
+# dict, /metrics (see metrics) is always served. Requests are handled one
+# after the other, the planner state is not shared between threads.
+#
+
+import os
+import json
+import time
+import socketserver
+import http.server
+import urllib.parse
+import metrics # own
+
+debug = False
+
+default_host = "127.0.0.1"
+default_port = 8765
+
+class Handler(http.server.BaseHTTPRequestHandler):
+
+  routes = {}  # path -> function(params) -> dict
+
+  def do_GET(self):
+    url = urllib.parse.urlsplit(self.path)
+    params = dict(urllib.parse.parse_qsl(url.query))
+    endpoint = url.path.rstrip("/") or "/"
+    start = time.perf_counter()
+    status = 200
+    try:
+      if endpoint == "/metrics":
+        body = metrics.report()
+      elif endpoint in self.routes:
+        body = self.routes[endpoint](params)
+      else:
+        status = 404
+        body = dict(error="Unknown endpoint " + str(endpoint), endpoints=sorted(list(self.routes) + ["/metrics"]))
+    except ValueError as e:
+      # invalid query parameters or unknown DSOs
+      status = 400
+      body = dict(error=str(e))
+    except Exception as e:
+      print("Planner daemon error " + str(self.path) + ": " + str(e))
+      status = 500
+      body = dict(error=str(e))
+    if status != 404:
+      metrics.request(endpoint, time.perf_counter() - start, status != 200)
+
+    data = json.dumps(body).encode("utf-8")
+    self.send_response(status)
+    self.send_header("Content-Type", "application/json")
+    self.send_header("Content-Length", str(len(data)))
+    self.end_headers()
+    self.wfile.write(data)
+
+  def log_message(self, format, *args):
+    if debug:
+      print("Planner daemon: " + (format % args))
+
+class UnixHTTPServer(socketserver.UnixStreamServer):
+
+  def get_request(self):
+    # Unix sockets have no client address, the handler expects a tuple
+    request, client_address = super().get_request()
+    return request, ("local", 0)
+
+def serve(routes, host=default_host, port=default_port, socket_path=None):
+  # blocks until interrupted
+  Handler.routes = routes
+  if socket_path:
+    if os.path.exists(socket_path):
+      os.remove(socket_path)
+    server = UnixHTTPServer(socket_path, Handler)
+    address = "unix:" + str(socket_path)
+  else:
+    server = http.server.HTTPServer((host, port), Handler)
+    address = "http://" + str(host) + ":" + str(server.server_port)
+  print("Planner daemon listening on " + address + ": " + ", ".join(sorted(list(routes) + ["/metrics"])))
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
+    if socket_path and os.path.exists(socket_path):
+      os.remove(socket_path)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs plot renderer
+#
+# Renders the yearly altitude plots of --best with the non-interactive Agg
+# backend. Figure, axes, ticks, labels and colorbar are set up and drawn once
+# per process, every DSO only draws its tracks (a single LineCollection),
+# the legend and the title onto a copy of that background. The artists are
+# removed again after saving, so rendering a whole catalogue keeps the memory
+# flat. Tracks are plain data, --jobs workers render with their own template.
+#
+
+import numpy as np
+
+debug = False
+
+template = {}  # figure, axes, LineCollection and Line2D of this process
+
+def _template():
+  if "figure" not in template:
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.style
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.collections import LineCollection
+    from matplotlib.lines import Line2D
+    from matplotlib.cm import ScalarMappable
+    from matplotlib.colors import Normalize
+    from matplotlib.ticker import FuncFormatter
+    from astropy.visualization import astropy_mpl_style
+    matplotlib.style.use(astropy_mpl_style)
+
+    # pixels like savefig of the style, the canvas is saved as it is
+    dpi = matplotlib.rcParams["savefig.dpi"]
+    if dpi == "figure":
+      dpi = matplotlib.rcParams["figure.dpi"]
+    figure = Figure(facecolor='lightgrey', dpi=dpi)
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    # the colorbar of the former scatter plots (last scatter's alpha)
+    figure.colorbar(ScalarMappable(norm=Normalize(0, 1)), ax=axes, alpha=0.3).set_label("Azimuth [deg]")
+    # x-axis labels: actual hours instead of hours from midnight
+    xt = np.arange(13) * 2 - 12
+    axes.set_xlim(-12, 12)
+    axes.set_xticks(xt)
+    axes.set_xticklabels([x + 24 if x < 0 else x for x in xt])
+    axes.set_ylim(0, 90)
+    axes.yaxis.set_major_formatter(FuncFormatter(lambda y, position: "%g°" % y))
+    axes.set_xlabel("Hours from Midnight") # EDT: Eastern Daylight Time
+    axes.set_ylabel("Altitude [deg]")
+    # text layout is the expensive part of drawing, the static parts are kept as pixels
+    figure.canvas.draw()
+    background = figure.canvas.copy_from_bbox(figure.bbox)
+    template.update(figure=figure, axes=axes, background=background, LineCollection=LineCollection, Line2D=Line2D)
+    if debug:
+      print("Plot template created")
+  return template
+
+def render(path, title, tracks):
+  # tracks: (alt in deg over 24 h around midnight, color, alpha, label)
+  from matplotlib.colors import to_rgba
+  from PIL import Image
+  t = _template()
+  figure = t["figure"]
+  axes = t["axes"]
+  segments = [np.column_stack([np.linspace(-12, 12, len(alt)), alt]) for alt, color, alpha, label in tracks]
+  colors = [to_rgba(color, alpha) for alt, color, alpha, label in tracks]
+  lines = t["LineCollection"](segments, colors=colors, linewidths=2)
+  axes.add_collection(lines)
+  handles = [t["Line2D"]([], [], color=color, alpha=alpha, linewidth=2, label=label) for alt, color, alpha, label in tracks]
+  legend = axes.legend(handles=handles, loc="upper center", fontsize="small", ncol=3)
+  axes.set_title(title)
+  try:
+    figure.canvas.restore_region(t["background"])
+    axes.draw_artist(lines)
+    axes.draw_artist(legend)
+    axes.draw_artist(axes.title)
+    width, height = figure.canvas.get_width_height()
+    Image.frombuffer("RGBA", (width, height), figure.canvas.buffer_rgba(), "raw", "RGBA", 0, 1).save(path, dpi=(figure.dpi, figure.dpi))
+  finally:
+    lines.remove()
+    legend.remove()
+    axes.set_title("")
+  if debug:
+    print("Saved: " + str(path))
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs declination/RA pre-filter
+#
+# Before any alt/az work the highest altitude of every DSO during the nautical
+# night is computed in closed form from its declination, the latitude and the
+# local sidereal time window of the night: the altitude is highest at the
+# hour angle closest to the meridian. DSOs that stay below the visibility
+# threshold are reported invisible with the reason, the others are evaluated.
+# The same closed form gives the darkest part of the night a DSO is up in.
+#
+
+import numpy as np
+import altaz_engine # own
+import scoring # own
+
+debug = False
+
+# deg, the closed form uses J2000 coordinates (up to ~0.4 deg of precession
+# since) and the night window of the sampled time grid
+margin = 1.0
+
+def night_max_altitude(ra, dec, latitude, lst_start, lst_end):
+  # highest altitude in deg while the local sidereal time runs from lst_start
+  # to lst_end (deg, less than 24 h apart) and the hour angle at that altitude
+  ra = np.asarray(ra, dtype=float)
+  dec = np.radians(np.asarray(dec, dtype=float))
+  window = np.mod(lst_end - lst_start, 360.0)
+  # hour angle at the start of the window, 0 .. 360
+  ha_start = np.mod(lst_start - ra, 360.0)
+  # the meridian (ha 0/360) is crossed inside the window
+  transit = ha_start + window >= 360.0
+  ha_end = ha_start + window
+  # otherwise the window end nearest to the meridian
+  ha = np.where(transit, 0.0, np.where(np.cos(np.radians(ha_start)) >= np.cos(np.radians(ha_end)), ha_start, ha_end))
+  lat = np.radians(latitude)
+  sin_alt = np.sin(dec) * np.sin(lat) + np.cos(dec) * np.cos(lat) * np.cos(np.radians(ha))
+  return np.degrees(np.arcsin(np.clip(sin_alt, -1.0, 1.0))), ha
+
+def check(ra, dec, night, threshold=None):
+  # keep mask, highest night altitude and reasons ("" for kept DSOs) for
+  # the DSOs of a NightContext
+  if threshold is None:
+    threshold = scoring.min_altitude
+  ra = np.asarray(ra, dtype=float)
+  dec = np.asarray(dec, dtype=float)
+  latitude = night.the_location.lat.deg
+  if not night.nautical_mask.any():
+    return np.ones(len(ra), dtype=bool), np.full(len(ra), np.nan), [""] * len(ra)
+  jd = night.jd[night.nautical_mask]
+  lst = altaz_engine.local_sidereal_time(np.array([jd[0], jd[-1]]), night.the_location.lon.deg)
+  max_alt, ha = night_max_altitude(ra, dec, latitude, lst[0], lst[1])
+  keep = max_alt >= threshold - margin
+
+  transit_alt = 90.0 - np.abs(latitude - dec)
+  reasons = []
+  for k in range(len(ra)):
+    if keep[k]:
+      reasons.append("")
+    elif transit_alt[k] < threshold - margin:
+      reasons.append("never above " + str(threshold) + " deg at latitude " + str(round(latitude, 1)) + " (max. " + str(round(transit_alt[k], 0)) + " deg at Dec " + str(round(dec[k], 1)) + ")")
+    else:
+      reasons.append("transits in daylight, max. " + str(round(max_alt[k], 0)) + " deg during the nautical night (RA " + str(round(ra[k] / 15.0, 1)) + " h)")
+  if debug:
+    print("Pre-filter: " + str(np.count_nonzero(~keep)) + " of " + str(len(ra)) + " DSOs below " + str(threshold) + " deg during the night")
+  return keep, max_alt, reasons
+
+def darkness(ra, dec, night, threshold=None):
+  # darkness (see scoring.darkness) of the darkest samples of the nautical
+  # night of a NightContext with the DSOs above threshold: their highest
+  # altitude while the sun is below the nautical and the astronomical level
+  if threshold is None:
+    threshold = scoring.min_altitude
+  ra = np.asarray(ra, dtype=float)
+  dec = np.asarray(dec, dtype=float)
+  result = np.zeros(len(ra))
+  sun_darkness = np.where(night.nautical_mask, scoring.darkness(night.sun_alt), 0.0)
+  for level in np.unique(sun_darkness[sun_darkness > 0]):
+    # the samples at least that dark are one window of the night
+    jd = night.jd[sun_darkness >= level]
+    lst = altaz_engine.local_sidereal_time(np.array([jd[0], jd[-1]]), night.the_location.lon.deg)
+    max_alt, ha = night_max_altitude(ra, dec, night.the_location.lat.deg, lst[0], lst[1])
+    result[max_alt > threshold] = level
+  return result
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs tonight result cache
+#
+# The results of a night (peak data, scores, moon remarks and the alt/az
+# track) are kept per DSO in a small SQLite file next to the script. Entries
+# are content-addressed: the key is a hash of everything a result depends on
+# (name and coordinates of the DSO, night, location, catalogue, engine and the
+# version of the computation, sampling and time resolution), so changed
+# inputs simply miss and stale entries age out through the size limit (least
+# recently used first, evict() once per run). Several cron jobs may use the
+# file at the same time.
+#
+
+import os
+import json
+import time
+import pickle
+import hashlib
+import sqlite3
+import weakref
+import numpy as np
+import astropy.units as u
+import catalogue_store # own
+import night_sampling # own
+import metrics # own
+
+debug = False
+
+default_path = "result_cache.sqlite"
+version = 3  # increase when the computation of the results changes
+max_bytes = 256 * 1024 * 1024  # evicted down to this size, see evict
+
+nights = weakref.WeakKeyDictionary()  # NightContext -> night part of the keys, the location conversions are slow
+
+def key(entry, night, catalogue, engine):
+  # content address of the result of a catalogue entry in a NightContext
+  if night not in nights:
+    nights[night] = [night.theDate, round(night.the_location.lat.deg, 6), round(night.the_location.lon.deg, 6), round(night.the_location.height.to_value(u.m), 1),
+                     night.utcoffset.to_value(u.hour), len(night.jd), round(night.sample_minutes, 6)]
+  values = [version,
+            catalogue_store.normalize_name(entry["name"]), round(float(entry["ra"]), 7), round(float(entry["dec"]), 7),
+            entry.get("otype"), entry.get("v_mag"), entry.get("major_axis"), entry.get("minor_axis")] + nights[night] + [str(catalogue), str(engine), night_sampling.sampling]
+  return hashlib.sha256(json.dumps(values).encode("utf-8")).hexdigest()
+
+class ResultCache:
+
+  def __init__(self, path=default_path, size=None):
+    self.path = path
+    self.max_bytes = max_bytes if size is None else size
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+      os.makedirs(directory)
+    # several cron jobs may use the same file, wait for locks instead of
+    # failing, readers do not block the writer
+    self.connection = sqlite3.connect(path, timeout=30)
+    self.connection.execute("PRAGMA journal_mode=WAL")
+    with self.connection:
+      self.connection.execute("CREATE TABLE IF NOT EXISTS results ("
+                              "key TEXT PRIMARY KEY, "
+                              "name TEXT, "
+                              "night TEXT, "
+                              "result BLOB NOT NULL, "
+                              "alt BLOB, "
+                              "az BLOB, "
+                              "size INTEGER NOT NULL, "
+                              "used REAL NOT NULL)")
+      self.connection.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+
+  def get_many(self, keys, tracks=None, names=None):
+    # key -> DSOResult of the cached keys, tracks: TrackStore for the alt/az
+    # tracks, names: key -> DSO name of the run, the results are renamed (the
+    # key normalizes the name, another run may have put e.g. NGC188 for NGC 188)
+    keys = list(keys)
+    found = {}
+    columns = "key, result, alt, az" if tracks is not None else "key, result"
+    for i in range(0, len(keys), 500):
+      chunk = keys[i:i + 500]
+      for row in self.connection.execute("SELECT " + columns + " FROM results WHERE key IN (" + ", ".join(["?"] * len(chunk)) + ")", chunk):
+        result = pickle.loads(row[1])
+        if names is not None:
+          result.the_object_name = names[row[0]]
+        if tracks is not None and row[2] is not None:
+          result.tracks = tracks
+          result.track_index = tracks.add(np.frombuffer(row[2], dtype=np.float32), np.frombuffer(row[3], dtype=np.float32))
+        found[row[0]] = result
+    if len(found) > 0:
+      now = time.time()
+      found_keys = list(found)
+      with self.connection:
+        for i in range(0, len(found_keys), 500):
+          chunk = found_keys[i:i + 500]
+          self.connection.execute("UPDATE results SET used = ? WHERE key IN (" + ", ".join(["?"] * len(chunk)) + ")", [now] + chunk)
+    metrics.count("result_cache", len(found), len(keys) - len(found))
+    if debug:
+      print("Result cache: " + str(len(found)) + " of " + str(len(keys)) + " results cached")
+    return found
+
+  def put_many(self, items):
+    # items: (key, DSOResult, alt, az), alt/az None without a track. Put the
+    # results of a run in few batches and evict() once at its end
+    now = time.time()
+    rows = []
+    for k, result, alt, az in items:
+      data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+      alt = np.asarray(alt, dtype=np.float32).tobytes() if alt is not None else None
+      az = np.asarray(az, dtype=np.float32).tobytes() if az is not None else None
+      size = len(data) + (len(alt) if alt is not None else 0) + (len(az) if az is not None else 0)
+      rows.append((k, result.the_object_name, result.theDate, data, alt, az, size, now))
+    if len(rows) == 0:
+      return
+    with self.connection:
+      self.connection.executemany("INSERT OR REPLACE INTO results (key, name, night, result, alt, az, size, used) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+  def size(self):
+    return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+  def evict(self):
+    # least recently used entries until the cache fits max_bytes
+    with self.connection:
+      total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+      if total <= self.max_bytes:
+        return 0
+      evicted = []
+      for k, size in self.connection.execute("SELECT key, size FROM results ORDER BY used"):
+        if total <= self.max_bytes:
+          break
+        evicted.append((k,))
+        total -= size
+      self.connection.executemany("DELETE FROM results WHERE key = ?", evicted)
+    if debug:
+      print("Result cache: " + str(len(evicted)) + " results evicted")
+    return len(evicted)
+
+  def close(self):
+    self.connection.close()
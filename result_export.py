@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs result export
+#
+# Writes the results of a --tonight run as rows for other tools instead of
+# text: JSON Lines (no further packages), Parquet or Arrow IPC (pyarrow). A row holds the peak data, twilight windows, moon remarks
+# and the scoring features of a DSO, with tracks also its alt/az over the
+# night (float32, sample k at track_start + k * track_step seconds, the time
+# axis of max_alt_time and max_alt_index). Rows are written in batches while
+# the results come in, a large catalogue is never held as one table.
+#
+
+import json
+import numpy as np
+import altaz_engine # own
+
+debug = False
+
+formats = {".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet", ".pq": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+batch_size = 1000  # rows per record batch / row group
+
+# columns: name, type (bool, int, float, string, timestamp)
+run_fields = [("location", "string"), ("latitude", "float"), ("longitude", "float"), ("elevation", "float"), ("catalogue", "string")]
+result_fields = [("the_object_name", "string"), ("theDate", "string"), ("ra", "float"), ("dec", "float"),
+                 ("object_type", "string"), ("object_type_string", "string"), ("magnitude", "float"), ("major_axis", "float"), ("minor_axis", "float"),
+                 ("nautical_night_start", "timestamp"), ("nautical_night_end", "timestamp"), ("astronomical_night_start", "timestamp"), ("astronomical_night_end", "timestamp"),
+                 ("max_alt", "float"), ("max_alt_direction", "string"), ("max_alt_az", "float"), ("max_alt_time", "timestamp"), ("max_alt_index", "int"),
+                 ("minutes_visible", "float"), ("visible", "bool"), ("score_at_max_alt", "bool"), ("top_score_at_max_alt", "bool"),
+                 ("sub_text_moon_at_max_alt", "string"), ("moon_dir_at_max_alt", "string"), ("moon_alt_at_max_alt", "float"), ("moon_phase_percent_at_max_alt", "float"),
+                 ("reason", "string")]
+# see scoring.features
+feature_fields = [("feature_target_alt", "float"), ("feature_darkness", "float"), ("feature_moon_alt", "float"), ("feature_moon_illumination", "float"),
+                  ("feature_moon_separation", "float"), ("feature_score", "float"), ("feature_moon_top", "bool"), ("feature_moon_ok", "bool")]
+track_fields = [("track_start", "timestamp"), ("track_step", "float"), ("alt", "track"), ("az", "track")]
+
+def format_of(path):
+  for extension, name in formats.items():
+    if str(path).lower().endswith(extension):
+      return name
+  raise ValueError("Unknown export format of " + str(path) + ", use one of " + ", ".join(formats))
+
+def _value(value):
+  # plain Python values, NaN as missing
+  if isinstance(value, (np.ndarray, np.generic)):
+    value = value.item()
+  if isinstance(value, float) and value != value:
+    return None
+  return value
+
+def _arrow_type(pa, name):
+  return dict(bool=pa.bool_(), int=pa.int64(), float=pa.float64(), string=pa.string(),
+              timestamp=pa.timestamp("us"), track=pa.list_(pa.float32()))[name]
+
+class ResultExport:
+
+  def __init__(self, path, night, run, tracks=False):
+    # night: NightContext of the results, run: values of run_fields
+    self.path = path
+    self.format = format_of(path)
+    self.night = night
+    self.run = dict((name, run.get(name)) for name, kind in run_fields)
+    self.tracks = tracks
+    self.fields = run_fields + result_fields + feature_fields + (track_fields if tracks else [])
+    self.rows = []
+    self.count = 0
+    if self.format == "jsonl":
+      self.file = open(path, "w", encoding="utf-8")
+    else:
+      try:
+        import pyarrow as pa
+      except ImportError:
+        raise ImportError("Writing " + self.format + " files needs pyarrow: sudo pip3 install pyarrow --break-system-packages")
+      self.schema = pa.schema([(name, _arrow_type(pa, kind)) for name, kind in self.fields],
+                              metadata={"night": night.theDate, "samples": str(len(night.jd)), "track_step": str(night.sample_minutes * 60)})
+      if self.format == "parquet":
+        import pyarrow.parquet as pq
+        self.writer = pq.ParquetWriter(path, self.schema)
+      else:
+        self.writer = pa.ipc.new_file(path, self.schema)
+
+  def write(self, results):
+    # DSOResults, written in batches of batch_size
+    for result in results:
+      self.rows.append(result)
+      if len(self.rows) >= batch_size:
+        self.flush()
+
+  def _tracks(self, results):
+    # alt/az of the results over the night: kept tracks or one matrix for the others
+    alt = [None] * len(results)
+    az = [None] * len(results)
+    entries = {}
+    for k, result in enumerate(results):
+      alt[k], az[k] = result.track()
+      if alt[k] is None and result.ra is not None and result.dec is not None:
+        entries[k] = dict(ra=result.ra, dec=result.dec, resolved=True)
+    if len(entries) > 0:
+      names = [str(k) for k in entries]
+      matrix = altaz_engine.from_entries(names, dict((str(k), entry) for k, entry in entries.items()), self.night.frame_over_night)
+      for i, k in enumerate(entries):
+        alt[k], az[k] = matrix.alt[i], matrix.az[i]
+    return alt, az
+
+  def _row(self, result):
+    row = dict(self.run)
+    for name, kind in result_fields:
+      row[name] = _value(getattr(result, name))
+    features = result.features or {}
+    for name, kind in feature_fields:
+      row[name] = _value(features.get(name[len("feature_"):]))
+    return row
+
+  def flush(self):
+    if len(self.rows) == 0:
+      return
+    rows = [self._row(result) for result in self.rows]
+    if self.tracks:
+      alt, az = self._tracks(self.rows)
+      start = self.night.obstime_datetimes[0]
+      for k, row in enumerate(rows):
+        row["track_start"] = start if alt[k] is not None else None
+        row["track_step"] = self.night.sample_minutes * 60 if alt[k] is not None else None
+        row["alt"] = np.asarray(alt[k], dtype=np.float32) if alt[k] is not None else None
+        row["az"] = np.asarray(az[k], dtype=np.float32) if az[k] is not None else None
+    if self.format == "jsonl":
+      for row in rows:
+        for name in ["alt", "az"]:
+          if row.get(name) is not None:
+            row[name] = [round(x, 3) for x in row[name].tolist()]
+        self.file.write(json.dumps(row, default=lambda value: value.isoformat()) + "\n")
+    else:
+      import pyarrow as pa
+      columns = [pa.array([row[name] for row in rows], type=self.schema.field(name).type) for name, kind in self.fields]
+      self.writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=self.schema))
+    self.count += len(rows)
+    if debug:
+      print("Export: " + str(len(rows)) + " rows written to " + str(self.path))
+    self.rows = []
+
+  def close(self):
+    self.flush()
+    if self.format == "jsonl":
+      self.file.close()
+    else:
+      self.writer.close()
+    return self.count
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs numeric DSO scoring
+#
+# Numeric features of DSOs at a given time (target altitude, darkness, moon
+# altitude, illumination and moon-target separation) and a composite score
+# 0..1, computed for any number of objects at once. The moon check texts and
+# the filters of sort_DSOs and the best night search are based on them.
+#
+
+import numpy as np
+
+debug = False
+
+min_altitude = 5  # deg, like DSO.max_altitudes
+min_visible_minutes = 44  # above min_altitude during the nautical night to be visible (31 samples of the default grid)
+min_moon_separation = 30  # deg, a moon above the horizon closer than this is not OK
+
+def separation(alt1, az1, alt2, az2):
+  # angular distance in deg of two alt/az positions
+  alt1, az1, alt2, az2 = np.radians(alt1), np.radians(az1), np.radians(alt2), np.radians(az2)
+  cos_sep = np.sin(alt1) * np.sin(alt2) + np.cos(alt1) * np.cos(alt2) * np.cos(az1 - az2)
+  return np.degrees(np.arccos(np.clip(cos_sep, -1.0, 1.0)))
+
+def darkness(sun_alt):
+  # 1: astronomical night, 0.5: nautical night, 0: brighter
+  return np.where(sun_alt < -18, 1.0, np.where(sun_alt < -12, 0.5, 0.0))
+
+def score(target_alt, darkness, moon_alt, moon_illumination, moon_separation):
+  # 0..1: altitude, darkness and moon (illumination 0..1 weighted by the
+  # angular distance to the DSO, no penalty below the horizon)
+  moon_factor = np.where(moon_alt < 0, 1.0, 1.0 - moon_illumination * (1.0 - moon_separation / 180.0))
+  return np.where(target_alt > min_altitude, darkness * moon_factor * np.sin(np.radians(target_alt)), 0.0)
+
+def features(target_alt, target_az, sun_alt, moon_alt, moon_az, moon_illumination, dark=None):
+  # all arguments arrays of the same shape, moon_illumination in %, dark:
+  # darkness of the DSOs instead of the darkness of sun_alt
+  target_alt = np.asarray(target_alt, dtype=float)
+  moon_alt = np.asarray(moon_alt, dtype=float)
+  moon_illumination = np.asarray(moon_illumination, dtype=float)
+  values = dict(target_alt=target_alt,
+                darkness=darkness(np.asarray(sun_alt, dtype=float)) if dark is None else np.asarray(dark, dtype=float),
+                moon_alt=moon_alt,
+                moon_illumination=moon_illumination,
+                moon_separation=separation(target_alt, target_az, moon_alt, moon_az))
+  values["score"] = score(target_alt, values["darkness"], moon_alt, moon_illumination / 100.0, values["moon_separation"])
+  # TOP: moon below the horizon, OK: TOP or the moon far enough away
+  values["moon_top"] = moon_alt < 0
+  values["moon_ok"] = values["moon_top"] | (values["moon_separation"] >= min_moon_separation)
+  return values
+
+def night_features(night, index, target_alt, target_az, dark=None):
+  # features of DSOs at the samples index of a NightContext time grid, dark:
+  # darkness of the DSOs (prefilter.darkness, the darkest part of the night
+  # they are up in), default the darkness at index
+  index = np.asarray(index, dtype=int)
+  moon_alt, moon_az, moon_illumination, moon_phase = night.moon.at(night.jd[index])
+  return features(target_alt, target_az, night.sun_alt[index], moon_alt, moon_az, moon_illumination, dark)
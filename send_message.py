@@ -6,33 +6,223 @@ Send a message
 @author: solveigh
 """
 
+# text(), image() and file() only queue the message and return, a background
+# thread delivers the queue with asyncio: up to concurrency sends at the same
+# time, several images/files in one send, failed sends retried with backoff.
+# The transport is pluggable (implement your own in Transport.send, blocking
+# code runs in a thread), FileSink and SocketSink are local stand-ins for
+# testing. close() waits for the queue at the end of a run, at most timeout s.
+
+import json
+import time
+import asyncio
+import threading
+
 
 debug = False
 
+concurrency = 2   # sends at the same time
+batch_size = 10   # images/files per send
+batch_wait = 0.5  # s to wait for further images/files of a send
+retries = 3       # further attempts of a failed send
+backoff = 2.0     # s before the first retry, doubled for every further one
 
-def text(message):
-  try:
-    msg = "Send message " + str(message) + " synchronously..."
+
+class Transport:
+
+  # batch: list of dicts, kind text (text) or image/file (path)
+  def send(self, batch):
     if debug:
-      print(msg)
+      for message in batch:
+        print("Send " + message["kind"] + " " + str(message.get("text", message.get("path"))))
     # TODO implement your own
-  except Exception as e:
-    print(e)
 
-def image(path_name):
+
+class FileSink(Transport):
+
+  # appends a JSON line per send
+  def __init__(self, path):
+    self.path = path
+
+  def send(self, batch):
+    with open(self.path, "a", encoding="utf-8") as f:
+      f.write(json.dumps(dict(time=time.time(), messages=batch)) + "\n")
+
+
+class SocketSink(Transport):
+
+  # a JSON line per send to a Unix socket path or (host, port)
+  def __init__(self, address):
+    self.address = address
+
+  async def send(self, batch):
+    if isinstance(self.address, tuple):
+      reader, writer = await asyncio.open_connection(self.address[0], self.address[1])
+    else:
+      reader, writer = await asyncio.open_unix_connection(self.address)
+    writer.write((json.dumps(dict(time=time.time(), messages=batch)) + "\n").encode("utf-8"))
+    await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+
+def sink(spec):
+  # file:PATH, unix:PATH or tcp:HOST:PORT
+  kind, _, address = str(spec).partition(":")
+  if kind == "file" and address:
+    return FileSink(address)
+  if kind == "unix" and address:
+    return SocketSink(address)
+  if kind == "tcp" and ":" in address:
+    host, port = address.rsplit(":", 1)
+    return SocketSink((host, int(port)))
+  raise ValueError("Unknown message sink " + str(spec) + ", use file:PATH, unix:PATH or tcp:HOST:PORT")
+
+
+transport = Transport()
+
+
+class Delivery:
+
+  def __init__(self):
+    self.loop = asyncio.new_event_loop()
+    self.pending = 0  # queued or being sent
+    self.failed = 0
+    self.idle = threading.Condition()
+    started = threading.Event()
+    self.thread = threading.Thread(target=self.run, args=(started,), name="send_message", daemon=True)
+    self.thread.start()
+    started.wait()
+
+  def run(self, started):
+    asyncio.set_event_loop(self.loop)
+    self.queue = asyncio.Queue()
+    self.semaphore = asyncio.Semaphore(concurrency)
+    self.loop.create_task(self.consume())
+    started.set()
+    self.loop.run_forever()
+    self.loop.close()
+
+  def put(self, message):
+    with self.idle:
+      self.pending += 1
+    self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+
+  async def consume(self):
+    held = None  # first message of the next send
+    while True:
+      message = held if held is not None else await self.queue.get()
+      held = None
+      batch = [message]
+      if message["kind"] != "text":
+        # images/files queued shortly after each other go into one send,
+        # a text keeps its place and ends the batch
+        deadline = self.loop.time() + batch_wait
+        while len(batch) < batch_size:
+          try:
+            message = await asyncio.wait_for(self.queue.get(), max(0.0, deadline - self.loop.time()))
+          except asyncio.TimeoutError:
+            break
+          if message["kind"] == "text":
+            held = message
+            break
+          batch.append(message)
+      await self.semaphore.acquire()
+      self.loop.create_task(self.send(batch))
+
+  async def send(self, batch):
+    try:
+      for attempt in range(retries + 1):
+        try:
+          if asyncio.iscoroutinefunction(transport.send):
+            await transport.send(batch)
+          else:
+            await self.in_thread(transport.send, batch)
+          if debug:
+            print("Sent " + str(len(batch)) + " messages")
+          break
+        except Exception as e:
+          if attempt == retries:
+            print("Send message error: " + str(e) + ", " + str(len(batch)) + " messages not sent")
+            self.failed += len(batch)
+          else:
+            if debug:
+              print("Send message error: " + str(e) + ", retry in " + str(backoff * 2 ** attempt) + " s")
+            await asyncio.sleep(backoff * 2 ** attempt)
+    finally:
+      self.semaphore.release()
+      with self.idle:
+        self.pending -= len(batch)
+        self.idle.notify_all()
+
+  async def in_thread(self, function, batch):
+    # a daemon thread instead of the executor, whose threads are joined at the
+    # exit: a hanging transport must not keep the process alive
+    future = self.loop.create_future()
+    def done(result, error):
+      if not future.done():
+        if error is not None:
+          future.set_exception(error)
+        else:
+          future.set_result(result)
+    def run():
+      result, error = None, None
+      try:
+        result = function(batch)
+      except Exception as e:
+        error = e
+      try:
+        self.loop.call_soon_threadsafe(done, result, error)
+      except RuntimeError:
+        pass  # loop closed, given up
+    threading.Thread(target=run, daemon=True).start()
+    return await future
+
+  async def shutdown(self):
+    # messages not sent by now are given up
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in tasks:
+      task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    self.loop.stop()
+
+  def wait(self, timeout=None):
+    # number of messages still queued or being sent after timeout s
+    with self.idle:
+      self.idle.wait_for(lambda: self.pending == 0, timeout)
+      return self.pending
+
+
+delivery = None  # started with the first message
+
+def _put(message):
+  global delivery
   try:
-    msg = "Send image " + str(path_name) + " synchronously..."
-    if debug:
-      print(msg)
-    # TODO implement your own
+    if delivery is None:
+      delivery = Delivery()
+    delivery.put(message)
   except Exception as e:
     print(e)
 
+def text(message):
+  _put(dict(kind="text", text=str(message)))
+
+def image(path_name):
+  _put(dict(kind="image", path=str(path_name)))
+
 def file(file_name):
-  try:
-    if debug:
-      print("Send file: ")
-      print(file_name)
-    # TODO implement your own
-  except Exception as e:
-    print(e)
+  _put(dict(kind="file", path=str(file_name)))
+
+def close(timeout=None):
+  # waits for the queued messages, returns the number of messages not delivered
+  global delivery
+  if delivery is None:
+    return 0
+  left = delivery.wait(timeout)
+  failed = delivery.failed
+  asyncio.run_coroutine_threadsafe(delivery.shutdown(), delivery.loop)
+  delivery.thread.join(1.0)
+  delivery = None
+  if left > 0:
+    print("Send message: " + str(left) + " messages not delivered within " + str(timeout) + " s")
+  return left + failed
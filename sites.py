@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs observing sites
+#
+# Reads several observing sites from a CSV file (columns name, latitude,
+# longitude and optionally elevation in m) for planning them in one run. The
+# nights of all sites share the time grid around midnight (same date and UTC
+# offset), so the alt/az of all DSOs at all sites is one (sites x objects x
+# times) array: one broadcast of the fast engine (precession and sidereal time
+# once for all sites) or one astropy transformation with a location per site.
+# Twilight, sun and moon come from the night contexts of the sites.
+#
+
+import csv
+import numpy as np
+import astropy.units as u
+from astropy.coordinates import AltAz, EarthLocation, SkyCoord
+import altaz_engine # own
+import night_context # own
+import metrics # own
+
+debug = False
+
+columns = {"name": ["name", "site", "location"],
+           "latitude": ["latitude", "lat"],
+           "longitude": ["longitude", "lon", "long"],
+           "elevation": ["elevation", "height", "altitude"]}
+
+def read(path):
+  # list of dict(name, latitude, longitude, elevation)
+  result = []
+  with open(path, newline="", encoding="utf-8") as f:
+    reader = csv.DictReader(f)
+    lower = dict((str(h).strip().lower(), h) for h in reader.fieldnames or [])
+    fields = {}
+    for field, names in columns.items():
+      for name in names:
+        if name in lower:
+          fields[field] = lower[name]
+          break
+    for field in ["latitude", "longitude"]:
+      if field not in fields:
+        raise ValueError("Sites file " + str(path) + " without a " + field + " column")
+    for row in reader:
+      if not str(row.get(fields["latitude"]) or "").strip():
+        continue
+      site = dict(name=str(row[fields["name"]]).strip() if "name" in fields else "Site " + str(len(result) + 1),
+                  latitude=float(row[fields["latitude"]]),
+                  longitude=float(row[fields["longitude"]]),
+                  elevation=float(row[fields["elevation"]]) if "elevation" in fields and str(row[fields["elevation"]]).strip() else 0.0)
+      result.append(site)
+  if len(result) == 0:
+    raise ValueError("No sites in " + str(path))
+  if debug:
+    print("Sites: " + ", ".join(site["name"] for site in result))
+  return result
+
+def location(site):
+  return EarthLocation(lat=site["latitude"] * u.deg, lon=site["longitude"] * u.deg, height=site["elevation"] * u.m)
+
+def nights(site_list, today, utcoffset):
+  # NightContext per site, see night_context.get
+  return [night_context.get(today, location(site), utcoffset) for site in site_list]
+
+def altaz(names, entries, site_nights, use_engine=None):
+  # alt, az in deg (sites x objects x times) of the resolved names, and those names
+  if use_engine is None:
+    use_engine = altaz_engine.engine
+  names = [n for n in names if n in entries and entries[n]["resolved"]]
+  jd = site_nights[0].jd
+  for night in site_nights[1:]:
+    if not np.array_equal(night.jd, jd):
+      raise ValueError("The nights of the sites need the same date and UTC offset")
+  ra = np.array([entries[n]["ra"] for n in names], dtype=float).reshape((len(names), 1))
+  dec = np.array([entries[n]["dec"] for n in names], dtype=float).reshape((len(names), 1))
+  latitude = np.array([night.the_location.lat.deg for night in site_nights]).reshape((len(site_nights), 1, 1))
+  longitude = np.array([night.the_location.lon.deg for night in site_nights]).reshape((len(site_nights), 1, 1))
+  with metrics.stage("sites_altaz"):
+    if len(names) == 0:
+      alt = np.zeros((len(site_nights), 0, len(jd)))
+      az = np.zeros((len(site_nights), 0, len(jd)))
+    elif use_engine == "fast":
+      alt, az = altaz_engine.fast_altaz(ra, dec, site_nights[0].times_overnight.utc.jd, latitude, longitude)
+    else:
+      # all sites in one transformation: (1, N, 1) coordinates, (S, 1, 1) locations, (T,) obstimes
+      the_locations = EarthLocation(lat=latitude * u.deg, lon=longitude * u.deg,
+                                    height=np.array([night.the_location.height.to_value(u.m) for night in site_nights]).reshape((len(site_nights), 1, 1)) * u.m)
+      coords = SkyCoord(ra=ra.reshape((1, len(names), 1)) * u.deg, dec=dec.reshape((1, len(names), 1)) * u.deg)
+      altazs = coords.transform_to(AltAz(obstime=site_nights[0].times_overnight, location=the_locations))
+      alt, az = altazs.alt.deg, altazs.az.deg
+  if debug:
+    print("Sites alt/az: " + str(alt.shape))
+  return alt, az, names
@@ -8,19 +8,17 @@
 import datetime
 from datetime import date
 import pytz
-from skyfield.api import load, wgs84, N, W
+import numpy as np
 from astropy.coordinates import AltAz
 from astropy.time import Time
-import ephem
 import config
-from skyfield.framelib import ecliptic_frame
+import altaz_engine # own
+import ephemeris_cache # own
 import decimal
 
 dec = decimal.Decimal
 debug = False
 
-eph = load('de421.bsp') # will be downloaded at first load
-
 def compass_direction(azimuth):
   direction = ""
   '''
@@ -79,12 +77,10 @@ def observation_night_directions(the_object, the_object_name, today, tomorrow, u
     time = Time(str(theDate_today) + " 18:59:00") + utcoffset
     if debug:
       print(time)
-    the_object_altaz = the_object.transform_to(AltAz(obstime=time, location=the_location))
-    to_alt = the_object_altaz.alt
-    to_az = the_object_altaz.az
+    to_alt, to_az = altaz_engine.altaz(the_object, AltAz(obstime=time, location=the_location))
     if debug:
       print(str(the_object_name) + "'s altitude = " + str(to_alt) + ", azimut = " + str(to_az))
-    direction_20 = compass_direction(to_az.value)
+    direction_20 = compass_direction(to_az)
     if debug:
       print(str(time) + ": " + str(direction_20))
 
@@ -92,12 +88,10 @@ def observation_night_directions(the_object, the_object_name, today, tomorrow, u
     time = Time(str(theDate_today) + " 20:59:00") + utcoffset
     if debug:
       print(time)
-    the_object_altaz = the_object.transform_to(AltAz(obstime=time, location=the_location))
-    to_alt = the_object_altaz.alt
-    to_az = the_object_altaz.az
+    to_alt, to_az = altaz_engine.altaz(the_object, AltAz(obstime=time, location=the_location))
     if debug:
       print(str(the_object_name) + "'s altitude = " + str(to_alt) + ", azimut = " + str(to_az))
-    direction_22 = compass_direction(to_az.value)
+    direction_22 = compass_direction(to_az)
     if debug:
       print(str(time) + ": " + str(direction_22))
 
@@ -105,12 +99,10 @@ def observation_night_directions(the_object, the_object_name, today, tomorrow, u
     time = Time(str(theDate_today) + " 21:59:00") + utcoffset
     if debug:
       print(time)
-    the_object_altaz = the_object.transform_to(AltAz(obstime=time, location=the_location))
-    to_alt = the_object_altaz.alt
-    to_az = the_object_altaz.az
+    to_alt, to_az = altaz_engine.altaz(the_object, AltAz(obstime=time, location=the_location))
     if debug:
       print(str(the_object_name) + "'s altitude = " + str(to_alt) + ", azimut = " + str(to_az))
-    direction_0 = compass_direction(to_az.value)
+    direction_0 = compass_direction(to_az)
     if debug:
       print(str(time) + ": " + str(direction_0))
 
@@ -118,12 +110,10 @@ def observation_night_directions(the_object, the_object_name, today, tomorrow, u
     time = Time(str(theDate_tomorrow) + " 00:00:00") + utcoffset
     if debug:
       print(time)
-    the_object_altaz = the_object.transform_to(AltAz(obstime=time, location=the_location))
-    to_alt = the_object_altaz.alt
-    to_az = the_object_altaz.az
+    to_alt, to_az = altaz_engine.altaz(the_object, AltAz(obstime=time, location=the_location))
     if debug:
       print(str(the_object_name) + "'s altitude = " + str(to_alt) + ", azimut = " + str(to_az))
-    direction_2 = compass_direction(to_az.value)
+    direction_2 = compass_direction(to_az)
     if debug:
       print(str(time) + ": " + str(direction_2))
 
@@ -131,12 +121,10 @@ def observation_night_directions(the_object, the_object_name, today, tomorrow, u
     time = Time(str(theDate_tomorrow) + " 01:59:00") + utcoffset
     if debug:
       print(time)
-    the_object_altaz = the_object.transform_to(AltAz(obstime=time, location=the_location))
-    to_alt = the_object_altaz.alt
-    to_az = the_object_altaz.az
+    to_alt, to_az = altaz_engine.altaz(the_object, AltAz(obstime=time, location=the_location))
     if debug:
       print(str(the_object_name) + "'s altitude = " + str(to_alt) + ", azimut = " + str(to_az))
-    direction_4 = compass_direction(to_az.value)
+    direction_4 = compass_direction(to_az)
     if debug:
       print(str(time) + ": " + str(direction_4))
 
@@ -144,12 +132,10 @@ def observation_night_directions(the_object, the_object_name, today, tomorrow, u
     time = Time(str(theDate_tomorrow) + " 03:59:00") + utcoffset
     if debug:
       print(time)
-    the_object_altaz = the_object.transform_to(AltAz(obstime=time, location=the_location))
-    to_alt = the_object_altaz.alt
-    to_az = the_object_altaz.az
+    to_alt, to_az = altaz_engine.altaz(the_object, AltAz(obstime=time, location=the_location))
     if debug:
       print(str(the_object_name) + "'s altitude = " + str(to_alt) + ", azimut = " + str(to_az))
-    direction_6 = compass_direction(to_az.value)
+    direction_6 = compass_direction(to_az)
     if debug:
       print(str(time) + ": " + str(direction_6))
 
@@ -158,62 +144,61 @@ def observation_night_directions(the_object, the_object_name, today, tomorrow, u
     print(str(e))
 
 
-def astro_night_times(theDate, latitude, longitude, debug):
-  civil_night_start = None
-  civil_night_end = None
-  nautical_night_start = None
-  nautical_night_end = None
-  astronomical_night_start = None
-  astronomical_night_end = None
-
-  today = datetime.date.today()
-  date_today = datetime.datetime.strptime(theDate, "%d.%m.%Y")
-  theDay = date_today.strftime("%d")
-  theMonth = date_today.strftime("%m")
-  theYear = date_today.strftime("%Y")
-  today = today.replace(day=int(theDay), month=int(theMonth), year=int(theYear))
-  tomorrow = today + datetime.timedelta(days=1)
-  date_tomorrow = datetime.datetime.strptime(tomorrow.strftime("%d.%m.%Y"), "%d.%m.%Y")
-
-  earth = ephem.Observer()
-  earth.lat = str(latitude)
-  earth.lon = str(longitude)
-  earth.date = date_today
-
-  sun = ephem.Sun()
-  sun.compute()
-
-  try:
-    earth.horizon = "0"
-    #sunset = ephem.localtime(earth.next_setting(sun))
-    #sunrise = ephem.localtime(earth.next_rising(sun))
-
-    earth.horizon = "-6"
-    earth.date = date_today
-    sun.compute()
-    civil_night_start = ephem.localtime(earth.next_setting(sun))
-    earth.date = date_tomorrow  # make sure to hit the next day's rising
-    sun.compute()
-    civil_night_end = ephem.localtime(earth.next_rising(sun))
+twilight_levels = [("civil", -6.0), ("nautical", -12.0), ("astronomical", -18.0)]
+
+def twilight_times(first_date, nights, latitude, longitude):
+  # night start/end of all levels for the evenings first_date .. first_date + nights - 1:
+  # the first sun setting below the level after 00:00 UTC of the date and the
+  # following rising (sun center, no refraction). Found on the sampled sun
+  # altitude of the ephemeris cache, interpolated linearly between the
+  # bracketing samples. Returns name -> datetime64 array (UTC), NaT where the
+  # sun does not get that low, e.g. no astronomical night in northern summers.
+  first = Time(first_date.strftime("%Y-%m-%d") + " 00:00:00", scale="utc").jd
+  starts = first + np.arange(nights)
+  step = ephemeris_cache.cadence / (24.0 * 60.0)
+  jd = np.arange(first, first + nights + 2 + step, step)
+  sun_alt = ephemeris_cache.sample(latitude, longitude, jd)["sun_alt"]
+
+  times = {}
+  for name, level in twilight_levels:
+    below = sun_alt < level
+    k = np.nonzero(below[1:] != below[:-1])[0]
+    crossing = jd[k] + (level - sun_alt[k]) / (sun_alt[k + 1] - sun_alt[k]) * step
+    setting = crossing[below[k + 1]]
+    rising = crossing[~below[k + 1]]
+    # first setting after 00:00 UTC of each date and the rising that ends it
+    i = np.searchsorted(setting, starts)
+    start = np.append(setting, np.inf)[i]
+    j = np.searchsorted(rising, start)
+    end = np.append(rising, np.inf)[j]
+    # no setting that day or no rising within a day: no night of that level
+    valid = (start < starts + 1) & (end < start + 1)
+    for key, values in [("start", start), ("end", end)]:
+      result = np.full(nights, np.datetime64("NaT"), dtype="datetime64[s]")
+      result[valid] = np.datetime64("2000-01-01T12:00:00") + np.round((values[valid] - 2451545.0) * 86400.0).astype("timedelta64[s]")
+      times[name + "_night_" + key] = result
+  return times
+
+def local_datetime(value):
+  # datetime64 (UTC) -> naive local datetime like ephem.localtime, None for NaT
+  if np.isnat(value):
+    return None
+  return datetime.datetime.fromtimestamp(value.astype("datetime64[s]").astype(int))
 
-    earth.horizon = "-12"
-    earth.date = date_today
-    sun.compute()
-    nautical_night_start = ephem.localtime(earth.next_setting(sun))
-    earth.date = date_tomorrow  # make sure to hit the next day's rising
-    sun.compute()
-    nautical_night_end = ephem.localtime(earth.next_rising(sun))
+def astro_night_times(theDate, latitude, longitude, debug):
+  # one night of twilight_times as naive local datetimes, None without such a night
+  date_today = datetime.datetime.strptime(theDate, "%d.%m.%Y").date()
+  times = twilight_times(date_today, 1, latitude, longitude)
 
-    earth.horizon = "-18"
-    earth.date = date_today
-    sun.compute()
-    astronomical_night_start = ephem.localtime(earth.next_setting(sun))
-    earth.date = date_tomorrow  # make sure to hit the next day's rising
-    sun.compute()
-    astronomical_night_end = ephem.localtime(earth.next_rising(sun))
+  civil_night_start = local_datetime(times["civil_night_start"][0])
+  civil_night_end = local_datetime(times["civil_night_end"][0])
+  nautical_night_start = local_datetime(times["nautical_night_start"][0])
+  nautical_night_end = local_datetime(times["nautical_night_end"][0])
+  astronomical_night_start = local_datetime(times["astronomical_night_start"][0])
+  astronomical_night_end = local_datetime(times["astronomical_night_end"][0])
 
-  # ephem throws an "AlwaysUpError" when there is no astronomical twilight (which occurs in summer in nordic countries)
-  except ephem.AlwaysUpError:
+  # no astronomical twilight (which occurs in summer in nordic countries)
+  if astronomical_night_start is None:
     if debug:
       print("No astronomical night at the moment: " + str(theDate))
 
@@ -227,50 +212,42 @@ def astro_night_times(theDate, latitude, longitude, debug):
 
   return civil_night_start, civil_night_end, nautical_night_start, nautical_night_end, astronomical_night_start, astronomical_night_end
 
-def moon_data(theDate, theTime):
+def moon_data(theDate, theTime, latitude=None, longitude=None):
+  # moon at theDate theTime (UTC) from the ephemeris cache, default location
+  # from config
+  if latitude is None or longitude is None:
+    latitude, longitude = config.coordinates['latitude'], config.coordinates['longitude']
   for_date = theDate.split(".")
   for_time = theTime.split(":")
   for_date = datetime.datetime(int(for_date[2]), int(for_date[1]), int(for_date[0]), int(for_time[0]), int(for_time[1]))
   #print(for_date)
 
-  home = ephem.Observer()
-  home.lat, home.lon = str(config.coordinates['latitude']), str(config.coordinates['longitude'])
-  home.date = for_date
-
-  moon = ephem.Moon()
-  moon.compute(home)
+  jd = Time(for_date, scale="utc").jd
+  moon = ephemeris_cache.get(latitude, longitude, for_date.year).sample(jd)
 
   tz_germany = pytz.timezone(config.coordinates['timezone'])
-  moon_rise = ephem.localtime(home.next_rising(moon)).astimezone(tz_germany).strftime("%d.%m.%Y %H:%M")
-  moon_set  = ephem.localtime(home.next_setting(moon)).astimezone(tz_germany).strftime("%d.%m.%Y %H:%M")
-  full_moon = ephem.localtime(ephem.next_full_moon(home.date)).strftime("%d.%m.%Y")
-
-  ts = load.timescale()
-  t = ts.utc(int(theDate.split(".")[2]), int(theDate.split(".")[1]), int(theDate.split(".")[0]), int(for_time[0]), int(for_time[1]))
-
-  sun, moon, earth = eph['sun'], eph['moon'], eph['earth']
-  #e = earth.at(t)
-  mylocation = earth + wgs84.latlon(49.878708* N, 8.646927*W)
-  l = mylocation.at(t)
-  s = l.observe(sun).apparent()
-  m = l.observe(moon).apparent()
-
-  _, slon, _ = s.frame_latlon(ecliptic_frame)
-  _, mlon, _ = m.frame_latlon(ecliptic_frame)
-  moon_phase = (mlon.degrees - slon.degrees) % 360.0
-  moon_phase_percent = 100.0 * m.fraction_illuminated(sun)
-
-  mlat, mlon, mdist = m.frame_latlon(ecliptic_frame)
-  #observer = wgs84.latlon(home.lat, home.lon)
-  #apparent = (earth + observer).at(t).observe(moon).apparent()
-  alt, az, distance = m.altaz()
+  def next_crossing(name, field, level, rising, time_format):
+    # None without a crossing in the cached span (a moon always up or never
+    # rising at high latitudes)
+    moment = ephemeris_cache.next_crossing(latitude, longitude, field, jd, level, rising)
+    if moment is None:
+      print("No " + name + " after " + str(theDate) + " " + str(theTime))
+      return None
+    return moment.astimezone(tz_germany).strftime(time_format)
+  moon_rise = next_crossing("moon rise", "moon_alt", 0.0, True, "%d.%m.%Y %H:%M")
+  moon_set  = next_crossing("moon set", "moon_alt", 0.0, False, "%d.%m.%Y %H:%M")
+  full_moon = next_crossing("full moon", "moon_phase", 180.0, True, "%d.%m.%Y")
+
+  moon_phase = float(moon["moon_phase"])
+  moon_phase_percent = 100.0 * float(moon["moon_illumination"])
+  alt, az, distance = float(moon["moon_alt"]), float(moon["moon_az"]), float(moon["moon_distance"])
 
   if debug:
-    print("Moonrise: " + moon_rise)
-    print("Moonset: " + moon_set)
+    print("Moonrise: " + str(moon_rise))
+    print("Moonset: " + str(moon_set))
     print("Next full moon: " + str(full_moon))
     print("Phase (0°–360°): " + str(moon_phase))
     print("Percent illuminated: " + str(moon_phase_percent))
-    print("Moon lat " + str(mlat.degrees) + " lon " + str(mlon.degrees) + " dist " + str(mdist))
+    print("Moon alt " + str(alt) + " az " + str(az) + " dist " + str(distance) + " km")
 
-  return moon_rise, moon_set, full_moon, round(moon_phase,0), round(moon_phase_percent,2), round(alt.degrees,0), round(az.degrees,0), distance
+  return moon_rise, moon_set, full_moon, round(moon_phase,0), round(moon_phase_percent,2), round(alt,0), round(az,0), distance
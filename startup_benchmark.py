@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs start-up benchmark
+#
+# Measures the wall time of fresh interpreter starts of the planner (default:
+# --help, i.e. imports and option parsing only) and lists the slowest imports
+# from python -X importtime, to catch heavy modules creeping back into the
+# start-up path.
+#
+# python3 startup_benchmark.py
+# python3 startup_benchmark.py --runs 10 -- -t -m # benchmark a complete run
+#
+
+import os, sys
+import optparse
+import subprocess
+import time
+import statistics
+
+debug = False
+
+script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "DSO_observation_planning.py")
+
+def wall_times(args, runs):
+  # s per fresh interpreter start
+  times = []
+  for k in range(runs):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, script] + args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    times.append(time.perf_counter() - start)
+    if debug:
+      print("Run " + str(k + 1) + ": " + str(round(times[-1], 3)) + " s")
+  return times
+
+def import_times(args, top):
+  # (cumulative us, module) of the slowest imports
+  result = subprocess.run([sys.executable, "-X", "importtime", script] + args, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=False)
+  entries = []
+  for line in result.stderr.splitlines():
+    # import time: self [us] | cumulative | imported package
+    if not line.startswith("import time:") or "cumulative" in line:
+      continue
+    fields = line[len("import time:"):].split("|")
+    if len(fields) != 3:
+      continue
+    entries.append((int(fields[1]), fields[2].strip()))
+  entries.sort(reverse=True)
+  return entries[:top]
+
+if __name__ == '__main__':
+  parser = optparse.OptionParser(usage="%prog [options] [-- planner arguments]")
+  parser.add_option("-r", "--runs", dest="runs", type="int", default=5,
+    help="number of interpreter starts (default: 5)")
+  parser.add_option("-n", "--top", dest="top", type="int", default=10,
+    help="number of slowest imports to list (default: 10)")
+  parser.add_option("-d", "--debug", dest="debug", action="store_true", default=False,
+    help="print every run")
+  (options, args) = parser.parse_args()
+  debug = options.debug
+  if len(args) == 0:
+    args = ["--help"]
+
+  times = wall_times(args, options.runs)
+  print("Start-up of DSO_observation_planning.py " + " ".join(args) + ": median " + str(round(statistics.median(times), 3)) + " s, min. " + str(round(min(times), 3)) + " s, max. " + str(round(max(times), 3)) + " s (" + str(options.runs) + " runs)")
+  print("Slowest imports (cumulative):")
+  for us, module in import_times(args, options.top):
+    print("  " + str(round(us / 1000.0, 1)).rjust(8) + " ms  " + module)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs multi-object alt/az engine tests
+#
+
+import numpy as np
+import astropy.units as u
+from astropy.coordinates import AltAz, EarthLocation, SkyCoord
+from astropy.time import Time
+import altaz_engine
+
+
+the_location = EarthLocation(lat=50.1 * u.deg, lon=8.7 * u.deg, height=100 * u.m)
+coords = SkyCoord(ra=[10.68, 83.8, 250.4, 11.8] * u.deg, dec=[41.27, -5.4, 36.5, 85.2] * u.deg)
+
+def test_fast_engine_planning_grade():
+  # about an arc minute off astropy over a whole year
+  report = altaz_engine.compare(coords, the_location, 2026)
+  assert report["samples"] == 4 * 365 * 6
+  assert report["max_alt_error"] < 2.0
+  assert report["max_az_error_on_sky"] < 2.0
+
+def test_engines_broadcast_alike():
+  times = Time("2026-10-15 22:00:00") + np.linspace(-12, 12, 50) * u.hour
+  frame = AltAz(obstime=times, location=the_location)
+  alt, az = altaz_engine.altaz(coords.reshape((4, 1)), frame, "astropy")
+  fast_alt, fast_az = altaz_engine.altaz(coords.reshape((4, 1)), frame, "fast")
+  assert fast_alt.shape == alt.shape == (4, 50)
+  assert np.max(np.abs(fast_alt - alt)) < 2.0 / 60.0
+
+def test_matrix_rows_by_normalized_name():
+  times = Time("2026-10-15 22:00:00") + np.linspace(-12, 12, 50) * u.hour
+  entries = {"M 31": dict(ra=10.68, dec=41.27, resolved=1), "M 42": dict(ra=83.8, dec=-5.4, resolved=1), "M 0": dict(ra=None, dec=None, resolved=0)}
+  matrix = altaz_engine.from_entries(["M 31", "M 0", "M 42"], entries, AltAz(obstime=times, location=the_location))
+  assert matrix.names == ["M 31", "M 42"]
+  assert "M42" in matrix and "M 0" not in matrix
+  assert np.array_equal(matrix.row("m42")[0], matrix.alt[1])
+
+def test_night_peaks():
+  alt = np.array([[0, 10, 30, 20, 4, 40], [1, 2, 3, 6, 7, 8]], dtype=float)
+  az = alt + 100
+  mask = np.array([False, True, True, True, True, False])
+  index, alt_max, az_max, above, index_total = altaz_engine.night_peaks(alt, az, mask)
+  assert list(index) == [2, 4]
+  assert list(alt_max) == [30, 7]
+  assert list(az_max) == [130, 107]
+  assert list(above) == [3, 2]
+  assert list(index_total) == [5, 5]
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs local catalogue file tests
+#
+
+import pytest
+import catalogue_file
+
+
+def write(tmp_path, text, name="catalogue.csv"):
+  path = tmp_path / name
+  path.write_text(text, encoding="utf-8")
+  return str(path)
+
+def test_sexagesimal_and_deg(tmp_path):
+  path = write(tmp_path, "Name;RA;Dec;Type;V-Mag;MajAx\n"
+                         "NGC 7000;20:59:17.1;+44:31:44;Neb;4.0;120\n"
+                         "IC 434;85.25;-2.4583;Neb;;60\n")
+  chunks = list(catalogue_file.read_chunks(path))
+  assert len(chunks) == 1
+  ngc, ic = chunks[0]
+  assert ngc["name"] == "NGC7000" and ngc["main_id"] == "NGC 7000"
+  assert ngc["ra"] == pytest.approx((20 + 59 / 60.0 + 17.1 / 3600.0) * 15.0)
+  assert ngc["dec"] == pytest.approx(44 + 31 / 60.0 + 44 / 3600.0)
+  assert ngc["otype"] == "Neb" and ngc["v_mag"] == 4.0 and ngc["major_axis"] == 120.0
+  assert ngc["resolved"] == 1
+  assert ic["ra"] == 85.25 and ic["dec"] == -2.4583
+  assert ic["v_mag"] is None and ic["minor_axis"] is None
+
+def test_negative_sexagesimal():
+  assert catalogue_file._angle("-00 30 00", False) == -0.5
+  assert catalogue_file._angle("01 30 00", True) == 22.5
+  assert catalogue_file._angle(" ", False) is None
+
+def test_mapping():
+  fields = catalogue_file.mapping(["MAIN_ID", "RAJ2000", "DEJ2000", "mag", "Other"])
+  assert fields == dict(name="MAIN_ID", ra="RAJ2000", dec="DEJ2000", v_mag="mag")
+
+def test_rows_skipped_and_chunks(tmp_path):
+  rows = ["name,ra,dec"] + ["NGC " + str(i) + "," + str(i) + ",10" for i in range(1, 6)]
+  rows += [",10,10", "NGC 9,,10", "NGC 10,10,"]
+  path = write(tmp_path, "\n".join(rows) + "\n")
+  chunks = list(catalogue_file.read_chunks(path, 2))
+  assert [len(c) for c in chunks] == [2, 2, 1]
+  assert [e["name"] for c in chunks for e in c] == ["NGC1", "NGC2", "NGC3", "NGC4", "NGC5"]
+
+def test_parquet(tmp_path):
+  pyarrow = pytest.importorskip("pyarrow")
+  import pyarrow.parquet
+  path = str(tmp_path / "catalogue.parquet")
+  pyarrow.parquet.write_table(pyarrow.table(dict(name=["M 31", "M 33"], ra=[10.68, 23.46], dec=[41.27, 30.66])), path)
+  chunks = list(catalogue_file.read_chunks(path))
+  assert [e["name"] for e in chunks[0]] == ["M31", "M33"]
+  assert chunks[0][1]["dec"] == 30.66
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs bulk DSO catalogue resolver tests
+#
+
+import catalogue_resolver
+import catalogue_store
+
+
+def failing_tap(query):
+  raise IOError("TAP service unavailable")
+
+def simbad_lookup(name):
+  # like DSO_observation_planning.simbad_lookup, no main_id/otype found
+  return dict(main_id=None, ra=10.68, dec=41.27, otype=None, b_mag=None, v_mag=None, major_axis=None, minor_axis=None)
+
+def test_failed_chunk_recorded(tmp_path):
+  store = catalogue_store.CatalogueStore(str(tmp_path / "dso_catalogue.sqlite"))
+  failed = []
+  entries = catalogue_resolver.resolve(["M 31", "NGC 188"], store, failing_tap, failed)
+  assert entries == {}
+  assert failed == ["M 31", "NGC 188"]
+  # nothing cached, the next run asks again
+  assert store.get("M 31") is None
+
+def test_lookup_fallback(tmp_path):
+  store = catalogue_store.CatalogueStore(str(tmp_path / "dso_catalogue.sqlite"))
+  failed = []
+  catalogue_resolver.resolve(["NGC 188"], store, failing_tap, failed)
+  for name in failed:
+    entry = catalogue_resolver.lookup(name, store, simbad_lookup)
+    assert entry["resolved"]
+    assert entry["ra"] == 10.68
+  assert store.get("NGC188")["resolved"]
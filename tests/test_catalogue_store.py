@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs local DSO catalogue store tests
+#
+
+import catalogue_store
+
+
+m31 = dict(main_id="M  31", ra=10.68, dec=41.27, otype="AGN", b_mag=4.36, v_mag=3.44, major_axis=199.53, minor_axis=70.79)
+
+def test_normalize_name():
+  assert catalogue_store.normalize_name("m 31") == "M31"
+  assert catalogue_store.normalize_name("NGC  188") == catalogue_store.normalize_name("ngc188")
+
+def test_put_get(tmp_path):
+  store = catalogue_store.CatalogueStore(str(tmp_path / "dso_catalogue.sqlite"))
+  assert store.get("M31") is None
+  store.put("M 31", m31)
+  entry = store.get("m31")
+  assert entry["name"] == "M31"
+  assert entry["ra"] == 10.68
+  assert entry["otype"] == "AGN"
+  assert entry["resolved"] == 1
+  assert store.misses == 1
+  assert store.hits == 1
+
+def test_offline_after_warm_up(tmp_path):
+  # a warmed store answers later runs without any lookup
+  path = str(tmp_path / "dso_catalogue.sqlite")
+  store = catalogue_store.CatalogueStore(path)
+  store.put("M 31", m31)
+  store.put("NGC 7000", dict(main_id=None, ra=None, dec=None, resolved=0))
+  store.close()
+  store = catalogue_store.CatalogueStore(path)
+  assert store.names() == ["M31", "NGC7000"]
+  assert store.get("M31")["v_mag"] == 3.44
+  # unknown objects are remembered too
+  assert store.get("NGC 7000")["resolved"] == 0
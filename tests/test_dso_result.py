@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs compact DSO results tests
+#
+
+import datetime
+import types
+import numpy as np
+import catalogue_store
+import dso_result
+import result_cache
+
+
+def night():
+  # the NightContext fields from_entry reads
+  start = datetime.datetime(2026, 10, 15, 20, 0)
+  end = datetime.datetime(2026, 10, 16, 6, 0)
+  return types.SimpleNamespace(theDate="15.10.2026", today=datetime.date(2026, 10, 15),
+                               nautical_night_start=start, nautical_night_end=end, astronomical_night_start=start, astronomical_night_end=end)
+
+def test_from_entry_keeps_spaced_name(tmp_path):
+  store = catalogue_store.CatalogueStore(str(tmp_path / "dso_catalogue.sqlite"))
+  store.put("NGC 188", dict(main_id="NGC 188", ra=11.8, dec=85.2, otype="OpC", v_mag=8.1, major_axis=14.0, minor_axis=14.0))
+  entry = store.get("NGC 188")
+  assert entry["name"] == "NGC188"
+  result = dso_result.DSOResult.from_entry(entry, night(), "Open cluster", the_object_name="NGC 188", visible=False, reason="never rises")
+  assert result.the_object_name == "NGC 188"
+  assert result.reason == "never rises"
+  rows = dict((catalogue_store.normalize_name(n), i) for i, n in enumerate(["NGC 40", "NGC 188"]))
+  assert rows[catalogue_store.normalize_name(result.the_object_name)] == 1
+
+def test_from_entry_default_name(tmp_path):
+  store = catalogue_store.CatalogueStore(str(tmp_path / "dso_catalogue.sqlite"))
+  store.put("M 31", dict(main_id="M 31", ra=10.68, dec=41.27, otype="AGN", v_mag=3.4, major_axis=199.5, minor_axis=70.8))
+  result = dso_result.DSOResult.from_entry(store.get("M 31"), night())
+  assert result.the_object_name == "M31"
+  assert result.magnitude == 3.4
+
+def test_track_store_grows():
+  tracks = dso_result.TrackStore(5, 0)
+  for k in range(20):
+    assert tracks.add(np.full(5, k), np.full(5, 2 * k)) == k
+  alt, az = tracks.track(17)
+  assert alt.dtype == np.float32
+  assert alt[0] == 17 and az[0] == 34
+  assert tracks.nbytes() == 2 * 20 * 5 * 4
+
+def test_cached_track_in_store(tmp_path):
+  cache = result_cache.ResultCache(str(tmp_path / "result_cache.sqlite"))
+  result = dso_result.DSOResult(the_object_name="NGC 188", theDate="15.10.2026", max_alt=42.0)
+  cache.put_many([("key", result, np.linspace(0, 50, 7), np.linspace(0, 300, 7))])
+  tracks = dso_result.TrackStore(7)
+  found = cache.get_many(["key"], tracks)
+  alt, az = found["key"].track()
+  assert found["key"].the_object_name == "NGC 188"
+  assert np.allclose(alt, np.linspace(0, 50, 7))
+  assert tracks.count == 1
+
+def test_older_pickle_state():
+  # results cached before the plot fields were added
+  result = dso_result.DSOResult(the_object_name="M 31", theDate="15.10.2026", max_alt=42.0)
+  state = result.__getstate__()
+  for name in dso_result.plot_fields + ["features"]:
+    del state[name]
+  older = dso_result.DSOResult.__new__(dso_result.DSOResult)
+  older.__setstate__(state)
+  assert older.max_alt == 42.0
+  assert older.max_alt_during_night is None and older.features == {}
+  assert "max_alt_during_night" not in older.to_dict()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs sun and moon ephemeris cache tests
+#
+
+import numpy as np
+import astropy.units as u
+from astropy.coordinates import AltAz, EarthLocation, get_body, get_sun
+from astropy.time import Time
+import pytest
+import ephemeris_cache
+
+
+@pytest.fixture(scope="module")
+def cache(tmp_path_factory):
+  # generated once into an empty directory, like the first run at a location
+  directory = tmp_path_factory.mktemp("ephemeris_cache")
+  cache_dir, caches = ephemeris_cache.cache_dir, dict(ephemeris_cache.caches)
+  ephemeris_cache.cache_dir = str(directory)
+  ephemeris_cache.caches.clear()
+  yield ephemeris_cache.get(50.1, 8.7, 2026)
+  ephemeris_cache.cache_dir = cache_dir
+  ephemeris_cache.caches.clear()
+  ephemeris_cache.caches.update(caches)
+
+def test_generated_once(cache):
+  assert cache.path.startswith(ephemeris_cache.cache_dir)
+  assert cache.data.shape[0] == len(ephemeris_cache.fields)
+  assert ephemeris_cache.get(50.1, 8.7, 2026) is cache
+
+def test_sun_and_moon_like_astropy(cache):
+  times = Time("2026-10-15 12:00:00") + np.arange(0, 24, 0.5) * u.hour
+  the_location = EarthLocation(lat=50.1 * u.deg, lon=8.7 * u.deg)
+  frame = AltAz(obstime=times, location=the_location)
+  values = cache.sample(times.jd)
+  sun = get_sun(times).transform_to(frame)
+  moon = get_body("moon", times).transform_to(frame)
+  # planning grade: interpolated every 2 h, analytic alt/az
+  assert np.max(np.abs(values["sun_alt"] - sun.alt.deg)) < 0.2
+  assert np.max(np.abs(values["moon_alt"] - moon.alt.deg)) < 0.5
+  assert np.all((values["moon_illumination"] >= 0) & (values["moon_illumination"] <= 1))
+
+def test_next_crossing(cache):
+  # next sunset after noon, the sun altitude there is the level
+  jd = Time("2026-10-15 12:00:00").jd
+  sunset = cache.next_crossing("sun_alt", jd, 0.0, False)
+  assert sunset.strftime("%Y-%m-%d") == "2026-10-15"
+  assert 16 <= sunset.hour <= 17
+  at = cache.sample([Time(sunset.replace(tzinfo=None)).jd])
+  assert abs(at["sun_alt"][0]) < 0.05
+
+def test_outside_of_the_cache(cache):
+  with pytest.raises(ValueError):
+    cache.sample([Time("2027-02-01 00:00:00").jd])
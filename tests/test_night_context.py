@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs per-night observation context tests
+#
+
+import gc
+import datetime
+import weakref
+import numpy as np
+import astropy.units as u
+from astropy.coordinates import EarthLocation
+import altaz_engine
+import night_context
+import result_cache
+
+
+class Night:
+  # stands in for the NightContext of a date, no twilight or ephemeris work
+  def __init__(self, today, the_location, utcoffset):
+    self.today = today
+
+def test_old_nights_evicted(monkeypatch):
+  monkeypatch.setattr(night_context, "NightContext", Night)
+  monkeypatch.setattr(night_context, "contexts", night_context.contexts.__class__())
+  monkeypatch.setattr(night_context, "max_contexts", 3)
+  the_location = EarthLocation(lat=50.1 * u.deg, lon=8.7 * u.deg, height=100 * u.m)
+  first = datetime.date(2026, 10, 15)
+  results = weakref.WeakKeyDictionary()  # like the daemon results
+  tonight = night_context.get(first, the_location, 2 * u.hour)
+  results[tonight] = ["results of tonight"]
+  for k in range(1, 10):
+    night = night_context.get(first + datetime.timedelta(days=k), the_location, 2 * u.hour)
+    results[night] = ["results of " + str(k)]
+    # tonight is asked again and again, it stays
+    assert night_context.get(first, the_location, 2 * u.hour) is tonight
+  assert len(night_context.contexts) == 3
+  assert [c.today.day for c in night_context.contexts.values()] == [23, 24, 15]
+  del night
+  gc.collect()
+  # the results of the evicted nights went with them
+  assert sorted(n.today.day for n in results.keys()) == [15, 23, 24]
+
+def test_result_cache_nights_follow_contexts():
+  assert isinstance(result_cache.nights, weakref.WeakKeyDictionary)
+
+def test_objects_altaz_other_names():
+  # a later caller with other names gets their rows, not a silent subset
+  the_location = EarthLocation(lat=50.1 * u.deg, lon=8.7 * u.deg, height=100 * u.m)
+  night = night_context.NightContext(datetime.date(2026, 10, 15), the_location, 2 * u.hour)
+  entries = {"M 31": dict(ra=10.68, dec=41.27, resolved=1), "NGC 188": dict(ra=11.8, dec=85.2, resolved=1), "M 1": dict(ra=None, dec=None, resolved=0)}
+  night.objects_altaz(["M 31"], entries)
+  matrix = night.objects_altaz(["NGC 188", "M 31", "M 1"], entries)
+  assert matrix.names == ["M 31", "NGC 188"]
+  assert "M 1" not in matrix
+  alt, az = matrix.row("NGC188")
+  expected = altaz_engine.from_entries(["NGC 188"], entries, night.frame_over_night)
+  assert np.allclose(alt, expected.alt[0])
+  assert np.allclose(az, expected.az[0])
+  assert night.objects_altaz(["M 31"], entries) is matrix
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs night-only sampling tests
+#
+
+import datetime
+import numpy as np
+import astropy.units as u
+from astropy.coordinates import EarthLocation
+import pytest
+import altaz_engine
+import night_context
+import night_sampling
+
+
+@pytest.mark.parametrize("min_objects", [0, 1000])
+def test_peaks_like_full_grid(monkeypatch, min_objects):
+  # adaptive (min_objects 0) and small lists on the full grid give the peaks of the full grid
+  monkeypatch.setattr(night_sampling, "min_objects", min_objects)
+  the_location = EarthLocation(lat=50.1 * u.deg, lon=8.7 * u.deg, height=100 * u.m)
+  night = night_context.get(datetime.date(2026, 10, 15), the_location, 2 * u.hour)
+  rng = np.random.default_rng(1)
+  ra, dec = rng.uniform(0, 360, 200), rng.uniform(-35, 85, 200)
+  entries = dict((str(k), dict(ra=ra[k], dec=dec[k], resolved=1)) for k in range(len(ra)))
+  matrix = altaz_engine.from_entries(list(entries), entries, night.frame_over_night)
+  index, alt, az, above = altaz_engine.night_peaks(matrix.alt, matrix.az, night.nautical_mask)[:4]
+  sampled = night_sampling.peaks(ra, dec, night)
+  assert np.array_equal(sampled[0], index)
+  assert np.allclose(sampled[1], alt)
+  assert np.allclose(sampled[2], az)
+  assert np.array_equal(sampled[3], above)
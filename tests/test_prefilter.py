@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs declination/RA pre-filter tests
+#
+
+import datetime
+import types
+import numpy as np
+import astropy.units as u
+from astropy.coordinates import EarthLocation
+import altaz_engine
+import night_context
+import prefilter
+
+
+the_location = EarthLocation(lat=50.1 * u.deg, lon=8.7 * u.deg, height=100 * u.m)
+
+def night():
+  return night_context.NightContext(datetime.date(2026, 10, 15), the_location, 2 * u.hour)
+
+def test_closed_form_like_the_grid():
+  the_night = night()
+  ra = np.arange(0.0, 360.0, 15.0)
+  dec = np.tile([-30.0, 0.0, 45.0, 80.0], len(ra) // 4)
+  names = [str(k) for k in range(len(ra))]
+  entries = dict((n, dict(ra=ra[k], dec=dec[k], resolved=1)) for k, n in enumerate(names))
+  matrix = altaz_engine.from_entries(names, entries, the_night.frame_over_night)
+  grid_max = np.max(np.where(the_night.nautical_mask, matrix.alt, -90.0), axis=1)
+  keep, max_alt, reasons = prefilter.check(ra, dec, the_night)
+  # J2000 vs the apparent place and the sampling of the grid
+  assert np.max(np.abs(max_alt - grid_max)) < prefilter.margin
+  assert np.all(keep[grid_max >= 5.0])
+
+def test_reasons():
+  the_night = night()
+  middle = np.nonzero(the_night.nautical_mask)[0]
+  lst = altaz_engine.local_sidereal_time(the_night.jd[middle[len(middle) // 2]], the_location.lon.deg)
+  # far south, culminating at noon at the celestial equator, at midnight
+  keep, max_alt, reasons = prefilter.check([lst, lst + 180.0, lst], [-80.0, -20.0, 20.0], the_night)
+  assert list(keep) == [False, False, True]
+  assert reasons[0].startswith("never above 5 deg at latitude 50.1")
+  assert reasons[1].startswith("transits in daylight")
+  assert reasons[2] == ""
+  assert max_alt[2] > 55
+
+def test_margin():
+  # up to the margin below the threshold is evaluated
+  the_night = night()
+  dec = -(90.0 - 50.1 - 5.0) - np.array([0.5, 1.5])
+  middle = np.nonzero(the_night.nautical_mask)[0]
+  lst = altaz_engine.local_sidereal_time(the_night.jd[middle[len(middle) // 2]], the_location.lon.deg)
+  keep = prefilter.check([lst, lst], dec, the_night)[0]
+  assert list(keep) == [True, False]
+
+def test_without_nautical_night():
+  # e.g. summer at high latitudes, nothing is filtered
+  the_night = types.SimpleNamespace(nautical_mask=np.zeros(10, dtype=bool), the_location=the_location)
+  keep, max_alt, reasons = prefilter.check([0.0, 180.0], [-80.0, 80.0], the_night)
+  assert list(keep) == [True, True]
+  assert reasons == ["", ""]
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs tonight result cache tests
+#
+
+import numpy as np
+import astropy.units as u
+from astropy.coordinates import EarthLocation
+import dso_result
+import night_sampling
+import result_cache
+
+
+class Night:
+  # the NightContext fields of the key, samples over 24 h
+  def __init__(self, samples):
+    self.theDate = "15.10.2026"
+    self.the_location = EarthLocation(lat=50.1 * u.deg, lon=8.7 * u.deg, height=100 * u.m)
+    self.utcoffset = 2 * u.hour
+    self.jd = np.linspace(0, 1, samples)
+    self.sample_minutes = 24 * 60 / (samples - 1)
+
+entry = dict(name="NGC188", ra=11.8, dec=85.2, otype="OpC", v_mag=8.1, major_axis=14.0, minor_axis=14.0)
+
+def test_key_sampling_and_precision(monkeypatch):
+  night, fine = Night(1000), Night(2881)
+  adaptive = result_cache.key(entry, night, "Caldwell", "astropy")
+  assert result_cache.key(entry, night, "Caldwell", "astropy") == adaptive
+  assert result_cache.key(entry, fine, "Caldwell", "astropy") != adaptive
+  monkeypatch.setattr(night_sampling, "sampling", "full")
+  assert result_cache.key(entry, night, "Caldwell", "astropy") != adaptive
+
+def test_evict_once(tmp_path):
+  cache = result_cache.ResultCache(str(tmp_path / "result_cache.sqlite"), size=50000)
+  track = np.zeros(1000)
+  items = [("key" + str(k), dso_result.DSOResult(the_object_name="M" + str(k), theDate="15.10.2026"), track, track) for k in range(20)]
+  for k in range(0, 20, 5):
+    cache.put_many(items[k:k + 5])
+  # puts do not evict, the run evicts once at its end
+  assert cache.size() > 50000
+  assert cache.evict() > 0
+  assert cache.size() <= 50000
+  assert "key19" in cache.get_many(["key0", "key19"])
+
+def test_renamed_for_the_run(tmp_path):
+  # a scheduler run put NGC188, a named run asks for NGC 188 under the same key
+  cache = result_cache.ResultCache(str(tmp_path / "result_cache.sqlite"))
+  night = Night(1000)
+  k = result_cache.key(entry, night, "Caldwell", "astropy")
+  assert result_cache.key(dict(entry, name="NGC 188"), night, "Caldwell", "astropy") == k
+  cache.put_many([(k, dso_result.DSOResult(the_object_name="NGC188", theDate="15.10.2026"), None, None)])
+  assert cache.get_many([k])[k].the_object_name == "NGC188"
+  assert cache.get_many([k], names={k: "NGC 188"})[k].the_object_name == "NGC 188"
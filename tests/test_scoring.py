@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs numeric DSO scoring tests
+#
+
+import datetime
+import numpy as np
+import astropy.units as u
+from astropy.coordinates import EarthLocation
+import altaz_engine
+import night_context
+import prefilter
+import scoring
+
+
+def test_darkness():
+  assert list(scoring.darkness(np.array([-20.0, -15.0, -11.9, 5.0]))) == [1.0, 0.5, 0.0, 0.0]
+
+def test_features():
+  # DSOs at 60 deg in the dark: moon below the horizon, moon 10 deg away, moon far away
+  values = scoring.features([60, 60, 60], [180, 180, 180], [-20, -20, -20], [-10, 50, 20], [0, 175, 0], [80, 80, 80])
+  assert list(values["moon_top"]) == [True, False, False]
+  assert list(values["moon_ok"]) == [True, False, True]
+  assert np.isclose(values["score"][0], np.sin(np.radians(60)))
+  assert values["score"][1] < values["score"][2] < values["score"][0]
+  # below min_altitude nothing scores
+  assert scoring.features([4], [180], [-20], [-10], [0], [0])["score"][0] == 0.0
+
+def test_peak_at_the_start_of_the_night():
+  # a DSO setting after dusk peaks at the first sample of the nautical night
+  # and is up for hours in the dark, it must not get darkness 0
+  the_location = EarthLocation(lat=50.1 * u.deg, lon=8.7 * u.deg, height=100 * u.m)
+  night = night_context.NightContext(datetime.date(2026, 10, 15), the_location, 2 * u.hour)
+  first = np.nonzero(night.nautical_mask)[0][0]
+  assert night.obstime_datetimes[first] > night.nautical_night_start
+  assert night.sun_alt[first] < -12
+  ra = np.array([np.mod(altaz_engine.local_sidereal_time(night.jd[first], the_location.lon.deg) - 60.0, 360.0)])
+  dec = np.array([40.0])
+  matrix = altaz_engine.from_entries(["DSO"], dict(DSO=dict(ra=ra[0], dec=dec[0], resolved=1)), night.frame_over_night)
+  index, alt, az, above = altaz_engine.night_peaks(matrix.alt, matrix.az, night.nautical_mask)[:4]
+  assert index[0] == first
+  assert above[0] * night.sample_minutes > 4 * 60
+  values = scoring.night_features(night, index, alt, az, prefilter.darkness(ra, dec, night))
+  # up during the astronomical night
+  assert values["darkness"][0] == 1.0
+  assert values["score"][0] > 0.3
+
+def test_darkness_of_the_visible_window():
+  the_location = EarthLocation(lat=50.1 * u.deg, lon=8.7 * u.deg, height=100 * u.m)
+  night = night_context.NightContext(datetime.date(2026, 10, 15), the_location, 2 * u.hour)
+  middle = np.nonzero(night.astronomical_mask)[0]
+  middle = middle[len(middle) // 2]
+  lst = altaz_engine.local_sidereal_time(night.jd[middle], the_location.lon.deg)
+  # culminating at midnight, at noon and never rising
+  dark = prefilter.darkness([lst, lst + 180.0, lst], [40.0, 10.0, -60.0], night)
+  assert list(dark) == [1.0, 0.0, 0.0]
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs sky utilities tests
+#
+
+import ephemeris_cache
+import sky_utils
+
+
+def test_moon_data():
+  moon_rise, moon_set, full_moon, moon_phase, moon_phase_percent, alt, az, distance = sky_utils.moon_data("15.10.2026", "22:00", 50.1, 8.7)
+  assert moon_rise.startswith("1") and moon_set.startswith("1")
+  assert full_moon.endswith(".2026")
+  assert 0 <= moon_phase_percent <= 100
+  assert 350000 < distance < 410000
+
+def test_moon_data_without_rise(monkeypatch, capsys):
+  # no moon rise or set inside the cached span, e.g. a moon always up
+  monkeypatch.setattr(ephemeris_cache, "next_crossing", lambda latitude, longitude, field, jd, level, rising: None)
+  moon_rise, moon_set, full_moon, moon_phase, moon_phase_percent, alt, az, distance = sky_utils.moon_data("15.10.2026", "22:00", 50.1, 8.7)
+  assert moon_rise is None and moon_set is None and full_moon is None
+  assert 0 <= moon_phase_percent <= 100
+  assert "No moon rise after 15.10.2026 22:00" in capsys.readouterr().out
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs full-year visibility grid tests
+#
+
+import astropy.units as u
+from astropy.coordinates import EarthLocation
+import year_grid
+
+
+the_location = EarthLocation(lat=50.1 * u.deg, lon=8.7 * u.deg, height=100 * u.m)
+
+class Grid:
+  # stands in for the YearGrid of a year, no ephemeris work
+  def __init__(self, year, the_location, utcoffset):
+    self.year = year
+
+def test_best_night():
+  grid = year_grid.get(2026, the_location, 2 * u.hour)
+  assert grid.jd.shape == (365, year_grid.samples)
+  # M31 culminates at midnight in autumn, in the dark and near the zenith
+  best = grid.best_night(10.68, 41.27)
+  assert best["night"].month in [9, 10, 11]
+  assert best["darkness"] == 1.0
+  assert best["alt"] > 75
+  assert best["direction"] == "S"
+  assert 0 < best["quality"] <= 1
+  assert best["dark_minutes"] > 8 * 60
+
+def test_never_visible():
+  grid = year_grid.get(2026, the_location, 2 * u.hour)
+  best = grid.best_night(100.0, -80.0)
+  assert best["quality"] == 0.0
+  assert best["dark_minutes"] == 0.0
+
+def test_old_grids_evicted(monkeypatch):
+  monkeypatch.setattr(year_grid, "YearGrid", Grid)
+  monkeypatch.setattr(year_grid, "grids", year_grid.grids.__class__())
+  monkeypatch.setattr(year_grid, "max_grids", 2)
+  this_year = year_grid.get(2026, the_location, 2 * u.hour)
+  for year in [2027, 2028, 2029]:
+    year_grid.get(year, the_location, 2 * u.hour)
+    assert year_grid.get(2026, the_location, 2 * u.hour) is this_year
+  assert [grid.year for grid in year_grid.grids.values()] == [2029, 2026]
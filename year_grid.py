@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Solveighs full-year visibility grid
+#
+# For --best every night of the year is sampled (nights x samples, 24 h around
+# local midnight). Sun and moon come from the ephemeris cache, alt/az of the
+# DSOs from the analytic engine (altaz_engine.fast_altaz) since the astropy
+# transformation costs ~80 us per time sample. The grid is shared by all DSOs
+# of a run.
+#
+
+import datetime
+import collections
+import numpy as np
+import astropy.units as u
+from astropy.time import Time
+import altaz_engine # own
+import ephemeris_cache # own
+import scoring # own
+import sky_utils # own
+import metrics # own
+
+debug = False
+
+samples = 144  # per night, ~10 minutes
+
+max_grids = None  # kept grids, least recently used evicted beyond, None: all
+
+grids = collections.OrderedDict()  # (year, latitude, longitude, utcoffset) -> YearGrid
+
+def get(year, the_location, utcoffset):
+  key = (int(year), round(the_location.lat.deg, 6), round(the_location.lon.deg, 6), utcoffset.to_value(u.hour))
+  metrics.hit("year_grid", key in grids)
+  if key not in grids:
+    with metrics.stage("year_grid"):
+      grids[key] = YearGrid(int(year), the_location, utcoffset)
+    while max_grids is not None and len(grids) > max_grids:
+      grids.popitem(last=False)
+  else:
+    grids.move_to_end(key)
+  return grids[key]
+
+class YearGrid:
+
+  def __init__(self, year, the_location, utcoffset):
+    self.year = year
+    self.the_location = the_location
+    self.utcoffset = utcoffset
+    self.latitude = the_location.lat.deg
+    self.longitude = the_location.lon.deg
+
+    first = datetime.date(year, 1, 1)
+    self.days = [first + datetime.timedelta(days=k) for k in range((datetime.date(year + 1, 1, 1) - first).days)]
+    # night of a day: 24 h around the following local midnight, like NightContext
+    first_midnight = Time((first + datetime.timedelta(days=1)).strftime("%Y-%m-%d") + " 00:00:00") - utcoffset
+    self.delta_midnight = np.linspace(-12, 12, samples)  # hours
+    self.sample_minutes = 24 * 60 / (samples - 1)
+    self.jd = first_midnight.jd + np.arange(len(self.days))[:, None] + self.delta_midnight[None, :] / 24.0
+    if debug:
+      print("Year grid " + str(year) + ": " + str(self.jd.shape))
+
+    # sun and moon from the ephemeris cache of the year
+    ephemeris = ephemeris_cache.get(self.latitude, self.longitude, year).sample(self.jd)
+    self.sun_alt, self.sun_az = ephemeris["sun_alt"], ephemeris["sun_az"]
+    self.moon_alt, self.moon_az = ephemeris["moon_alt"], ephemeris["moon_az"]
+    self.moon_illumination = ephemeris["moon_illumination"]
+
+    # 1: astronomical night, 0.5: nautical night, 0: brighter
+    self.darkness = scoring.darkness(self.sun_alt)
+
+  def quality(self, alt, az):
+    # 0..1 per sample, see scoring.score
+    moon_separation = scoring.separation(alt, az, self.moon_alt, self.moon_az)
+    return scoring.score(alt, self.darkness, self.moon_alt, self.moon_illumination, moon_separation), moon_separation
+
+  def best_night(self, ra, dec):
+    alt, az = altaz_engine.fast_altaz(ra, dec, self.jd, self.latitude, self.longitude)
+    quality, moon_separation = self.quality(alt, az)
+    night, sample = np.unravel_index(np.argmax(quality), quality.shape)
+    dark_minutes = np.count_nonzero((alt > scoring.min_altitude) & (self.darkness > 0), axis=1) * self.sample_minutes
+    local_time = (Time(self.jd[night, sample], format="jd", scale="utc") + self.utcoffset).datetime
+    best = dict(night=self.days[night],
+                time=local_time,
+                quality=float(quality[night, sample]),
+                alt=float(alt[night, sample]),
+                az=float(az[night, sample]),
+                direction=sky_utils.compass_direction(az[night, sample]),
+                darkness=float(self.darkness[night, sample]),
+                moon_alt=float(self.moon_alt[night, sample]),
+                moon_illumination=float(self.moon_illumination[night, sample]) * 100.0,
+                moon_separation=float(moon_separation[night, sample]),
+                dark_minutes=float(dark_minutes[night]))
+    if debug:
+      print("Best night: " + str(best))
+    return best